@@ -0,0 +1,18 @@
+"""Адреса, которые при ``ASYNC_VIEWS`` перехватывают асинхронные версии.
+
+Подключаются перед ``api.urls``; прочие методы этих адресов
+передаются тем же вьюсетам DRF. Поток событий ``stream/`` есть
+только здесь.
+"""
+from django.urls import path
+
+from api import async_views
+
+urlpatterns = [
+    path("recipes/", async_views.recipe_list),
+    path("recipes/<int:pk>/", async_views.recipe_detail),
+    path("recipes/<int:pk>/image/", async_views.recipe_image),
+    path("ingredients/", async_views.ingredient_list),
+    path("users/me/avatar/", async_views.avatar),
+    path("stream/", async_views.event_stream),
+]
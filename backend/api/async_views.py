@@ -0,0 +1,423 @@
+"""Асинхронные версии горячих эндпоинтов для запуска под ASGI.
+
+Подключаются настройкой ``ASYNC_VIEWS``: список и карточка рецепта,
+подсказка ингредиентов, загрузка аватара и фотографии рецепта в
+base64, короткие ссылки и поток событий, которому ASGI нужен
+обязательно. Запросы к базе идут через асинхронный ORM, проверка и
+запись файла — в отдельном потоке, поэтому ожидание не блокирует
+цикл событий.
+Сериализаторы получают готовые множества избранного, покупок и
+подписок и к базе не обращаются; ``?fields=`` и ``?omit=`` работают
+так же, как в синхронных вьюсетах. Остальные методы тех же адресов
+обслуживают синхронные вьюсеты DRF.
+"""
+import json
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.authentication import CachedTokenAuthentication
+from api.fieldsets import Fieldset
+from api.filters import IngredientFilter, RecipeFilter
+from api.landing import REDIRECT, landing_page
+from api.mixins import is_pinned_to_primary, pin_after_write
+from api.pagination import CustomLimitPagination
+from api.permissions import IsAdminAuthorOrReadOnly
+from api.serializer import (
+    AvatarSerializer,
+    IngredientSerializer,
+    RecipeImageSerializer,
+    RecipeReadSerializer,
+)
+from api.views import (
+    CustomUserViewSet,
+    IngredientViewSet,
+    RecipeViewSet,
+    short_link_response,
+)
+from core.enums import Limits
+from core.routers import read_from_primary, read_from_replica
+from recipes import changelog
+from recipes.events import broker, change_event
+from recipes.models import Favorite, Ingredient, ShoppingList
+from recipes.search import search_snippets
+from recipes.short_links import ais_live
+from users.models import Subscription
+
+NOT_FOUND = "No Recipe matches the given query."
+RESYNC = "event: resync\ndata: {}\n\n"
+
+authentication = CachedTokenAuthentication()
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+async def authenticate(request):
+    """Ставит ``request.user``; при неверном токене возвращает 401."""
+    try:
+        user = await authentication.aauthenticate(request)
+    except AuthenticationFailed as error:
+        return unauthorized(error)
+    request.user = user or AnonymousUser()
+    return None
+
+
+def unauthorized(error=NotAuthenticated()):
+    response = json_response(
+        {"detail": error.detail}, status=error.status_code
+    )
+    response["WWW-Authenticate"] = authentication.keyword
+    return response
+
+
+def async_endpoint(methods, fallback, content_types=None):
+    """Методы ``methods`` обслуживает корутина, остальные — ``fallback``.
+
+    Если задан ``content_types``, запросы с телом другого типа тоже
+    уходят в ``fallback``. Корутина получает аутентифицированный
+    запрос; безопасные чтения идут на реплику, как в
+    ``ReplicaReadMixin``.
+    """
+    fallback = sync_to_async(fallback)
+
+    def decorator(handler):
+        @csrf_exempt
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in methods or (
+                content_types and request.content_type not in content_types
+            ):
+                return await fallback(request, *args, **kwargs)
+            response = await authenticate(request)
+            if response is not None:
+                return response
+            token = None
+            if request.method == "GET" and not is_pinned_to_primary(request):
+                token = read_from_replica()
+            try:
+                response = await handler(request, *args, **kwargs)
+            finally:
+                read_from_primary(token)
+            pin_after_write(request, response)
+            return response
+
+        return view
+
+    return decorator
+
+
+async def recipe_context(request, recipes):
+    """Контекст сериализатора с отметками текущего пользователя.
+
+    Отметки для полей, не попавших в ответ, не запрашиваются.
+    """
+    fieldset = Fieldset.from_request(request)
+    context = {
+        "request": request,
+        "fieldset": fieldset,
+        "favorited_ids": set(),
+        "shopping_cart_ids": set(),
+        "subscribed_ids": set(),
+    }
+    user = request.user
+    if not user.is_authenticated or not recipes:
+        return context
+    recipe_ids = [recipe.id for recipe in recipes]
+    for key, model, field in (
+        ("favorited_ids", Favorite, "is_favorited"),
+        ("shopping_cart_ids", ShoppingList, "is_in_shopping_cart"),
+    ):
+        if fieldset.wants(field):
+            context[key] = {
+                pk async for pk in model.objects.filter(
+                    user=user, recipe_id__in=recipe_ids
+                ).values_list("recipe_id", flat=True)
+            }
+    if fieldset.expands("author"):
+        context["subscribed_ids"] = {
+            pk async for pk in Subscription.objects.filter(
+                user=user,
+                author_id__in={recipe.author_id for recipe in recipes},
+            ).values_list("author_id", flat=True)
+        }
+    return context
+
+
+def recipe_queryset(request, action):
+    """Та же выборка, что у ``RecipeViewSet`` для данного действия."""
+    return RecipeViewSet(request=request, action=action).get_queryset()
+
+
+def page_bounds(request):
+    pagination = CustomLimitPagination
+    size = pagination.page_size
+    try:
+        limit = int(request.GET[pagination.page_size_query_param])
+        if limit > 0:
+            size = limit
+    except (KeyError, ValueError):
+        pass
+    try:
+        page = int(request.GET.get(pagination.page_query_param, 1))
+    except ValueError:
+        page = 0
+    return page, size
+
+
+def page_link(request, page):
+    url = request.build_absolute_uri()
+    param = CustomLimitPagination.page_query_param
+    if page == 1:
+        return remove_query_param(url, param)
+    return replace_query_param(url, param, page)
+
+
+@async_endpoint(("GET",), RecipeViewSet.as_view(
+    {"get": "list", "post": "create"}
+))
+async def recipe_list(request):
+    filterset = RecipeFilter(
+        request.GET,
+        queryset=recipe_queryset(request, "list"),
+        request=request,
+    )
+    # Проверка тегов обращается к базе синхронно.
+    if not await sync_to_async(filterset.is_valid)():
+        errors = filterset.errors.items()
+        return json_response(
+            {field: list(messages) for field, messages in errors}, status=400
+        )
+    queryset = filterset.qs
+    page, size = page_bounds(request)
+    count = await queryset.acount()
+    start = (page - 1) * size
+    if page < 1 or (page > 1 and start >= count):
+        return json_response(
+            {"detail": CustomLimitPagination.invalid_page_message},
+            status=404,
+        )
+    recipes = [recipe async for recipe in queryset[start:start + size]]
+    context = await recipe_context(request, recipes)
+    results = RecipeReadSerializer(recipes, many=True, context=context).data
+    query = request.GET.get("search", "").strip()
+    if query and context["fieldset"].wants("search_snippet"):
+        snippets = await sync_to_async(search_snippets)(
+            [recipe.id for recipe in recipes], query, using=queryset.db
+        )
+        for recipe, data in zip(recipes, results):
+            data["search_snippet"] = snippets.get(recipe.id)
+    has_next = start + size < count
+    return json_response({
+        "count": count,
+        "next": page_link(request, page + 1) if has_next else None,
+        "previous": page_link(request, page - 1) if page > 1 else None,
+        "results": results,
+    })
+
+
+@async_endpoint(("GET",), RecipeViewSet.as_view({
+    "get": "retrieve",
+    "put": "update",
+    "patch": "partial_update",
+    "delete": "destroy",
+}))
+async def recipe_detail(request, pk):
+    recipe = await recipe_queryset(request, "retrieve").filter(pk=pk).afirst()
+    if recipe is None:
+        return json_response({"detail": NOT_FOUND}, status=404)
+    context = await recipe_context(request, [recipe])
+    return json_response(RecipeReadSerializer(recipe, context=context).data)
+
+
+@async_endpoint(("GET",), IngredientViewSet.as_view({"get": "list"}))
+async def ingredient_list(request):
+    filterset = IngredientFilter(
+        request.GET, queryset=Ingredient.objects.all()
+    )
+    if not filterset.is_valid():
+        return json_response(dict(filterset.errors), status=400)
+    ingredients = [ingredient async for ingredient in filterset.qs]
+    return json_response(IngredientSerializer(ingredients, many=True).data)
+
+
+def json_body(request):
+    """Данные JSON-тела и ``None`` или ``None`` и ответ 400."""
+    try:
+        return json.loads(request.body), None
+    except ValueError as error:
+        return None, json_response(
+            {"detail": f"JSON parse error - {error}"}, status=400
+        )
+
+
+async def save_image(instance, field, image):
+    """Запись файла изображения в хранилище вне цикла событий."""
+    file = getattr(instance, field)
+    name = file.field.generate_filename(instance, image.name)
+    file.name = await sync_to_async(
+        file.storage.save, thread_sensitive=False
+    )(name, image)
+
+
+@async_endpoint(
+    ("PUT",),
+    CustomUserViewSet.as_view(
+        {"put": "avatar", "delete": "delete_avatar"},
+        **CustomUserViewSet.avatar.kwargs,
+    ),
+    content_types=("application/json",),
+)
+async def avatar(request):
+    """Аватар в base64: декодирование и запись файла вне цикла событий.
+
+    Multipart и изображение телом запроса разбирает вьюсет DRF.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return unauthorized()
+    data, error = json_body(request)
+    if error is not None:
+        return error
+    serializer = AvatarSerializer(instance=user, data=data)
+    if not await sync_to_async(
+        serializer.is_valid, thread_sensitive=False
+    )():
+        return json_response(serializer.errors, status=400)
+    image = serializer.validated_data["avatar"]
+    if image is None:
+        user.avatar = None
+    else:
+        await save_image(user, "avatar", image)
+    await user.asave(update_fields=("avatar",))
+    return json_response(AvatarSerializer(user).data)
+
+
+@async_endpoint(
+    ("PUT",),
+    RecipeViewSet.as_view({"put": "image"}, **RecipeViewSet.image.kwargs),
+    content_types=("application/json",),
+)
+async def recipe_image(request, pk):
+    """Фотография рецепта в base64, как ``avatar``.
+
+    Multipart и изображение телом запроса разбирает вьюсет DRF.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return unauthorized()
+    recipe = await recipe_queryset(request, "image").filter(pk=pk).afirst()
+    if recipe is None:
+        return json_response({"detail": NOT_FOUND}, status=404)
+    if not (user.is_superuser or recipe.author_id == user.id):
+        return json_response(
+            {"detail": IsAdminAuthorOrReadOnly.message}, status=403
+        )
+    data, error = json_body(request)
+    if error is not None:
+        return error
+    serializer = RecipeImageSerializer(
+        recipe, data=data, context={"request": request}
+    )
+    if not await sync_to_async(
+        serializer.is_valid, thread_sensitive=False
+    )():
+        return json_response(serializer.errors, status=400)
+    await save_image(recipe, "image", serializer.validated_data["image"])
+    await recipe.asave(update_fields=("image",))
+    return json_response(serializer.data)
+
+
+def server_sent_event(event):
+    data = json.dumps(
+        {key: event[key] for key in ("id", "deleted", "token")}
+    )
+    return f"id: {event['token']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def replay_events(user, since):
+    """Пропущенные после ``since`` события или одно ``resync``."""
+    limit = Limits.MAX_SYNC_CHANGES.value
+    changes = [
+        change async for change in changelog.visible_changes(user).filter(
+            id__gt=since
+        ).order_by("id")[:limit + 1]
+    ]
+    if len(changes) > limit:
+        return [RESYNC]
+    return [server_sent_event(change_event(change)) for change in changes]
+
+
+async def stream_events(user, subscription, since):
+    """Тело ответа: события, а в тишине — комментарии keep-alive."""
+    last = since or 0
+    if since is not None:
+        for chunk in await replay_events(user, since):
+            yield chunk
+    while True:
+        event = await subscription.get(settings.STREAM_HEARTBEAT_SECONDS)
+        if subscription.overflowed:
+            subscription.overflowed = False
+            yield RESYNC
+        if event is None:
+            yield ": ping\n\n"
+        elif event["token"] > last:
+            last = event["token"]
+            yield server_sent_event(event)
+
+
+@csrf_exempt
+@require_GET
+async def event_stream(request):
+    """Server-sent events о рецептах авторов из подписок и о списках.
+
+    Соединение ждёт в цикле событий без потока. Событие несёт id
+    объекта и токен журнала; данные клиент берёт из ``/api/sync/``.
+    После обрыва ``Last-Event-ID`` (или ``?since=``) досылает
+    пропущенное, а если его слишком много — событие ``resync``.
+    """
+    response = await authenticate(request)
+    if response is not None:
+        return response
+    if not request.user.is_authenticated:
+        return unauthorized()
+    since = request.headers.get("Last-Event-ID", request.GET.get("since"))
+    try:
+        since = None if since is None else max(int(since), 0)
+    except ValueError:
+        return json_response({"since": ["Нужен id события."]}, status=400)
+    subscription = await broker.connect(request.user.id)
+    response = StreamingHttpResponse(
+        stream_events(request.user, subscription, since),
+        content_type="text/event-stream",
+    )
+    # Не в ``finally`` тела: тело, которое ни разу не читали (клиент
+    # ушёл сразу после заголовков), не выполняется и не закрывается.
+    response._resource_closers.append(partial(broker.release, subscription))
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@require_GET
+async def short_url(request, pk):
+    """Короткая ссылка: попадание в карту рецептов — без потоков и запросов."""
+    if not await ais_live(pk):
+        raise Http404(f'Рецепт с id "{pk}" не существует.')
+    page = None
+    if settings.SHORT_LINK_MODE != REDIRECT:
+        page = await sync_to_async(landing_page)(pk, request)
+    return short_link_response(pk, page)
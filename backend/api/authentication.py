@@ -0,0 +1,61 @@
+from copy import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.cache import TTLCache
+
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшем токен → пользователь.
+
+    Кэш живёт в памяти процесса: выход, смена пароля и деактивация
+    сбрасывают его сигналами только в процессе, который их обработал.
+    Остальные воркеры принимают удалённый токен, пока не истечёт
+    ``TOKEN_CACHE_TTL``, поэтому срок держим в несколько секунд: даже
+    при таком сроке частые запросы клиента обходятся без запроса к БД.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+        user, token = credentials
+        return copy(user), token
+
+    async def aauthenticate(self, request):
+        """``authenticate`` для асинхронных представлений.
+
+        Возвращает пользователя или ``None`` для анонимного запроса.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed(_("Invalid token header."))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed(_("Invalid token header."))
+        credentials = token_cache.get(key)
+        if credentials is None:
+            token = await self.get_model().objects.select_related(
+                "user"
+            ).filter(key=key).afirst()
+            if token is None:
+                raise AuthenticationFailed(_("Invalid token."))
+            if not token.user.is_active:
+                raise AuthenticationFailed(_("User inactive or deleted."))
+            credentials = (token.user, token)
+            token_cache.set(key, credentials)
+        return copy(credentials[0])
@@ -0,0 +1,148 @@
+"""Пакетные запросы: несколько вызовов API за один HTTP-запрос.
+
+Подзапросы выполняются в том же процессе прямым вызовом вьюсетов из
+``api.urls``, без middleware и повторной аутентификации: пользователь,
+определённый для пакета, передаётся им готовым. Отметки пользователя
+(избранное, покупки, подписки) загружаются один раз на пакет и
+сбрасываются после подзапроса, который что-то изменил.
+"""
+import json
+from http.cookies import SimpleCookie
+from io import BytesIO
+
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.template.response import SimpleTemplateResponse
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS, AllowAny
+from rest_framework.response import Response
+from rest_framework.status import HTTP_404_NOT_FOUND
+from rest_framework.viewsets import ViewSet
+
+from api.serializer import BatchSerializer
+
+API_PREFIX = "/api"
+NOT_FOUND = {"detail": "Страница не найдена."}
+
+
+class SharedMarks:
+    """Отметки пользователя, общие для подзапросов одного пакета."""
+
+    def __init__(self, user):
+        self.user = user
+        self._context = None
+
+    def context(self):
+        if self._context is None:
+            self._context = self.load()
+        return self._context
+
+    def load(self):
+        user = self.user
+        if not user.is_authenticated:
+            return {
+                "favorited_ids": set(),
+                "shopping_cart_ids": set(),
+                "subscribed_ids": set(),
+            }
+        return {
+            "favorited_ids": set(
+                user.favorite.values_list("recipe_id", flat=True)
+            ),
+            "shopping_cart_ids": set(
+                user.shopping_list.values_list("recipe_id", flat=True)
+            ),
+            "subscribed_ids": set(
+                user.follower.values_list("author_id", flat=True)
+            ),
+        }
+
+    def clear(self):
+        self._context = None
+
+
+def build_subrequest(request, method, path, body):
+    """Запрос Django с заголовками пакета и заданными методом и телом."""
+    path, _, query = path.partition("?")
+    data = b"" if body is None else json.dumps(body).encode()
+    environ = {
+        key: value for key, value in request.META.items()
+        if key.startswith("HTTP_")
+        or key in ("REMOTE_ADDR", "SERVER_NAME", "SERVER_PORT")
+    }
+    environ.update({
+        "PATH_INFO": path,
+        "SCRIPT_NAME": request.META.get("SCRIPT_NAME", ""),
+        "QUERY_STRING": query,
+        "REQUEST_METHOD": method,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(data)),
+        "wsgi.input": BytesIO(data),
+        "wsgi.url_scheme": request.scheme,
+    })
+    return WSGIRequest(environ)
+
+
+def response_body(response):
+    if hasattr(response, "data"):
+        return response.data
+    return response.content.decode(response.charset)
+
+
+class BatchViewSet(ViewSet):
+    """``POST /api/batch/``: подзапросы по порядку, ответы списком.
+
+    Каждый подзапрос проверяет права сам, как обычный запрос. Cookie
+    из ответов подзапросов (например, чтение из основной базы после
+    записи) действуют на следующие подзапросы и уходят клиенту.
+    """
+    permission_classes = (AllowAny,)
+
+    def create(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        marks = SharedMarks(request.user)
+        cookies = SimpleCookie()
+        responses = []
+        for item in serializer.validated_data["requests"]:
+            response = self.run(request, marks, cookies, **item)
+            if item["method"] not in SAFE_METHODS:
+                marks.clear()
+            cookies.update(response.cookies)
+            responses.append({
+                "status": response.status_code,
+                "body": response_body(response),
+            })
+        response = Response({"responses": responses})
+        response.cookies.update(cookies)
+        return response
+
+    def run(self, request, marks, cookies, method, path, body=None):
+        try:
+            match = resolve(
+                path.partition("?")[0][len(API_PREFIX):], urlconf="api.urls"
+            )
+        except Resolver404:
+            return Response(NOT_FOUND, status=HTTP_404_NOT_FOUND)
+        subrequest = build_subrequest(request, method, path, body)
+        subrequest.COOKIES = {
+            **subrequest.COOKIES,
+            **{name: morsel.value for name, morsel in cookies.items()},
+        }
+        if request.user.is_authenticated:
+            # Анонимный подзапрос проходит обычную аутентификацию, чтобы
+            # отказ был 401 с WWW-Authenticate, как без пакета.
+            subrequest._force_auth_user = request.user
+            subrequest._force_auth_token = request.auth
+        subrequest.shared_marks = marks
+        try:
+            response = match.func(subrequest, *match.args, **match.kwargs)
+            # Шаблон (например, /api/docs/) обычно отрисовывает
+            # обработчик запроса; у ответов DRF есть готовые ``data``.
+            if isinstance(response, SimpleTemplateResponse) and not hasattr(
+                response, "data"
+            ):
+                response.render()
+            return response
+        except Exception as exc:
+            return response_for_exception(subrequest, exc)
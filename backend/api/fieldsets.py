@@ -0,0 +1,95 @@
+"""Выборочные поля в ответах: ``?fields=``, ``?omit=`` и ``?expand=``.
+
+``fields`` оставляет только перечисленные поля, ``omit`` убирает
+перечисленные. Без ``fields`` связи (автор, теги, ингредиенты, рецепты
+подписки) отдаются целиком, как раньше; с ним — только id, а
+развернуть нужные можно через ``expand``. По тем же параметрам вьюсеты
+загружают лишь нужные столбцы и связи.
+"""
+import copy
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.serializers import ListSerializer
+
+
+def query_names(request, param):
+    return {
+        name.strip()
+        for value in request.GET.getlist(param)
+        for name in value.split(",")
+        if name.strip()
+    }
+
+
+class Fieldset:
+    """Запрошенные поля ответа и связи, которые нужно развернуть."""
+
+    def __init__(self, fields=None, omit=(), expand=()):
+        self.fields = None if fields is None else frozenset(fields)
+        self.omit = frozenset(omit)
+        self.expand = frozenset(expand)
+
+    @classmethod
+    def from_request(cls, request):
+        return cls(
+            query_names(request, "fields") or None,
+            query_names(request, "omit"),
+            query_names(request, "expand"),
+        )
+
+    def wants(self, name):
+        return (
+            (self.fields is None or name in self.fields)
+            and name not in self.omit
+        )
+
+    def expands(self, name):
+        return self.wants(name) and (
+            self.fields is None or name in self.expand
+        )
+
+
+ALL_FIELDS = Fieldset()
+
+
+class SparseFieldsetMixin:
+    """Поля корневого сериализатора по ``context["fieldset"]``.
+
+    ``collapsed_fields`` заменяют связи, которые не нужно разворачивать.
+    Вложенные сериализаторы всегда отдаются целиком.
+    """
+    collapsed_fields = {}
+
+    @property
+    def fieldset(self):
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return ALL_FIELDS
+        return self.context.get("fieldset", ALL_FIELDS)
+
+    def get_fields(self):
+        fieldset = self.fieldset
+        fields = {}
+        for name, field in super().get_fields().items():
+            if not fieldset.wants(name):
+                continue
+            if name in self.collapsed_fields and not fieldset.expands(name):
+                field = copy.deepcopy(self.collapsed_fields[name])
+            fields[name] = field
+        return fields
+
+    @classmethod
+    def columns(cls, fieldset):
+        """Столбцы модели для запрошенных полей с теми же именами."""
+        opts = cls.Meta.model._meta
+        columns = {opts.pk.name}
+        for name in cls.Meta.fields:
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and fieldset.wants(name):
+                columns.add(name)
+        return columns
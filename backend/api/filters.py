@@ -1,6 +1,7 @@
 from django_filters.rest_framework import FilterSet, filters
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
 
 
 class IngredientFilter(FilterSet):
@@ -17,22 +18,70 @@ class RecipeFilter(FilterSet):
         to_field_name="slug",
         queryset=Tag.objects.all(),
         label="Tags",
+        method="filter_tags",
     )
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(
         method="filter_is_in_shopping_cart"
     )
+    search = filters.CharFilter(method="filter_search")
+    cooking_time_min = filters.NumberFilter(
+        field_name="cooking_time", lookup_expr="gte"
+    )
+    cooking_time_max = filters.NumberFilter(
+        field_name="cooking_time", lookup_expr="lte"
+    )
+    ordering = filters.ChoiceFilter(
+        choices=(
+            ("cooking_time", "Быстрые сначала"),
+            ("-cooking_time", "Долгие сначала"),
+            ("popularity", "Популярные"),
+            ("favorited", "Недавно добавленные в избранное"),
+        ),
+        method="filter_ordering",
+    )
+
+    ORDERINGS = {
+        "cooking_time": ("cooking_time", "id"),
+        "-cooking_time": ("-cooking_time", "-id"),
+        "popularity": ("-favorites_count", "-id"),
+        "favorited": ("-last_favorited_at", "-id"),
+    }
 
     class Meta:
         model = Recipe
-        fields = ("tags", "author", "is_favorited", "is_in_shopping_cart")
+        fields = (
+            "tags",
+            "author",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+            "cooking_time_min",
+            "cooking_time_max",
+            "ordering",
+        )
+
+    def filter_tags(self, queryset, name, tags):
+        """Подзапрос к связям вместо JOIN: рецепт с несколькими
+        тегами не дублируется, и DISTINCT не нужен."""
+        if not tags:
+            return queryset
+        return queryset.filter(
+            id__in=Recipe.tags.through.objects.filter(
+                tag__in=tags
+            ).values("recipe_id")
+        )
 
     def filter_is_favorited(self, queryset, name, value):
+        """Порядок по ``recipe_id`` связи: записи пользователя идут из
+        уникального индекса (user, recipe) уже отсортированными."""
         user = (
             self.request.user if self.request.user.is_authenticated else None
         )
         if value and user:
-            return queryset.filter(favorite__user_id=user.id)
+            return queryset.filter(favorite__user_id=user.id).order_by(
+                "-favorite__recipe_id"
+            )
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
@@ -40,5 +89,19 @@ class RecipeFilter(FilterSet):
             self.request.user if self.request.user.is_authenticated else None
         )
         if value and user:
-            return queryset.filter(shopping_list__user_id=user.id)
+            return queryset.filter(shopping_list__user_id=user.id).order_by(
+                "-shopping_list__recipe_id"
+            )
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """Каждая сортировка совпадает с индексом по ``Recipe``."""
+        if value == "favorited":
+            queryset = queryset.filter(last_favorited_at__isnull=False)
+        return queryset.order_by(*self.ORDERINGS[value])
@@ -0,0 +1,115 @@
+"""Страница рецепта, которую короткая ссылка отдаёт без редиректа.
+
+В режиме ``preload`` оболочка SPA дополняется подсказкой браузеру
+сразу загрузить рецепт из API. В режиме ``embed`` данные
+``RecipeReadSerializer`` встраиваются в страницу, и она рисуется за
+один запрос. Готовые страницы кешируются в памяти процесса.
+Переход по ссылке — навигация браузера без токена, поэтому данные
+всегда анонимные; авторизованный пользователь перезапрашивает
+рецепт сам.
+"""
+import logging
+from copy import copy
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.html import json_script
+
+from api.serializer import RecipeReadSerializer
+from core.cache import TTLCache
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+REDIRECT = "redirect"
+PRELOAD = "preload"
+EMBED = "embed"
+RECIPE_DATA_ID = "recipe-data"
+HEAD_END = "</head>"
+
+pages = TTLCache(
+    maxsize=settings.SHORT_LINK_PAGE_CACHE_SIZE,
+    ttl=settings.SHORT_LINK_PAGE_CACHE_TTL,
+)
+
+
+@lru_cache(maxsize=1)
+def spa_shell():
+    """``index.html`` сборки фронтенда или ``None``, если её нет."""
+    try:
+        with open(settings.SPA_INDEX_PATH, encoding="utf-8") as file:
+            shell = file.read()
+    except OSError:
+        logger.warning(
+            "Нет оболочки SPA %s, короткие ссылки работают редиректом",
+            settings.SPA_INDEX_PATH,
+        )
+        return None
+    return shell if HEAD_END in shell else None
+
+
+def api_url(pk):
+    return f"/api/recipes/{pk}/"
+
+
+def recipe_data(pk, request):
+    recipe = Recipe.published.select_related("author").prefetch_related(
+        "tags", "recipe_ingredients__ingredient"
+    ).filter(pk=pk).first()
+    if recipe is None:
+        return None
+    # Страница общая для всех, а сессия админки делает посетителя
+    # авторизованным: отметки пользователя в неё попадать не должны.
+    request = copy(request)
+    request.user = AnonymousUser()
+    return RecipeReadSerializer(recipe, context={
+        "request": request,
+        "favorited_ids": set(),
+        "shopping_cart_ids": set(),
+        "subscribed_ids": set(),
+    }).data
+
+
+def render_page(pk, request, mode):
+    # Адрес меняется до запуска приложения, и роутер сразу открывает
+    # страницу рецепта.
+    head = [
+        f'<script>history.replaceState(null, "", "/recipes/{pk}/")</script>'
+    ]
+    if mode == PRELOAD:
+        head.append(
+            f'<link rel="preload" href="{api_url(pk)}" as="fetch" '
+            f'crossorigin="anonymous">'
+        )
+    else:
+        data = recipe_data(pk, request)
+        if data is None:
+            return None
+        head.append(json_script(data, RECIPE_DATA_ID))
+    return spa_shell().replace(HEAD_END, "".join(head) + HEAD_END, 1)
+
+
+def landing_page(pk, request):
+    """Страница рецепта или ``None``, если нужен обычный редирект."""
+    mode = settings.SHORT_LINK_MODE
+    if mode == REDIRECT or spa_shell() is None:
+        return None
+    key = (pk, mode)
+    page = pages.get(key)
+    if page is None:
+        page = render_page(pk, request, mode)
+        if page is None:
+            return None
+        pages.set(key, page)
+    response = HttpResponse(page)
+    if mode == PRELOAD:
+        response["Link"] = (
+            f'<{api_url(pk)}>; rel=preload; as=fetch; crossorigin=anonymous'
+        )
+    return response
+
+
+def forget(pk):
+    pages.discard(*((pk, mode) for mode in (PRELOAD, EMBED)))
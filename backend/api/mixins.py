@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+
+from api.fieldsets import ALL_FIELDS, Fieldset
+from core.routers import read_from_primary, read_from_replica
+
+REPLICA_PIN_COOKIE = "replica_pin"
+
+
+def is_pinned_to_primary(request):
+    user = request.user
+    return (
+        user.is_authenticated
+        and request.COOKIES.get(REPLICA_PIN_COOKIE) == str(user.pk)
+    )
+
+
+def pin_after_write(request, response):
+    """После успешной записи ставит cookie чтения из основной базы."""
+    if (
+        request.method not in SAFE_METHODS
+        and response.status_code < 400
+        and request.user.is_authenticated
+        and settings.REPLICA_DATABASES
+    ):
+        response.set_cookie(
+            REPLICA_PIN_COOKIE,
+            str(request.user.pk),
+            max_age=settings.REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+
+
+class ReplicaReadMixin:
+    """Отправляет безопасные чтения вьюсета на реплику БД.
+
+    После успешной записи клиент получает cookie, и следующие
+    ``REPLICA_PIN_SECONDS`` секунд его чтения идут в основную базу,
+    чтобы он сразу видел свои изменения.
+    """
+    replica_actions = ("list", "retrieve")
+
+    def is_pinned_to_primary(self, request):
+        return is_pinned_to_primary(request)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and not self.is_pinned_to_primary(request)
+        ):
+            self.replica_token = read_from_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        read_from_primary(getattr(self, "replica_token", None))
+        self.replica_token = None
+        pin_after_write(request, response)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class SparseFieldsetViewMixin:
+    """Передаёт сериализатору ``?fields=``, ``?omit=`` и ``?expand=``.
+
+    Учитываются только в действиях ``fieldset_actions``; вьюсет по
+    ``self.fieldset`` урезает и выборку.
+    """
+    fieldset_actions = ("list", "retrieve")
+
+    @cached_property
+    def fieldset(self):
+        if self.action not in self.fieldset_actions:
+            return ALL_FIELDS
+        return Fieldset.from_request(self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fieldset"] = self.fieldset
+        return context
+
+
+class SharedMarksMixin:
+    """Берёт отметки пользователя из пакетного запроса, если он есть.
+
+    Подзапросы ``/api/batch/`` получают избранное, покупки и подписки
+    один раз на весь пакет (см. ``api.batch.SharedMarks``).
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        marks = getattr(self.request, "shared_marks", None)
+        if marks is not None:
+            context.update(marks.context())
+        return context
+
+
+class RecipeMarksMixin:
+    """Отметки пользователя для страницы рецептов, запрос на поле.
+
+    Без них сериализатор проверяет избранное, покупки и подписку на
+    автора отдельным запросом для каждого рецепта. Отметки для полей,
+    не попавших в ответ, не запрашиваются; отметки пакетного запроса
+    берутся как есть.
+    """
+
+    def recipe_context(self, recipes):
+        context = self.get_serializer_context()
+        if "favorited_ids" in context:
+            return context
+        context.update(
+            favorited_ids=set(), shopping_cart_ids=set(), subscribed_ids=set()
+        )
+        user = self.request.user
+        if not user.is_authenticated or not recipes:
+            return context
+        recipe_ids = [recipe.id for recipe in recipes]
+        for key, queryset, field in (
+            ("favorited_ids", user.favorite, "is_favorited"),
+            ("shopping_cart_ids", user.shopping_list, "is_in_shopping_cart"),
+        ):
+            if self.fieldset.wants(field):
+                context[key] = set(
+                    queryset.filter(recipe_id__in=recipe_ids)
+                    .values_list("recipe_id", flat=True)
+                )
+        if self.fieldset.expands("author"):
+            context["subscribed_ids"] = set(
+                user.follower.filter(
+                    author_id__in={recipe.author_id for recipe in recipes}
+                ).values_list("author_id", flat=True)
+            )
+        return context
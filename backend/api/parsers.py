@@ -0,0 +1,69 @@
+"""Загрузка изображений без base64.
+
+Файл из multipart или из тела запроса Django читает кусками через
+обработчики загрузки: небольшой остаётся в памяти, больший
+``FILE_UPLOAD_MAX_MEMORY_SIZE`` пишется во временный файл. Base64 в
+JSON по-прежнему принимается ``Base64ImageField``.
+"""
+import json
+from mimetypes import guess_extension
+
+from django.utils.datastructures import MultiValueDict
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import (
+    DataAndFiles,
+    FileUploadParser,
+    MultiPartParser,
+)
+
+JSON_PART = "data"
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """multipart/form-data, поля которого можно передать JSON-частью.
+
+    Вложенные списки (ингредиенты рецепта) полями формы не передать,
+    поэтому клиент кладёт всё, кроме файлов, в часть ``data``.
+    Без неё форма разбирается как обычно.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        if JSON_PART not in result.data:
+            return result
+        try:
+            data = json.loads(result.data[JSON_PART])
+        except ValueError as error:
+            raise ParseError(f"JSON parse error - {error}")
+        if not isinstance(data, dict):
+            raise ParseError(f"Часть {JSON_PART} должна быть объектом.")
+        # Файлы сразу в данных: DRF объединил бы их с dict списками.
+        data.update(result.files.dict())
+        return DataAndFiles(data, MultiValueDict())
+
+
+class ImageUploadParser(FileUploadParser):
+    """Изображение телом запроса с ``Content-Type: image/*``.
+
+    Файл попадает в поле ``upload_field`` вьюсета. Имя берётся из
+    ``Content-Disposition``, без него — из типа содержимого.
+    """
+    media_type = "image/*"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        result = super().parse(stream, media_type, parser_context)
+        upload = result.files["file"]
+        field = parser_context["view"].upload_field
+        # Как для форм: Django закроет и удалит временный файл, когда
+        # запрос завершится.
+        parser_context["request"]._request._files = MultiValueDict(
+            {field: [upload]}
+        )
+        return DataAndFiles({}, {field: upload})
+
+    def get_filename(self, stream, media_type, parser_context):
+        filename = super().get_filename(stream, media_type, parser_context)
+        if filename:
+            return filename
+        content_type = media_type.split(";")[0].strip()
+        return "image" + (guess_extension(content_type) or "")
@@ -2,17 +2,28 @@ import base64
 
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework.serializers import (
+    BooleanField,
+    CharField,
+    ChoiceField,
     ImageField,
+    JSONField,
+    ListField,
     ModelSerializer,
+    Serializer,
     SerializerMethodField,
     ReadOnlyField,
     IntegerField,
     PrimaryKeyRelatedField,
+    SlugRelatedField,
     ValidationError,
 )
 from djoser.serializers import UserCreateSerializer, UserSerializer
 
+from api.fieldsets import SparseFieldsetMixin
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -38,7 +49,7 @@ class Base64ImageField(ImageField):
         return super().to_internal_value(data)
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SparseFieldsetMixin, UserSerializer):
     """Сериализатор для работы с информацией о пользователях."""
 
     is_subscribed = SerializerMethodField()
@@ -57,6 +68,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if "subscribed_ids" in self.context:
+            return obj.id in self.context["subscribed_ids"]
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
@@ -86,6 +99,14 @@ class AvatarSerializer(ModelSerializer):
         fields = ("avatar",)
 
 
+class RecipeImageSerializer(ModelSerializer):
+    image = Base64ImageField()
+
+    class Meta:
+        model = Recipe
+        fields = ("image",)
+
+
 class TagSerializer(ModelSerializer):
 
     class Meta:
@@ -125,7 +146,7 @@ class RecipeIngredientWriteSerializer(ModelSerializer):
         fields = ("id", "amount")
 
 
-class RecipeReadSerializer(ModelSerializer):
+class RecipeReadSerializer(SparseFieldsetMixin, ModelSerializer):
 
     tags = TagSerializer(many=True)
     author = CustomUserSerializer()
@@ -148,14 +169,57 @@ class RecipeReadSerializer(ModelSerializer):
             "image",
             "text",
             "cooking_time",
+            "is_published",
         )
 
+    collapsed_fields = {
+        "author": PrimaryKeyRelatedField(read_only=True),
+        "tags": PrimaryKeyRelatedField(many=True, read_only=True),
+        "ingredients": SlugRelatedField(
+            source="recipe_ingredients",
+            slug_field="ingredient_id",
+            many=True,
+            read_only=True,
+        ),
+    }
+
+    @classmethod
+    def setup_queryset(cls, queryset, fieldset):
+        """Только столбцы и связи, нужные запрошенным полям."""
+        queryset = queryset.select_related(None).prefetch_related(None).only(
+            *cls.columns(fieldset)
+        )
+        if fieldset.expands("author"):
+            queryset = queryset.select_related("author")
+        if fieldset.expands("tags"):
+            queryset = queryset.prefetch_related("tags")
+        elif fieldset.wants("tags"):
+            queryset = queryset.prefetch_related(
+                Prefetch("tags", queryset=Tag.objects.only("id"))
+            )
+        if fieldset.expands("ingredients"):
+            queryset = queryset.prefetch_related(
+                "recipe_ingredients__ingredient"
+            )
+        elif fieldset.wants("ingredients"):
+            queryset = queryset.prefetch_related(Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredient.objects.only(
+                    "recipe_id", "ingredient_id"
+                ),
+            ))
+        return queryset
+
     def get_is_favorited(self, recipe):
+        if "favorited_ids" in self.context:
+            return recipe.id in self.context["favorited_ids"]
         return get_serializer_method_field_value(
             self.context, Favorite, recipe, "user_id", "recipe"
         )
 
     def get_is_in_shopping_cart(self, recipe):
+        if "shopping_cart_ids" in self.context:
+            return recipe.id in self.context["shopping_cart_ids"]
         return get_serializer_method_field_value(
             self.context, ShoppingList, recipe, "user_id", "recipe"
         )
@@ -176,6 +240,7 @@ class RecipeWriteSerializer(ModelSerializer):
         max_value=Limits.MAX_VALUE_AMOUNT.value,
         min_value=Limits.MIN_VALUE_AMOUNT.value,
     )
+    is_published = BooleanField(required=False)
 
     class Meta:
         model = Recipe
@@ -186,6 +251,7 @@ class RecipeWriteSerializer(ModelSerializer):
             "image",
             "text",
             "cooking_time",
+            "is_published",
         )
 
     def validate_tags(self, value):
@@ -236,15 +302,19 @@ class RecipeWriteSerializer(ModelSerializer):
                 amount=ing.get('amount')) for ing in ingredients]
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
         user = self.context.get("request").user
+        # Клиенты без черновиков публикуют рецепт сразу, как раньше.
+        validated_data.setdefault("is_published", Recipe.Status.PUBLISHED)
         recipe = Recipe.objects.create(**validated_data, author=user)
         self.create_tags(tags, recipe)
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.get("tags")
         if tags is None:
@@ -268,34 +338,7 @@ class ShortRecipeSerializer(ModelSerializer):
         fields = ("id", "name", "image", "cooking_time")
 
 
-class SubscriberCreateSerializer(ModelSerializer):
-
-    class Meta:
-        model = Subscription
-        fields = ("id", "user", "author")
-        read_only_fields = ("id",)
-
-    def validate(self, data):
-        request = self.context.get("request")
-        user = request.user
-        author = data.get("author")
-
-        if user == author:
-            raise ValidationError(
-                "Вы не можете подписаться на себя"
-            )
-        if user.following.exists():
-            raise ValidationError(
-                "Вы уже подписаны на этого пользователя"
-            )
-
-        return data
-
-    def create(self, validated_data):
-        return Subscription.objects.create(**validated_data)
-
-
-class SubscriberDetailSerializer(ModelSerializer):
+class SubscriberDetailSerializer(SparseFieldsetMixin, ModelSerializer):
     email = ReadOnlyField(source="author.email")
     id = ReadOnlyField(source="author.id")
     username = ReadOnlyField(source="author.username")
@@ -320,9 +363,35 @@ class SubscriberDetailSerializer(ModelSerializer):
             "avatar",
         )
 
+    @classmethod
+    def setup_queryset(cls, queryset, fieldset):
+        """Столбцы автора и число рецептов — только если запрошены."""
+        author_fields = [
+            f"author__{name}"
+            for name in ("email", "username", "first_name", "last_name",
+                         "avatar")
+            if fieldset.wants(name)
+        ]
+        queryset = queryset.select_related("author").only(
+            "user", "author", *author_fields
+        )
+        if not fieldset.wants("recipes_count"):
+            return queryset
+        # Число рецептов — подзапрос по индексу автора, а не JOIN с
+        # группировкой: COUNT для пагинации его не выполняет.
+        recipes_count = (
+            Recipe.published.filter(author=OuterRef("author"))
+            .order_by()
+            .values("author")
+            .annotate(count=Count("id"))
+            .values("count")
+        )
+        return queryset.annotate(
+            recipes_count=Coalesce(Subquery(recipes_count), 0)
+        )
+
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return user.following.exists()
+        return obj.user_id == self.context['request'].user.id
 
     def get_recipes(self, obj):
         request = self.context['request']
@@ -330,49 +399,92 @@ class SubscriberDetailSerializer(ModelSerializer):
             limit = int(request.GET["recipes_limit"])
         else:
             limit = Limits.PAGE_SIZE.value
+        recipes = Recipe.published.filter(author_id=obj.author_id)[:limit]
+        if not self.fieldset.expands("recipes"):
+            return list(recipes.values_list("id", flat=True))
 
         return ShortRecipeSerializer(
-            Recipe.objects.filter(author=obj.author)[:limit],
+            recipes,
             many=True,
             context={"request": request},
         ).data
 
 
-class ShoppingCartCreateSerializer(ModelSerializer):
-    class Meta:
-        model = ShoppingList
-        fields = ("id", "user", "recipe")
-        read_only_fields = ("id",)
+class RecipeIdsSerializer(Serializer):
+    """Список id рецептов для пакетных операций."""
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=Limits.MAX_BATCH_RECIPES.value,
+    )
 
-    def validate(self, data):
-        recipe = data.get("recipe")
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
 
-        if recipe.shopping_list.exists():
-            raise ValidationError(
-                f'Рецепт "{recipe.name}" уже добавлен в список покупок.'
-            )
 
-        return data
+class FeedQuerySerializer(Serializer):
+    """Параметры страницы ленты подписок."""
+    limit = IntegerField(
+        min_value=1,
+        max_value=Limits.MAX_BATCH_RECIPES.value,
+        default=Limits.PAGE_SIZE.value,
+    )
+    before = IntegerField(min_value=1, required=False)
 
-    def create(self, validated_data):
-        return ShoppingList.objects.create(**validated_data)
 
+class SyncQuerySerializer(Serializer):
+    """Параметры дельта-синхронизации."""
+    since = IntegerField(min_value=0, required=False)
+    limit = IntegerField(
+        min_value=1,
+        max_value=Limits.MAX_SYNC_CHANGES.value,
+        default=Limits.MAX_SYNC_CHANGES.value,
+    )
 
-class FavoriteCreateSerializer(ModelSerializer):
-    class Meta:
-        model = Favorite
-        fields = ("id", "user", "recipe")
-        read_only_fields = ("id",)
 
-    def validate(self, data):
-        recipe = data.get("recipe")
+class SubRequestSerializer(Serializer):
+    """Подзапрос пакета: метод, путь в ``/api/`` и тело JSON."""
+    method = ChoiceField(
+        choices=("GET", "POST", "PUT", "PATCH", "DELETE"), default="GET"
+    )
+    path = CharField()
+    body = JSONField(required=False)
+
+    def validate_path(self, value):
+        if not value.startswith("/api/"):
+            raise ValidationError("Путь должен начинаться с /api/.")
+        if value.partition("?")[0].rstrip("/") == "/api/batch":
+            raise ValidationError("Пакеты не вкладываются друг в друга.")
+        return value
 
-        if recipe.favorite.exists():
-            raise ValidationError(
-                f'Рецепт "{recipe.name}" уже добавлен в избранное.'
-            )
 
-        return data
+class BatchSerializer(Serializer):
+    """Подзапросы пакетного запроса."""
+    requests = SubRequestSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=Limits.MAX_BATCH_REQUESTS.value,
+    )
 
-    def create(self, validated_data):
-        return Favorite.objects.create(**validated_data)
+
+class IngredientSearchSerializer(Serializer):
+    """Параметры поиска рецептов по имеющимся ингредиентам."""
+    ingredients = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=Limits.MAX_BATCH_RECIPES.value,
+    )
+    cooking_time_max = IntegerField(min_value=1, required=False)
+    tags = ListField(child=CharField(), required=False)
+
+
+class RecipeCoverageSerializer(RecipeReadSerializer):
+    """Рецепт с числом совпавших и недостающих ингредиентов."""
+    matched_ingredients = IntegerField(read_only=True)
+    missing_ingredients = IntegerField(read_only=True)
+
+    class Meta(RecipeReadSerializer.Meta):
+        fields = RecipeReadSerializer.Meta.fields + (
+            "matched_ingredients",
+            "missing_ingredients",
+        )
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api import landing
+from api.authentication import token_cache
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def drop_deleted_token(sender, instance, **kwargs):
+    """Выход через djoser удаляет токен — убираем его из кэша."""
+    token_cache.discard(instance.key)
+
+
+@receiver(post_save, sender=User)
+def drop_user_tokens(sender, instance, created, **kwargs):
+    """Смена пароля, деактивация и любые правки пользователя."""
+    if not created:
+        token_cache.discard(
+            *Token.objects.filter(user=instance).values_list("key", flat=True)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def drop_landing_page(sender, instance, **kwargs):
+    """Встроенные в страницу короткой ссылки данные устарели."""
+    landing.forget(instance.id)
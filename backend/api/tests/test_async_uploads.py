@@ -0,0 +1,52 @@
+import json
+import shutil
+import tempfile
+
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.async_views import recipe_image
+from core.testing import PIXEL, create_recipe, create_user
+
+
+class RecipeImageTests(TestCase):
+    """Фотография рецепта в base64 через асинхронный обработчик."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.recipe = create_recipe(cls.author)
+        cls.tokens = {
+            user.username: Token.objects.create(user=user).key
+            for user in (cls.author, create_user("cook"))
+        }
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    async def put(self, username, pk=None):
+        request = AsyncRequestFactory().put(
+            f"/api/recipes/{pk or self.recipe.id}/image/",
+            json.dumps({"image": PIXEL}),
+            content_type="application/json",
+            headers={"authorization": f"Token {self.tokens[username]}"},
+        )
+        return await recipe_image(request, pk=pk or self.recipe.id)
+
+    async def test_author_replaces_image(self):
+        response = await self.put("author")
+        self.assertEqual(response.status_code, 200)
+        await self.recipe.arefresh_from_db()
+        self.assertNotEqual(self.recipe.image.name, "photos/test.png")
+        image_url = json.loads(response.content)["image"]
+        self.assertTrue(image_url.endswith(self.recipe.image.name))
+
+    async def test_other_user(self):
+        self.assertEqual((await self.put("cook")).status_code, 403)
+
+    async def test_missing_recipe(self):
+        self.assertEqual((await self.put("author", 999999)).status_code, 404)
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import override_settings
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_401_UNAUTHORIZED,
+    HTTP_404_NOT_FOUND,
+)
+
+from core.testing import UserAPITestCase, create_recipe
+
+
+class BatchTests(UserAPITestCase):
+    """Подзапросы пакета выполняются по порядку, каждый со своим ответом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = create_recipe(cls.author)
+
+    def batch(self, *requests):
+        response = self.client.post(
+            "/api/batch/", {"requests": list(requests)}, format="json"
+        )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        return response.data["responses"]
+
+    def test_write_refreshes_marks(self):
+        recipe_url = f"/api/recipes/{self.recipe.id}/"
+        before, added, after = self.batch(
+            {"path": recipe_url},
+            {"method": "POST", "path": f"{recipe_url}favorite/"},
+            {"path": recipe_url},
+        )
+        self.assertEqual(
+            [before["status"], added["status"], after["status"]],
+            [HTTP_200_OK, HTTP_201_CREATED, HTTP_200_OK],
+        )
+        self.assertFalse(before["body"]["is_favorited"])
+        self.assertTrue(after["body"]["is_favorited"])
+
+    def test_unknown_path(self):
+        missing, tags = self.batch(
+            {"path": "/api/missing/"}, {"path": "/api/tags/"}
+        )
+        self.assertEqual(missing["status"], HTTP_404_NOT_FOUND)
+        self.assertEqual(tags["status"], HTTP_200_OK)
+
+    def test_permissions_per_request(self):
+        self.client.force_authenticate(None)
+        recipe, favorite = self.batch(
+            {"path": f"/api/recipes/{self.recipe.id}/"},
+            {
+                "method": "POST",
+                "path": f"/api/recipes/{self.recipe.id}/favorite/",
+            },
+        )
+        self.assertEqual(recipe["status"], HTTP_200_OK)
+        self.assertEqual(favorite["status"], HTTP_401_UNAUTHORIZED)
+
+    def test_template_page(self):
+        templates = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, templates)
+        (Path(templates) / "docs").mkdir()
+        (Path(templates) / "docs" / "redoc.html").write_text("<h1>API</h1>")
+        with override_settings(
+            TEMPLATES=[{**settings.TEMPLATES[0], "DIRS": [templates]}]
+        ):
+            docs, tags = self.batch(
+                {"path": "/api/docs/"}, {"path": "/api/tags/"}
+            )
+        self.assertEqual(docs, {"status": HTTP_200_OK, "body": "<h1>API</h1>"})
+        self.assertEqual(tags["status"], HTTP_200_OK)
@@ -0,0 +1,48 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from api import landing
+from core.testing import create_recipe, create_user
+from recipes.models import Favorite
+
+
+class EmbeddedLandingTests(TestCase):
+    """Данные в странице короткой ссылки одинаковы для всех."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin", is_staff=True, is_superuser=True)
+        cls.recipe = create_recipe(cls.admin)
+        Favorite.objects.create(user=cls.admin, recipe=cls.recipe)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        index = Path(directory.name) / "index.html"
+        index.write_text("<html><head></head><body></body></html>")
+        embed = override_settings(
+            SHORT_LINK_MODE=landing.EMBED, SPA_INDEX_PATH=str(index)
+        )
+        embed.enable()
+        self.addCleanup(embed.disable)
+        for cache in (landing.spa_shell.cache_clear, landing.pages.clear):
+            cache()
+            self.addCleanup(cache)
+
+    def embedded(self):
+        response = self.client.get(f"/s/{self.recipe.id}/")
+        self.assertEqual(response.status_code, 200)
+        page = response.content.decode()
+        start = page.index(">", page.index(landing.RECIPE_DATA_ID)) + 1
+        return json.loads(page[start:page.index("</script>", start)])
+
+    def test_session_user_marks_are_not_embedded(self):
+        self.client.force_login(self.admin)
+        data = self.embedded()
+        self.assertEqual(data["id"], self.recipe.id)
+        self.assertFalse(data["is_favorited"])
+        self.client.logout()
+        self.assertFalse(self.embedded()["is_favorited"])
@@ -0,0 +1,148 @@
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_204_NO_CONTENT,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+)
+
+from core.testing import UserAPITestCase, create_recipe
+from recipes.counters import exact_favorites_counts
+from recipes.models import Favorite, Recipe, ShoppingList
+
+
+class ToggleTests(UserAPITestCase):
+    """Добавление и удаление одного рецепта из избранного и покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = create_recipe(cls.author)
+
+    def test_favorite_add_and_remove(self):
+        url = f"/api/recipes/{self.recipe.id}/favorite/"
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.data["id"], self.recipe.id)
+        self.assertEqual(
+            self.client.post(url).status_code, HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            Favorite.objects.filter(user=self.user).count(), 1
+        )
+        self.assertEqual(
+            self.client.delete(url).status_code, HTTP_204_NO_CONTENT
+        )
+        self.assertEqual(
+            self.client.delete(url).status_code, HTTP_400_BAD_REQUEST
+        )
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
+
+    def test_favorite_counts(self):
+        url = f"/api/recipes/{self.recipe.id}/favorite/"
+        self.client.post(url)
+        self.assertEqual(exact_favorites_counts([self.recipe.id]), {
+            self.recipe.id: 1
+        })
+        self.client.delete(url)
+        self.assertEqual(exact_favorites_counts([self.recipe.id]), {
+            self.recipe.id: 0
+        })
+
+    def test_shopping_cart_add_and_remove(self):
+        url = f"/api/recipes/{self.recipe.id}/shopping_cart/"
+        self.assertEqual(self.client.post(url).status_code, HTTP_201_CREATED)
+        self.assertEqual(
+            self.client.post(url).status_code, HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            self.client.delete(url).status_code, HTTP_204_NO_CONTENT
+        )
+        self.assertFalse(ShoppingList.objects.exists())
+
+    def test_missing_recipe(self):
+        self.assertEqual(
+            self.client.post("/api/recipes/999999/favorite/").status_code,
+            HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(
+            self.client.delete("/api/recipes/999999/favorite/").status_code,
+            HTTP_404_NOT_FOUND,
+        )
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.post(
+            f"/api/recipes/{self.recipe.id}/favorite/"
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class BulkTests(UserAPITestCase):
+    """Пакетные операции со списками: id → результат."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.first = create_recipe(cls.author, "Первый")
+        cls.second = create_recipe(cls.author, "Второй")
+        cls.draft = create_recipe(
+            cls.author, "Черновик", is_published=Recipe.Status.DRAFT
+        )
+
+    def favorite_ids(self):
+        return set(
+            Favorite.objects.filter(user=self.user)
+            .values_list("recipe_id", flat=True)
+        )
+
+    def test_add_many(self):
+        Favorite.objects.create(user=self.user, recipe=self.first)
+        response = self.client.post("/api/recipes/favorite/", {
+            "recipes": [self.first.id, self.second.id, self.draft.id, 999999]
+        }, format="json")
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data, {
+            self.first.id: "exists",
+            self.second.id: "added",
+            self.draft.id: "not_found",
+            999999: "not_found",
+        })
+        self.assertEqual(self.favorite_ids(), {self.first.id, self.second.id})
+
+    def test_remove_many(self):
+        ShoppingList.objects.create(user=self.user, recipe=self.first)
+        response = self.client.delete("/api/recipes/shopping_cart/", {
+            "recipes": [self.first.id, self.second.id]
+        }, format="json")
+        self.assertEqual(response.data, {
+            self.first.id: "removed", self.second.id: "absent"
+        })
+        self.assertFalse(ShoppingList.objects.exists())
+
+    def test_toggle(self):
+        Favorite.objects.create(user=self.user, recipe=self.first)
+        response = self.client.post("/api/recipes/favorite/toggle/", {
+            "recipes": [self.first.id, self.second.id, self.first.id]
+        }, format="json")
+        self.assertEqual(response.data, {
+            self.first.id: "removed", self.second.id: "added"
+        })
+        self.assertEqual(self.favorite_ids(), {self.second.id})
+
+    def test_clear(self):
+        other = create_recipe(self.author, "Чужое избранное")
+        Favorite.objects.create(user=self.author, recipe=other)
+        for recipe in (self.first, self.second):
+            Favorite.objects.create(user=self.user, recipe=recipe)
+        response = self.client.delete("/api/recipes/favorite/clear/")
+        self.assertEqual(response.data, {"removed": 2})
+        self.assertEqual(self.favorite_ids(), set())
+        self.assertTrue(Favorite.objects.filter(user=self.author).exists())
+
+    def test_validation(self):
+        for data in ({}, {"recipes": []}, {"recipes": ["x"]}):
+            response = self.client.post(
+                "/api/recipes/favorite/", data, format="json"
+            )
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
@@ -0,0 +1,27 @@
+import asyncio
+
+from django.test import AsyncRequestFactory, TestCase
+from rest_framework.authtoken.models import Token
+
+from api.async_views import event_stream
+from core.testing import create_user
+from recipes.events import broker
+
+
+class EventStreamTests(TestCase):
+    """Подписка потока событий освобождается при закрытии ответа."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.token = Token.objects.create(user=create_user("cook"))
+
+    async def test_close_without_reading(self):
+        request = AsyncRequestFactory().get(
+            "/api/stream/", headers={"authorization": f"Token {self.token}"}
+        )
+        response = await event_stream(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(broker.hub.has_subscribers(self.token.user_id))
+        response.close()
+        self.assertFalse(broker.hub.has_subscribers())
+        await asyncio.wait_for(broker._task, 1)
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.status import HTTP_200_OK, HTTP_410_GONE
+
+from core.testing import UserAPITestCase, create_recipe
+from recipes.models import Change
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTokenTests(UserAPITestCase):
+    """Токены дельта-синхронизации: выдача, дельта и проверка границ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = create_recipe(cls.author)
+
+    def sync(self, since=None):
+        params = {} if since is None else {"since": since}
+        return self.client.get("/api/sync/", params)
+
+    def favorite(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/recipes/{self.recipe.id}/favorite/")
+
+    def test_delta_after_token(self):
+        token = self.sync().data["token"]
+        self.favorite()
+        response = self.sync(token)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.data["favorites"],
+            {"added": [self.recipe.id], "removed": []},
+        )
+        self.assertGreater(response.data["token"], token)
+        response = self.sync(response.data["token"])
+        self.assertEqual(response.data["favorites"]["added"], [])
+
+    def test_token_ahead_of_log(self):
+        self.favorite()
+        latest = Change.objects.latest("id").id
+        self.assertEqual(self.sync(latest).status_code, HTTP_200_OK)
+        self.assertEqual(self.sync(latest + 1).status_code, HTTP_410_GONE)
+
+    def test_token_on_empty_log(self):
+        self.assertEqual(self.sync(0).status_code, HTTP_200_OK)
+        self.assertEqual(self.sync(5).status_code, HTTP_410_GONE)
+
+    def test_pruned_token(self):
+        token = self.sync().data["token"]
+        self.favorite()
+        self.client.delete(f"/api/recipes/{self.recipe.id}/favorite/")
+        self.favorite()
+        latest = Change.objects.latest("id").id
+        call_command("prune_change_log", days=0, stdout=StringIO())
+        self.assertEqual(
+            list(Change.objects.values_list("id", flat=True)), [latest]
+        )
+        self.assertEqual(self.sync(token).status_code, HTTP_410_GONE)
+        self.assertEqual(self.sync(latest).status_code, HTTP_200_OK)
@@ -0,0 +1,131 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_404_NOT_FOUND,
+)
+
+from core.testing import (
+    PIXEL,
+    UserAPITestCase,
+    create_ingredient,
+    create_recipe,
+)
+from recipes.models import Favorite, Recipe, RecipeSimilarity, Tag
+
+
+class SimilarTests(UserAPITestCase):
+    """Похожие рецепты отдаются только для видимого пользователю."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.draft = create_recipe(
+            cls.author, "Черновик", is_published=Recipe.Status.DRAFT
+        )
+        cls.neighbour = create_recipe(cls.author, "Сосед")
+        RecipeSimilarity.objects.create(
+            recipe=cls.draft, similar=cls.neighbour, score=1
+        )
+
+    def test_draft_is_hidden_from_others(self):
+        response = self.client.get(f"/api/recipes/{self.draft.id}/similar/")
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_draft_is_visible_to_author(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.get(f"/api/recipes/{self.draft.id}/similar/")
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data], [self.neighbour.id]
+        )
+
+
+class PublishTests(UserAPITestCase):
+    """Автор сам публикует рецепт и снимает его с публикации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.tag = Tag.objects.create(name="Обед", slug="lunch")
+        cls.salt = create_ingredient("соль")
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_root = override_settings(MEDIA_ROOT=media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+    def create(self, **fields):
+        response = self.client.post("/api/recipes/", {
+            "tags": [self.tag.id],
+            "ingredients": [{"id": self.salt.id, "amount": 5}],
+            "name": "Похлёбка",
+            "image": PIXEL,
+            "text": "Варить",
+            "cooking_time": 30,
+            **fields,
+        }, format="json")
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        return response.data
+
+    def public_ids(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.get("/api/recipes/")
+        self.client.force_authenticate(self.user)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_published_by_default(self):
+        recipe = self.create()
+        self.assertTrue(recipe["is_published"])
+        self.assertEqual(self.public_ids(), [recipe["id"]])
+
+    def test_draft_and_publish(self):
+        recipe = self.create(is_published=False)
+        self.assertFalse(recipe["is_published"])
+        self.assertEqual(self.public_ids(), [])
+        drafts = self.client.get("/api/recipes/drafts/").data["results"]
+        self.assertEqual([draft["id"] for draft in drafts], [recipe["id"]])
+
+        response = self.client.patch(
+            f"/api/recipes/{recipe['id']}/",
+            {
+                "tags": [self.tag.id],
+                "ingredients": [{"id": self.salt.id, "amount": 5}],
+                "is_published": True,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(self.public_ids(), [recipe["id"]])
+
+    def test_edit_keeps_draft(self):
+        recipe = self.create(is_published=False)
+        self.client.patch(f"/api/recipes/{recipe['id']}/", {
+            "tags": [self.tag.id],
+            "ingredients": [{"id": self.salt.id, "amount": 7}],
+            "name": "Похлёбка густая",
+        }, format="json")
+        self.assertFalse(Recipe.objects.get(id=recipe["id"]).is_published)
+
+    def test_author_lists_own_draft(self):
+        draft = create_recipe(
+            self.user, "Мой черновик", is_published=Recipe.Status.DRAFT
+        )
+        url = f"/api/recipes/{draft.id}/favorite/"
+        self.assertEqual(self.client.post(url).status_code, HTTP_201_CREATED)
+        response = self.client.post(
+            "/api/recipes/shopping_cart/", {"recipes": [draft.id]},
+            format="json",
+        )
+        self.assertEqual(response.data, {draft.id: "added"})
+        self.client.force_authenticate(self.author)
+        self.assertEqual(
+            self.client.post(url).status_code, HTTP_404_NOT_FOUND
+        )
+        self.assertEqual(Favorite.objects.filter(recipe=draft).count(), 1)
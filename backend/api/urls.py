@@ -2,18 +2,22 @@ from django.urls import include, path
 from django.views.generic import TemplateView
 from rest_framework.routers import DefaultRouter
 
+from api.batch import BatchViewSet
 from api.views import (
     CustomUserViewSet,
     IngredientViewSet,
     RecipeViewSet,
+    SyncViewSet,
     TagViewSet,
 )
 
 app_name = "api"
 
 router = DefaultRouter()
+router.register("batch", BatchViewSet, basename="batch")
 router.register("ingredients", IngredientViewSet, basename="ingredients")
 router.register("recipes", RecipeViewSet, basename="recipes")
+router.register("sync", SyncViewSet, basename="sync")
 router.register("tags", TagViewSet, basename="tags")
 router.register("users", CustomUserViewSet, basename="users")
 
@@ -1,11 +1,17 @@
+from urllib.parse import quote
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum
-from django.http import Http404, HttpResponse
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework.viewsets import (
+    GenericViewSet,
     ModelViewSet,
     ReadOnlyModelViewSet,
 )
@@ -15,8 +21,10 @@ from rest_framework.status import (
     HTTP_204_NO_CONTENT,
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
+    HTTP_410_GONE,
 )
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
@@ -24,39 +32,83 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
 
 from api.filters import IngredientFilter, RecipeFilter
+from api import landing
+from api.landing import landing_page
+from api.mixins import (
+    RecipeMarksMixin,
+    ReplicaReadMixin,
+    SharedMarksMixin,
+    SparseFieldsetViewMixin,
+)
 from api.pagination import CustomLimitPagination
+from api.parsers import ImageUploadParser, MultiPartJSONParser
 from api.permissions import IsAdminAuthorOrReadOnly
 from api.serializer import (
     AvatarSerializer,
     CustomUserSerializer,
+    FeedQuerySerializer,
+    IngredientSearchSerializer,
     IngredientSerializer,
-    FavoriteCreateSerializer,
+    RecipeCoverageSerializer,
+    RecipeIdsSerializer,
+    RecipeImageSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
-    ShoppingCartCreateSerializer,
     ShortRecipeSerializer,
-    SubscriberCreateSerializer,
     SubscriberDetailSerializer,
+    SyncQuerySerializer,
     TagSerializer,
 )
+from core.thumbnails import ThumbnailError, thumbnails
+from core.utils import delete_returning, insert_ignore_conflicts
+from recipes import changelog, feed
+from recipes.counters import favorites_added, favorites_removed
+from recipes.deletion import delete_recipe, delete_user
+from recipes.ingredient_index import ingredient_index
+from recipes.search import search_snippets
+from recipes.short_links import is_live
 from recipes.models import (
+    Change,
+    Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
+    RecipeSimilarity,
+    ShoppingList,
     Tag,
 )
+from users.models import Subscription
 
 User = get_user_model()
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(
+    SharedMarksMixin, SparseFieldsetViewMixin, ReplicaReadMixin, UserViewSet
+):
     """Работает с пользователями."""
-    queryset = User.objects.all()
+    replica_actions = ("list", "retrieve", "me", "subscriptions")
+    fieldset_actions = replica_actions
+    lookup_value_regex = r"\d+"
+    queryset = User.objects.filter(deleted_at__isnull=True)
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = CustomLimitPagination
+    upload_field = "avatar"
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            queryset = queryset.only(
+                *CustomUserSerializer.columns(self.fieldset)
+            )
+        return queryset
+
+    def perform_destroy(self, instance):
+        """Пользователь отключается сразу, его данные удаляет фон."""
+        delete_user(instance)
 
     @action(["get"], detail=False, permission_classes=(IsAuthenticated,))
     def me(self, request, *args, **kwargs):
@@ -67,6 +119,7 @@ class CustomUserViewSet(UserViewSet):
         ["put"],
         detail=False,
         permission_classes=(IsAdminAuthorOrReadOnly,),
+        parser_classes=(JSONParser, MultiPartParser, ImageUploadParser),
         url_path="me/avatar",
     )
     def avatar(self, request, *args, **kwargs):
@@ -92,16 +145,15 @@ class CustomUserViewSet(UserViewSet):
         url_name="subscriptions",
     )
     def subscriptions(self, request):
-        user = request.user
-        queryset = (
-            user.follower
-            .select_related("author")
-            .prefetch_related("author__recipes")
-            .annotate(recipes_count=Count("author__recipes"))
+        queryset = SubscriberDetailSerializer.setup_queryset(
+            request.user.follower.filter(
+                author__deleted_at__isnull=True
+            ).order_by("-id"),
+            self.fieldset,
         )
         pages = self.paginate_queryset(queryset)
         serializer = SubscriberDetailSerializer(
-            pages, many=True, context={"request": request}
+            pages, many=True, context=self.get_serializer_context()
         )
         return self.get_paginated_response(serializer.data)
 
@@ -113,43 +165,58 @@ class CustomUserViewSet(UserViewSet):
         user = request.user
 
         if self.request.method == "POST":
-            author = get_object_or_404(User, id=id)
-            data = {"user": user.id, "author": author.id}
-            serializer = SubscriberCreateSerializer(
-                data=data, context={"request": request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            queryset = (
-                user.follower
-                .annotate(recipes_count=Count("author__recipes"))
-                .first()
-            )
+            author = get_object_or_404(self.queryset, id=id)
+            if author == user:
+                return Response(
+                    {"errors": "Вы не можете подписаться на себя"},
+                    status=HTTP_400_BAD_REQUEST,
+                )
+            with transaction.atomic():
+                created = insert_ignore_conflicts(
+                    Subscription, ("user", "author"), [(user.id, author.id)],
+                    "author",
+                )
+                changelog.list_changed(Subscription, user.id, added=created)
+            if not created:
+                return Response(
+                    {"errors": "Вы уже подписаны на этого пользователя"},
+                    status=HTTP_400_BAD_REQUEST,
+                )
+            feed.subscribed(user.id, author.id)
+            subscription = Subscription(user=user, author=author)
+            subscription.recipes_count = Recipe.published.filter(
+                author=author
+            ).count()
             serializer = SubscriberDetailSerializer(
-                queryset, context={"request": request}
+                subscription, context={"request": request}
             )
             return Response(
                 serializer.data, status=HTTP_201_CREATED
             )
 
         elif request.method == "DELETE":
-            if not User.objects.filter(id=id).exists():
-                return Response(
-                    {"errors": "Пользователь с данным ID не найден"},
-                    status=HTTP_404_NOT_FOUND,
+            with transaction.atomic():
+                deleted = delete_returning(
+                    Subscription, {"user": user.id}, "author", [int(id)]
+                )
+                changelog.list_changed(
+                    Subscription, user.id, removed=deleted
                 )
-            deleted_count, _ = user.follower.filter(
-                user=user, author_id=id
-            ).delete()
-            if deleted_count == 0:
+            if not deleted:
+                if not User.objects.filter(id=id).exists():
+                    return Response(
+                        {"errors": "Пользователь с данным ID не найден"},
+                        status=HTTP_404_NOT_FOUND,
+                    )
                 return Response(
                     {"errors": "Вы не подписаны на данного пользователя"},
                     status=HTTP_400_BAD_REQUEST,
                 )
+            feed.unsubscribed(user.id, int(id))
             return Response(status=HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, ReadOnlyModelViewSet):
     """Работает с тэгами."""
     permission_classes = (IsAdminAuthorOrReadOnly,)
     pagination_class = None
@@ -157,7 +224,7 @@ class TagViewSet(ReadOnlyModelViewSet):
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, ReadOnlyModelViewSet):
     """Работет с игридиентами."""
     permission_classes = (AllowAny,)
     queryset = Ingredient.objects.all()
@@ -167,21 +234,173 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     search_fields = ("^name",)
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(
+    RecipeMarksMixin,
+    SharedMarksMixin,
+    SparseFieldsetViewMixin,
+    ReplicaReadMixin,
+    ModelViewSet,
+):
     """Работает с рецептами."""
+    replica_actions = ("list", "retrieve", "download_shopping_cart")
+    fieldset_actions = ("list", "retrieve", "drafts", "subscription_feed")
+    lookup_value_regex = r"\d+"
     permission_classes = (IsAdminAuthorOrReadOnly,)
     pagination_class = CustomLimitPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    parser_classes = (JSONParser, MultiPartJSONParser)
+    upload_field = "image"
     queryset = Recipe.objects.select_related("author").prefetch_related(
-        "tags", "ingredients"
+        "tags", "recipe_ingredients__ingredient"
     )
+    detail_actions = (
+        "retrieve", "update", "partial_update", "destroy", "image", "similar"
+    )
+
+    def get_queryset(self):
+        queryset = self.visible_recipes(super().get_queryset())
+        if self.action in self.fieldset_actions:
+            queryset = RecipeReadSerializer.setup_queryset(
+                queryset, self.fieldset
+            )
+        return queryset
+
+    def visible_recipes(self, queryset):
+        """Публичные выборки идут только по опубликованным рецептам.
+
+        Черновик виден автору и администратору при обращении по id,
+        а в списках — только в ``drafts``. Автор публикует рецепт и
+        снимает с публикации полем ``is_published``.
+        """
+        user = self.request.user
+        if self.action == "drafts":
+            return queryset.filter(
+                author=user, is_published=Recipe.Status.DRAFT
+            )
+        if self.action in self.detail_actions and user.is_authenticated:
+            if user.is_superuser:
+                return queryset
+            return queryset.filter(
+                Q(is_published=Recipe.Status.PUBLISHED) | Q(author=user)
+            )
+        return queryset.filter(is_published=Recipe.Status.PUBLISHED)
+
+    def perform_destroy(self, instance):
+        """Рецепт скрывается сразу, связанные строки удаляет фон."""
+        delete_recipe(instance)
+        landing.forget(instance.id)
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get("many") and args:
+            kwargs["context"] = self.recipe_context(args[0])
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
-        if self.action in ("list", "retrieve", "get-link"):
+        if self.action in ("list", "retrieve", "drafts"):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        query = request.query_params.get("search", "").strip()
+        if query and self.fieldset.wants("search_snippet"):
+            ids = [recipe.id for recipe in self.paginator.page]
+            snippets = search_snippets(
+                ids, query, using=self.get_queryset().db
+            )
+            for pk, recipe in zip(ids, response.data["results"]):
+                recipe["search_snippet"] = snippets.get(pk)
+        return response
+
+    @action(
+        detail=False,
+        methods=("GET",),
+        permission_classes=(IsAuthenticated,),
+        url_path="drafts",
+        url_name="drafts",
+    )
+    def drafts(self, request):
+        """Неопубликованные рецепты текущего пользователя."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=("GET",),
+        permission_classes=(IsAuthenticated,),
+        url_path="feed",
+        url_name="feed",
+    )
+    def subscription_feed(self, request):
+        """Рецепты авторов из подписок, постранично по ``before``."""
+        serializer = FeedQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        limit = serializer.validated_data["limit"]
+        before = serializer.validated_data.get("before")
+        ids = feed.read_feed(request.user, limit, before)
+        recipes = self.get_queryset().in_bulk(ids)
+        recipes = [recipes[pk] for pk in ids if pk in recipes]
+        serializer = RecipeReadSerializer(
+            recipes, many=True, context=self.recipe_context(recipes)
+        )
+        next_url = None
+        if len(ids) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "before", ids[-1]
+            )
+        return Response({"next": next_url, "results": serializer.data})
+
+    @action(
+        detail=False,
+        methods=("GET",),
+        permission_classes=(AllowAny,),
+        url_path="by_ingredients",
+        url_name="by_ingredients",
+    )
+    def by_ingredients(self, request):
+        """Что приготовить из имеющихся ингредиентов."""
+        serializer = IngredientSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        matches = ingredient_index.search(**serializer.validated_data)
+        page = self.paginate_queryset(matches)
+        recipes = self.get_queryset().in_bulk(
+            [match.recipe_id for match in page]
+        )
+        results = []
+        for match in page:
+            recipe = recipes.get(match.recipe_id)
+            if recipe is not None:
+                recipe.matched_ingredients = match.matched
+                recipe.missing_ingredients = match.missing
+                results.append(recipe)
+        serializer = RecipeCoverageSerializer(
+            results, many=True, context={"request": request}
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=("GET",),
+        permission_classes=(AllowAny,),
+        url_path="similar",
+        url_name="similar",
+    )
+    def similar(self, request, pk):
+        """Рецепты, которые добавляют вместе с этим."""
+        recipe = get_object_or_404(
+            self.visible_recipes(Recipe.objects.only("id")), id=pk
+        )
+        similarities = RecipeSimilarity.objects.filter(
+            recipe=recipe, similar__is_published=Recipe.Status.PUBLISHED
+        ).select_related("similar")
+        recipes = [similarity.similar for similarity in similarities]
+        serializer = ShortRecipeSerializer(
+            recipes, many=True, context={"request": request}
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=("GET",),
@@ -190,13 +409,175 @@ class RecipeViewSet(ModelViewSet):
         url_name="get-link",
     )
     def get_link(self, request, pk=None):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        reverse_link = reverse("short_url", args=[recipe.pk])
+        if not is_live(int(pk)):
+            raise Http404
+        reverse_link = reverse("short_url", args=[int(pk)])
         return Response(
             {"short-link": request.build_absolute_uri(reverse_link)},
             status=HTTP_200_OK,
         )
 
+    @action(
+        detail=True,
+        methods=("PUT",),
+        parser_classes=(JSONParser, MultiPartParser, ImageUploadParser),
+        url_path="image",
+        url_name="image",
+    )
+    def image(self, request, pk):
+        """Замена фотографии: телом запроса, в multipart или base64."""
+        recipe = self.get_object()
+        serializer = RecipeImageSerializer(
+            recipe, data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(serializer.data)
+
+    @staticmethod
+    def list_changed(model, user, added=(), removed=()):
+        changelog.list_changed(model, user.id, added, removed)
+        if model is Favorite:
+            favorites_added(added)
+            favorites_removed(removed)
+
+    def listable_recipes(self):
+        """Опубликованные рецепты и черновики самого пользователя."""
+        return Recipe.objects.filter(
+            Q(is_published=Recipe.Status.PUBLISHED)
+            | Q(author=self.request.user)
+        )
+
+    def add_to_list(self, model, request, pk, error):
+        recipe = get_object_or_404(
+            self.listable_recipes().only(
+                "id", "name", "image", "cooking_time"
+            ),
+            id=pk,
+        )
+        with transaction.atomic():
+            added = insert_ignore_conflicts(
+                model, ("user", "recipe"), [(request.user.id, recipe.id)],
+                "recipe",
+            )
+            self.list_changed(model, request.user, added=added)
+        if not added:
+            return Response(
+                {"detail": error.format(name=recipe.name)},
+                status=HTTP_400_BAD_REQUEST,
+            )
+        serializer = ShortRecipeSerializer(
+            recipe, context={"request": request}
+        )
+        return Response(serializer.data, status=HTTP_201_CREATED)
+
+    def remove_from_list(self, model, request, pk, error):
+        with transaction.atomic():
+            deleted = delete_returning(
+                model, {"user": request.user.id}, "recipe", [int(pk)]
+            )
+            self.list_changed(model, request.user, removed=deleted)
+        if not deleted:
+            recipe = get_object_or_404(Recipe.objects.only("name"), id=pk)
+            return Response(
+                {"detail": error.format(name=recipe.name)},
+                status=HTTP_400_BAD_REQUEST,
+            )
+        return Response(status=HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def requested_ids(request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["recipes"]
+
+    @staticmethod
+    def batch_result(ids, found, added=(), removed=(), default="exists"):
+        result = {}
+        for pk in ids:
+            if pk not in found:
+                result[pk] = "not_found"
+            elif pk in removed:
+                result[pk] = "removed"
+            elif pk in added:
+                result[pk] = "added"
+            else:
+                result[pk] = default
+        return result
+
+    def add_many(self, model, request):
+        """Добавляет рецепты в список пользователя одним INSERT.
+
+        В ответе для каждого id: ``added``, ``exists`` или ``not_found``.
+        """
+        ids = self.requested_ids(request)
+        found = set(
+            self.listable_recipes().filter(id__in=ids)
+            .values_list("id", flat=True)
+        )
+        with transaction.atomic():
+            added = insert_ignore_conflicts(
+                model,
+                ("user", "recipe"),
+                [(request.user.id, pk) for pk in found],
+                "recipe",
+            )
+            self.list_changed(model, request.user, added=added)
+        return Response(
+            self.batch_result(ids, found, added=added), status=HTTP_200_OK
+        )
+
+    def remove_many(self, model, request):
+        """Убирает рецепты из списка: ``removed`` или ``absent``."""
+        ids = self.requested_ids(request)
+        with transaction.atomic():
+            removed = delete_returning(
+                model, {"user": request.user.id}, "recipe", ids
+            )
+            self.list_changed(model, request.user, removed=removed)
+        return Response(
+            self.batch_result(ids, ids, removed=removed, default="absent"),
+            status=HTTP_200_OK,
+        )
+
+    def clear_list(self, model, request):
+        with transaction.atomic():
+            removed = delete_returning(
+                model, {"user": request.user.id}, "recipe"
+            )
+            self.list_changed(model, request.user, removed=removed)
+        return Response({"removed": len(removed)}, status=HTTP_200_OK)
+
+    def toggle_list(self, model, request):
+        """Переключает наличие рецептов в списке пользователя.
+
+        В ответе для каждого id: ``added``, ``removed``, ``exists``
+        (добавлен параллельным запросом) или ``not_found``.
+        """
+        ids = self.requested_ids(request)
+        found = set(
+            self.listable_recipes().filter(id__in=ids)
+            .values_list("id", flat=True)
+        )
+        with transaction.atomic():
+            removed = delete_returning(
+                model, {"user": request.user.id}, "recipe", list(found)
+            )
+            added = insert_ignore_conflicts(
+                model,
+                ("user", "recipe"),
+                [(request.user.id, pk) for pk in found - removed],
+                "recipe",
+            )
+            self.list_changed(
+                model, request.user, added=added, removed=removed
+            )
+        return Response(
+            self.batch_result(ids, found, added=added, removed=removed),
+            status=HTTP_200_OK,
+        )
+
     @action(
         detail=True,
         methods=("POST", "DELETE",),
@@ -205,33 +586,46 @@ class RecipeViewSet(ModelViewSet):
         url_name="shopping_cart",
     )
     def shopping_cart(self, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-
         if request.method == "POST":
-            data = {"user": user.id, "recipe": recipe.id}
-            serializer = ShoppingCartCreateSerializer(
-                data=data, context={"request": request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            serializer = ShortRecipeSerializer(
-                recipe, context={"request": request}
-            )
-            return Response(
-                serializer.data, status=HTTP_201_CREATED
+            return self.add_to_list(
+                ShoppingList, request, pk,
+                'Рецепт "{name}" уже добавлен в список покупок.',
             )
+        return self.remove_from_list(
+            ShoppingList, request, pk, '"{name}" отсутствует в покупках.'
+        )
 
-        elif request.method == "DELETE":
-            deleted_count, _ = user.shopping_list.filter(
-                user=user, recipe=recipe
-            ).delete()
-            if deleted_count == 0:
-                return Response(
-                    {"detail": f'"{recipe.name}" отсутствует в покупках.'},
-                    status=HTTP_400_BAD_REQUEST,
-                )
-            return Response(status=HTTP_204_NO_CONTENT)
+    @action(
+        detail=False,
+        methods=("POST", "DELETE"),
+        permission_classes=(IsAuthenticated,),
+        url_path="shopping_cart",
+        url_name="shopping_cart_bulk",
+    )
+    def shopping_cart_bulk(self, request):
+        if request.method == "POST":
+            return self.add_many(ShoppingList, request)
+        return self.remove_many(ShoppingList, request)
+
+    @action(
+        detail=False,
+        methods=("DELETE",),
+        permission_classes=(IsAuthenticated,),
+        url_path="shopping_cart/clear",
+        url_name="shopping_cart_clear",
+    )
+    def shopping_cart_clear(self, request):
+        return self.clear_list(ShoppingList, request)
+
+    @action(
+        detail=False,
+        methods=("POST",),
+        permission_classes=(IsAuthenticated,),
+        url_path="shopping_cart/toggle",
+        url_name="shopping_cart_toggle",
+    )
+    def shopping_cart_toggle(self, request):
+        return self.toggle_list(ShoppingList, request)
 
     @staticmethod
     def shopping_list_to_txt(ingredients):
@@ -267,38 +661,166 @@ class RecipeViewSet(ModelViewSet):
         url_name="favorite",
     )
     def favorite(self, request, pk):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-
         if request.method == "POST":
-            data = {"user": user.id, "recipe": recipe.id}
-            serializer = FavoriteCreateSerializer(
-                data=data, context={"request": request}
+            return self.add_to_list(
+                Favorite, request, pk,
+                'Рецепт "{name}" уже добавлен в избранное.',
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            serializer = ShortRecipeSerializer(
-                recipe, context={"request": request}
+        return self.remove_from_list(
+            Favorite, request, pk, 'Рецепт "{name}" не в избранном.'
+        )
+
+    @action(
+        detail=False,
+        methods=("POST", "DELETE"),
+        permission_classes=(IsAuthenticated,),
+        url_path="favorite",
+        url_name="favorite_bulk",
+    )
+    def favorite_bulk(self, request):
+        if request.method == "POST":
+            return self.add_many(Favorite, request)
+        return self.remove_many(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=("DELETE",),
+        permission_classes=(IsAuthenticated,),
+        url_path="favorite/clear",
+        url_name="favorite_clear",
+    )
+    def favorite_clear(self, request):
+        return self.clear_list(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=("POST",),
+        permission_classes=(IsAuthenticated,),
+        url_path="favorite/toggle",
+        url_name="favorite_toggle",
+    )
+    def favorite_toggle(self, request):
+        return self.toggle_list(Favorite, request)
+
+
+class SyncViewSet(RecipeMarksMixin, SparseFieldsetViewMixin, GenericViewSet):
+    """Дельта-синхронизация для офлайн- и мобильных клиентов.
+
+    Без ``since`` возвращает только текущий токен: клиент загружает
+    списки обычными запросами и дальше спрашивает изменения после
+    токена. Рецепты отдаются целиком (с учётом ``?fields=``), записи
+    списков и подписок — id рецептов и авторов.
+    """
+    permission_classes = (IsAuthenticated,)
+    fieldset_actions = ("list",)
+    list_names = {
+        Change.Kind.FAVORITE: "favorites",
+        Change.Kind.SHOPPING_CART: "shopping_cart",
+        Change.Kind.SUBSCRIPTION: "subscriptions",
+    }
+
+    def list(self, request):
+        serializer = SyncQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        since = serializer.validated_data.get("since")
+        if since is None:
+            return Response(
+                {"token": changelog.settled_token(), "has_more": False}
             )
+        if changelog.is_unknown(since):
             return Response(
-                serializer.data, status=HTTP_201_CREATED
+                {"errors": "Неизвестный токен, загрузите данные заново"},
+                status=HTTP_410_GONE,
             )
+        changes, token, has_more = changelog.changes_since(
+            request.user, since, serializer.validated_data["limit"]
+        )
+        return Response(
+            {"token": token, "has_more": has_more, **self.payload(changes)}
+        )
 
-        elif request.method == "DELETE":
-            deleted_count, _ = user.favorite.filter(
-                user=user, recipe=recipe
-            ).delete()
-            if deleted_count == 0:
-                return Response(
-                    {"detail": f'Рецепт "{recipe.name}" не в избранном.'},
-                    status=HTTP_400_BAD_REQUEST,
+    def payload(self, changes):
+        payload = {
+            name: {"added": [], "removed": []}
+            for name in self.list_names.values()
+        }
+        updated, deleted = [], []
+        for change in changes:
+            if change.kind == Change.Kind.RECIPE:
+                (deleted if change.deleted else updated).append(
+                    change.object_id
                 )
-            return Response(status=HTTP_204_NO_CONTENT)
+                continue
+            entries = payload[self.list_names[change.kind]]
+            entries["removed" if change.deleted else "added"].append(
+                change.object_id
+            )
+        recipes = self.visible_recipes(updated)
+        deleted += [pk for pk in updated if pk not in recipes]
+        recipes = [recipes[pk] for pk in updated if pk in recipes]
+        payload["recipes"] = {
+            "updated": RecipeReadSerializer(
+                recipes, many=True, context=self.recipe_context(recipes)
+            ).data,
+            "deleted": deleted,
+        }
+        return payload
+
+    def visible_recipes(self, ids):
+        """Опубликованные рецепты и черновики самого пользователя."""
+        queryset = Recipe.objects.filter(
+            Q(is_published=Recipe.Status.PUBLISHED)
+            | Q(author=self.request.user),
+            id__in=ids,
+        )
+        return RecipeReadSerializer.setup_queryset(
+            queryset, self.fieldset
+        ).in_bulk()
+
+
+@require_GET
+def thumbnail(request, preset, name):
+    """Уменьшенная копия изображения из ``MEDIA_ROOT``.
+
+    Копию отдаёт nginx по ``X-Accel-Redirect``; воркер только
+    проверяет, что она есть, и при необходимости строит её.
+    """
+    try:
+        path, content_type = thumbnails.get(
+            name, preset, request.headers.get("Accept", "")
+        )
+    except ThumbnailError:
+        raise Http404(f'Нет изображения "{name}".')
+    if settings.THUMBNAIL_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(
+            f"{settings.THUMBNAIL_ACCEL_PREFIX}{path.as_posix()}"
+        )
+    else:
+        response = FileResponse(
+            open(thumbnails.root / path, "rb"), content_type=content_type
+        )
+    patch_vary_headers(response, ("Accept",))
+    patch_cache_control(
+        response, public=True, max_age=settings.THUMBNAIL_CACHE_SECONDS
+    )
+    return response
 
 
 @require_GET
 def short_url(request, pk):
-    if not Recipe.objects.filter(pk=pk).exists():
+    """Редирект по короткой ссылке; для известных рецептов без запросов."""
+    if not is_live(pk):
         raise Http404(f'Рецепт с id "{pk}" не существует.')
 
-    return redirect(f"/recipes/{pk}/")
+    return short_link_response(pk, landing_page(pk, request))
+
+
+def short_link_response(pk, page):
+    """Страница рецепта или редирект на неё с заголовками кеширования."""
+    max_age = settings.SHORT_LINK_PAGE_CACHE_TTL
+    if page is None:
+        page = redirect(f"/recipes/{pk}/")
+        max_age = settings.SHORT_LINK_CACHE_SECONDS
+    patch_cache_control(page, public=True, max_age=max_age)
+    return page
@@ -0,0 +1,111 @@
+"""Общие настройки админки для больших таблиц.
+"""
+from django.contrib.admin import ModelAdmin
+from django.core import checks
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Ниже этого числа строк точный COUNT(*) дёшев и оценка не нужна.
+ESTIMATE_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Число строк PostgreSQL-таблицы без фильтров списка берётся из
+    статистики планировщика вместо полного COUNT(*).
+
+    ``base`` — исходный queryset админки: его собственные условия
+    (например, скрытие удалённых, которых ещё чистит фон) фильтром не
+    считаются, оценки по всей таблице для них достаточно.
+    """
+
+    def __init__(self, *args, base=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base = base
+
+    @property
+    def unfiltered(self):
+        where = self.object_list.query.where
+        if self.base is None:
+            return not where
+        return where == self.base.query.where
+
+    def estimated_count(self):
+        """Оценка числа строк таблицы или ``None`` не на PostgreSQL."""
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = %s::regclass",
+                (queryset.model._meta.db_table,),
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @cached_property
+    def count(self):
+        if self.unfiltered:
+            estimate = self.estimated_count()
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class EstimatedCountMixin:
+    """Список без второго COUNT(*) по всей таблице при фильтрации."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(
+        self, request, queryset, per_page, orphans=0,
+        allow_empty_first_page=True,
+    ):
+        return self.paginator(
+            queryset,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            base=self.get_queryset(request),
+        )
+
+
+class LargeTableAdmin(EstimatedCountMixin, ModelAdmin):
+    """Список больших таблиц: оценка числа строк, короткие страницы."""
+    list_per_page = 50
+    ordering = ("-id",)
+
+
+class BackgroundDeletionMixin:
+    """Удаление из админки скрывает объект, остальное делает фон.
+
+    Страница подтверждения не собирает связанные объекты: для автора
+    с тысячами рецептов это загрузило бы их все в память.
+    """
+    # Функция, которая скрывает объект и ставит его удаление в очередь:
+    # ``soft_delete = staticmethod(deletion.delete_user)``.
+    soft_delete = None
+
+    def check(self, **kwargs):
+        errors = super().check(**kwargs)
+        if self.soft_delete is None:
+            errors.append(checks.Error(
+                "Не задана функция удаления soft_delete.",
+                obj=self.__class__,
+                id="core.E001",
+            ))
+        return errors
+
+    def delete_model(self, request, obj):
+        self.soft_delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            self.soft_delete(obj)
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        model_count = {self.model._meta.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, set(), []
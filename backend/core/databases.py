@@ -0,0 +1,72 @@
+"""Сборка настроек подключения к базам данных из переменных окружения.
+"""
+import os
+
+SQLITE_ENGINE = "django.db.backends.sqlite3"
+POSTGRES_ENGINE = "django.db.backends.postgresql"
+
+SQLITE_INIT_COMMAND = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA temp_store=MEMORY;"
+)
+
+
+def env_bool(name, default=False):
+    return os.getenv(name, str(default)) == "True"
+
+
+def sqlite_database(path):
+    """SQLite для локального запуска: WAL и ожидание блокировки."""
+    return {
+        "ENGINE": SQLITE_ENGINE,
+        "NAME": path,
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "init_command": SQLITE_INIT_COMMAND,
+            "timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 20)),
+            "transaction_mode": "IMMEDIATE",
+        },
+    }
+
+
+def postgres_database(prefix="DB"):
+    """PostgreSQL с постоянными соединениями или пулом драйвера.
+
+    Настройки соединений и пула читаются из ``{prefix}_CONN_MAX_AGE``,
+    ``{prefix}_POOL`` и т. д., а без них — из тех же ``DB_*``, что и
+    для основной базы. Пул — ``psycopg_pool`` из psycopg 3, он
+    несовместим с ``CONN_MAX_AGE``, поэтому при его включении
+    соединения не удерживаются самим Django.
+    """
+    def setting(name, default):
+        return os.getenv(f"{prefix}_{name}", os.getenv(f"DB_{name}", default))
+
+    database = {
+        "ENGINE": os.getenv(f"{prefix}_ENGINE", POSTGRES_ENGINE),
+        "NAME": os.getenv(f"{prefix}_NAME", os.getenv(
+            "POSTGRES_DB", "postgres"
+        )),
+        "USER": os.getenv(f"{prefix}_USER", os.getenv(
+            "POSTGRES_USER", "postgres"
+        )),
+        "PASSWORD": os.getenv(f"{prefix}_PASSWORD", os.getenv(
+            "POSTGRES_PASSWORD", "postgres"
+        )),
+        "HOST": os.getenv(f"{prefix}_HOST", "db"),
+        "PORT": os.getenv(f"{prefix}_PORT", "5432"),
+        "CONN_MAX_AGE": int(setting("CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "connect_timeout": int(setting("CONNECT_TIMEOUT", 5)),
+        },
+    }
+    if env_bool(f"{prefix}_POOL", env_bool("DB_POOL")):
+        database["CONN_MAX_AGE"] = 0
+        database["OPTIONS"]["pool"] = {
+            "min_size": int(setting("POOL_MIN_SIZE", 2)),
+            "max_size": int(setting("POOL_MAX_SIZE", 10)),
+            "timeout": int(setting("POOL_TIMEOUT", 10)),
+        }
+    return database
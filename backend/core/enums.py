@@ -43,3 +43,17 @@ class Limits(IntEnum):
     MAX_VALUE_COOKING_TIME = 32000
 
     MIN_VALUE_COOKING_TIME = 1
+
+    MAX_BATCH_RECIPES = 100
+
+    FEED_FANOUT_MAX_FOLLOWERS = 1000
+
+    FEED_BACKFILL_RECIPES = 20
+
+    FEED_FANOUT_BATCH = 1000
+
+    SIMILAR_RECIPES = 10
+
+    MAX_SYNC_CHANGES = 500
+
+    MAX_BATCH_REQUESTS = 20
@@ -0,0 +1,64 @@
+"""Публикация и подписка внутри процесса на asyncio.
+
+Подписчик — очередь в цикле событий, без отдельного потока, поэтому
+тысячи простаивающих подписчиков стоят только памяти под очереди.
+Методы вызываются из потока цикла событий.
+"""
+import asyncio
+
+
+class Subscription:
+    """Очередь сообщений одного подписчика.
+
+    Если подписчик не успевает разбирать очередь, новые сообщения
+    отбрасываются и поднимается ``overflowed``: клиенту пора заново
+    загрузить данные.
+    """
+
+    def __init__(self, topic, maxsize):
+        self.topic = topic
+        self.overflowed = False
+        self._queue = asyncio.Queue(maxsize)
+
+    def put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout=None):
+        """Следующее сообщение или ``None`` по истечении ``timeout``."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Hub:
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._topics = {}
+
+    def subscribe(self, topic):
+        subscription = Subscription(topic, self.maxsize)
+        self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscribers = self._topics.get(subscription.topic, set())
+        subscribers.discard(subscription)
+        if not subscribers:
+            self._topics.pop(subscription.topic, None)
+
+    def publish(self, topic, message):
+        for subscription in self._topics.get(topic, ()):
+            subscription.put(message)
+
+    def has_subscribers(self, topic=None):
+        if topic is None:
+            return bool(self._topics)
+        return topic in self._topics
+
+    def __len__(self):
+        return sum(map(len, self._topics.values()))
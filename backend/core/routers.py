@@ -0,0 +1,42 @@
+"""Маршрутизация запросов чтения на реплики БД.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY_DATABASE = "default"
+
+_read_database = ContextVar("read_database", default=None)
+
+
+class ReplicaRouter:
+    """Чтения уходят на реплику только внутри ``read_from_replica``.
+
+    Вне этого контекста (записи, миграции, команды, неразрешённые
+    представления) роутер возвращает основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get() or PRIMARY_DATABASE
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DATABASE
+
+
+def read_from_replica():
+    """Переключает чтения на случайную реплику, возвращает токен сброса."""
+    if not settings.REPLICA_DATABASES:
+        return None
+    return _read_database.set(random.choice(settings.REPLICA_DATABASES))
+
+
+def read_from_primary(token):
+    if token is not None:
+        _read_database.reset(token)
@@ -0,0 +1,58 @@
+"""Общие заготовки для тестов приложений."""
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+User = get_user_model()
+
+# Картинка 1×1 для полей Base64ImageField.
+PIXEL = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA"
+    "DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=="
+)
+
+
+def create_user(username, **fields):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="Pa55-word-for-tests",
+        first_name=username,
+        last_name=username,
+        **fields,
+    )
+
+
+def create_recipe(author, name="Рецепт", ingredients=(), **fields):
+    """Опубликованный рецепт; ``ingredients`` — пары (ингредиент, кол-во)."""
+    fields.setdefault("is_published", Recipe.Status.PUBLISHED)
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text=fields.pop("text", f"Как приготовить {name}"),
+        image="photos/test.png",
+        cooking_time=fields.pop("cooking_time", 10),
+        **fields,
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients
+    )
+    return recipe
+
+
+def create_ingredient(name, unit="г"):
+    return Ingredient.objects.create(name=name, measurement_unit=unit)
+
+
+class UserAPITestCase(APITestCase):
+    """Клиент API от имени пользователя ``self.user``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("cook")
+        cls.author = create_user("author")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
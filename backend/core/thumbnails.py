@@ -0,0 +1,145 @@
+"""Уменьшенные копии загруженных изображений.
+
+Копия строится один раз на пресет и формат и хранится на диске в
+``THUMBNAIL_ROOT``. Общий размер каталога ограничен
+``THUMBNAIL_CACHE_BYTES``: при превышении удаляются копии, к которым
+дольше всего не обращались — время обращения хранится в mtime файла.
+Сами файлы отдаёт nginx, воркер только находит или строит копию.
+"""
+import os
+from collections import namedtuple
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+Preset = namedtuple("Preset", "width height")
+Format = namedtuple("Format", "pillow extension content_type")
+
+PRESETS = {
+    "card": Preset(760, 560),
+    "small": Preset(144, 144),
+    "avatar": Preset(96, 96),
+}
+WEBP = Format("WEBP", "webp", "image/webp")
+JPEG = Format("JPEG", "jpg", "image/jpeg")
+PNG = Format("PNG", "png", "image/png")
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+TRANSPARENT_EXTENSIONS = {".png", ".gif", ".webp"}
+QUALITY = 82
+# Чаще mtime не обновляется, чтобы попадание не было записью на диск.
+TOUCH_INTERVAL = 60 * 60
+# Вытеснение освобождает место с запасом, а не до самой границы.
+EVICT_TO = 0.9
+
+
+class ThumbnailError(Exception):
+    """Нет такого пресета, исходного файла или это не изображение."""
+
+
+def negotiate(accept, name):
+    """Формат копии по заголовку ``Accept`` и типу исходного файла."""
+    if WEBP.content_type in accept:
+        return WEBP
+    if Path(name).suffix.lower() in TRANSPARENT_EXTENSIONS:
+        return PNG
+    return JPEG
+
+
+class ThumbnailCache:
+
+    def __init__(self):
+        self._lock = Lock()
+        self._usage = None
+
+    @property
+    def root(self):
+        return Path(settings.THUMBNAIL_ROOT)
+
+    def get(self, name, preset, accept=""):
+        """Путь к копии относительно ``root`` и её тип содержимого."""
+        if preset not in PRESETS:
+            raise ThumbnailError(preset)
+        if Path(name).suffix.lower() not in SOURCE_EXTENSIONS:
+            raise ThumbnailError(name)
+        try:
+            source = Path(safe_join(settings.MEDIA_ROOT, name))
+        except SuspiciousFileOperation:
+            raise ThumbnailError(name)
+        image_format = negotiate(accept, name)
+        relative = Path(preset, f"{name}.{image_format.extension}")
+        target = self.root / relative
+        try:
+            stat = target.stat()
+        except FileNotFoundError:
+            self._build(source, target, PRESETS[preset], image_format)
+        else:
+            if time() - stat.st_mtime > TOUCH_INTERVAL:
+                os.utime(target)
+        return relative, image_format.content_type
+
+    def _build(self, source, target, preset, image_format):
+        try:
+            with Image.open(source) as image:
+                image = ImageOps.exif_transpose(image)
+                thumbnail = ImageOps.fit(
+                    image, (preset.width, preset.height), Image.LANCZOS
+                )
+        except (FileNotFoundError, UnidentifiedImageError):
+            raise ThumbnailError(source)
+        if thumbnail.mode not in ("RGB", "RGBA"):
+            thumbnail = thumbnail.convert("RGBA")
+        if image_format is JPEG and thumbnail.mode != "RGB":
+            thumbnail = thumbnail.convert("RGB")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Запись во временный файл и переименование: параллельный
+        # запрос не увидит наполовину записанную копию.
+        with NamedTemporaryFile(dir=target.parent, delete=False) as file:
+            thumbnail.save(file, image_format.pillow, quality=QUALITY)
+        os.replace(file.name, target)
+        self._account(target.stat().st_size)
+
+    def _files(self):
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _account(self, size):
+        with self._lock:
+            if self._usage is None:
+                self._usage = sum(size for _, size, _ in self._files())
+            else:
+                self._usage += size
+            if self._usage > settings.THUMBNAIL_CACHE_BYTES:
+                self._evict()
+
+    def _evict(self):
+        """Удаляет давно не запрошенные копии, пока не уложится в бюджет.
+
+        Каталог пересчитывается целиком: его меняют и другие процессы.
+        """
+        files = sorted(self._files())
+        usage = sum(size for _, size, _ in files)
+        budget = settings.THUMBNAIL_CACHE_BYTES * EVICT_TO
+        for _, size, path in files:
+            if usage <= budget:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            usage -= size
+        self._usage = usage
+
+
+thumbnails = ThumbnailCache()
@@ -1,3 +1,6 @@
+from django.db import connections, migrations, router
+
+
 def get_serializer_method_field_value(
     context, model, obj, user_field, object_field
 ):
@@ -10,3 +13,126 @@ def get_serializer_method_field_value(
             }
         ).exists()
     )
+
+
+def _table_and_columns(model, fields):
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    columns = [quote(model._meta.get_field(field).column) for field in fields]
+    return connection, quote(model._meta.db_table), columns
+
+
+def insert_ignore_conflicts(model, fields, rows, returning):
+    """Вставляет строки одним INSERT ... ON CONFLICT DO NOTHING.
+
+    Возвращает множество значений поля ``returning`` у реально
+    вставленных строк: повторная вставка той же пары ничего не меняет
+    и не попадает в результат, поэтому одновременные запросы
+    не приводят к ошибке уникальности.
+    """
+    if not rows:
+        return set()
+    connection, table, columns = _table_and_columns(
+        model, (*fields, returning)
+    )
+    *columns, returning_column = columns
+    values = ", ".join(
+        ["(" + ", ".join(["%s"] * len(fields)) + ")"] * len(rows)
+    )
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} "
+        f"ON CONFLICT DO NOTHING RETURNING {returning_column}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def add_on_conflict(model, keys, rows, add=(), latest=()):
+    """Вставляет строки или прибавляет их значения к уже существующим.
+
+    Один ``INSERT ... ON CONFLICT (keys) DO UPDATE``: поля ``add``
+    складываются со значениями строки, поля ``latest`` заменяются
+    новыми, если те не ``NULL``. Значения в ``rows`` идут в порядке
+    ``keys``, ``add``, ``latest``; ключи в пачке не повторяются.
+    """
+    if not rows:
+        return
+    fields = (*keys, *add, *latest)
+    connection, table, columns = _table_and_columns(model, fields)
+    key_columns = columns[:len(keys)]
+    add_columns = columns[len(keys):len(keys) + len(add)]
+    latest_columns = columns[len(keys) + len(add):]
+    assignments = [
+        f"{column} = {table}.{column} + EXCLUDED.{column}"
+        for column in add_columns
+    ] + [
+        f"{column} = COALESCE(EXCLUDED.{column}, {table}.{column})"
+        for column in latest_columns
+    ]
+    values = ", ".join(
+        ["(" + ", ".join(["%s"] * len(fields)) + ")"] * len(rows)
+    )
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values} "
+        f"ON CONFLICT ({', '.join(key_columns)}) "
+        f"DO UPDATE SET {', '.join(assignments)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+
+
+def delete_returning(model, filters, field, values=None):
+    """Удаляет строки одним DELETE ... RETURNING.
+
+    ``filters`` — точные условия по полям, ``field`` и ``values`` —
+    условие IN (без ``values`` удаляются все строки по ``filters``).
+    Возвращает множество значений ``field`` удалённых строк.
+    """
+    if values is not None and not values:
+        return set()
+    connection, table, columns = _table_and_columns(
+        model, (*filters, field)
+    )
+    *columns, field_column = columns
+    conditions = [f"{column} = %s" for column in columns]
+    params = list(filters.values())
+    if values is not None:
+        conditions.append(
+            f"{field_column} IN ({', '.join(['%s'] * len(values))})"
+        )
+        params.extend(values)
+    sql = (
+        f"DELETE FROM {table} WHERE {' AND '.join(conditions)} "
+        f"RETURNING {field_column}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def prefix_search_indexes(table, *columns):
+    """Миграция: индексы под поиск по префиксу без учёта регистра.
+
+    Django строит ``istartswith`` на PostgreSQL как
+    ``UPPER(column::text) LIKE UPPER('префикс%')``; обычный индекс по
+    столбцу для этого не подходит. На SQLite операция ничего не делает.
+    """
+    names = [f"{table}_{column}_prefix_idx" for column in columns]
+
+    def create(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for name, column in zip(names, columns):
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                f"(UPPER({column}::text) text_pattern_ops)"
+            )
+
+    def drop(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for name in names:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+    return migrations.RunPython(create, drop)
@@ -9,8 +9,27 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
-application = get_asgi_application()
+# Пути долгих потоков событий. Обычно Django выделяет каждому запросу
+# свой поток для синхронного кода на всё время ответа; соединение
+# потока событий открыто часами, поэтому его синхронная часть
+# (middleware, сигналы, ORM при подключении) идёт в общий поток.
+STREAM_PATHS = ('/api/stream/',)
+
+
+class StreamingASGIHandler(ASGIHandler):
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in STREAM_PATHS:
+            await self.handle(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+
+django.setup(set_prefix=False)
+
+application = StreamingASGIHandler()
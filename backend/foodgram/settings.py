@@ -3,6 +3,8 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+from core.databases import SQLITE_ENGINE, postgres_database, sqlite_database
+
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -11,7 +13,9 @@ SECRET_KEY = os.getenv('SECRET_KEY', 123)
 
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '127.0.0.1,localhost').split(',')
 
-IS_LOCAL = True
+DB_ENGINE = os.getenv('DB_ENGINE', SQLITE_ENGINE)
+
+IS_LOCAL = DB_ENGINE == SQLITE_ENGINE
 
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
@@ -33,6 +37,7 @@ INSTALLED_APPS = [
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
     'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
@@ -71,24 +76,29 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 if IS_LOCAL:
     DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
-        }
+        'default': sqlite_database(BASE_DIR / 'db.sqlite3'),
     }
 
 else:
     DATABASES = {
-        'default': {
-            'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
-            'NAME': os.getenv('POSTGRES_DB', default='postgres'),
-            'USER': os.getenv('POSTGRES_USER', default='postgres'),
-            'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
-            'HOST': os.getenv('DB_HOST', default='db'),
-            'PORT': os.getenv('DB_PORT', default='5432')
-        }
+        'default': postgres_database('DB'),
     }
 
+# Реплика для чтения: на SQLite достаточно указать путь к копии базы.
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = (
+        sqlite_database(os.getenv('DB_REPLICA_NAME'))
+        if IS_LOCAL else postgres_database('DB_REPLICA')
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает только из основной БД.
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
 
 AUTH_USER_MODEL = 'users.MyUser'
 
@@ -117,13 +127,67 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
 }
 
+# Кэш токенов в памяти процесса: выход и смена пароля в других
+# процессах вступают в силу не позже чем через TOKEN_CACHE_TTL секунд.
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 5))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+# Фоновые задачи (manage.py run_jobs). JOBS_EAGER выполняет их сразу
+# после фиксации транзакции, без очереди и воркера.
+JOBS_EAGER = os.getenv('JOBS_EAGER', 'False') == 'True'
+JOBS_POLL_SECONDS = float(os.getenv('JOBS_POLL_SECONDS', 1))
+JOBS_BATCH = int(os.getenv('JOBS_BATCH', 10))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', 5))
+# Пауза перед первым повтором, секунд; дальше удваивается.
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', 10))
+# Задача дольше этого считается брошенной упавшим воркером.
+JOBS_LOCK_TIMEOUT = int(os.getenv('JOBS_LOCK_TIMEOUT', 600))
+JOBS_KEEP_DAYS = int(os.getenv('JOBS_KEEP_DAYS', 7))
+
+# Сколько строк удаляет один запуск фонового удаления.
+DELETION_BATCH = int(os.getenv('DELETION_BATCH', 1000))
+
+# Счётчик избранного рецепта делится на столько строк; раз в
+# FAVORITE_ROLLUP_SECONDS они переносятся в рецепт фоновой задачей.
+FAVORITE_COUNTER_SHARDS = int(os.getenv('FAVORITE_COUNTER_SHARDS', 16))
+FAVORITE_ROLLUP_SECONDS = int(os.getenv('FAVORITE_ROLLUP_SECONDS', 60))
+
+# Как часто индекс ингредиентов перестраивается целиком, секунд.
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+# Асинхронные версии горячих эндпоинтов; включать при запуске под ASGI.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+# Как часто карта опубликованных рецептов для коротких ссылок
+# перестраивается целиком, секунд.
+SHORT_LINK_INDEX_TTL = int(os.getenv('SHORT_LINK_INDEX_TTL', 300))
+
+# Сколько браузеры и прокси могут кешировать редирект, секунд.
+SHORT_LINK_CACHE_SECONDS = int(
+    os.getenv('SHORT_LINK_CACHE_SECONDS', 60 * 60 * 24)
+)
+
+# Что отдаёт короткая ссылка: redirect — редирект на страницу рецепта,
+# preload — оболочку SPA с подсказкой загрузить рецепт,
+# embed — оболочку SPA со встроенными данными рецепта.
+SHORT_LINK_MODE = os.getenv('SHORT_LINK_MODE', 'redirect')
+
+SPA_INDEX_PATH = os.getenv('SPA_INDEX_PATH', '/backend_static/index.html')
+
+SHORT_LINK_PAGE_CACHE_TTL = int(os.getenv('SHORT_LINK_PAGE_CACHE_TTL', 60))
+
+SHORT_LINK_PAGE_CACHE_SIZE = int(
+    os.getenv('SHORT_LINK_PAGE_CACHE_SIZE', 1000)
+)
+
 DJOSER = {
     "LOGIN_FIELD": "email",
     "HIDE_USERS": False,
@@ -157,6 +221,39 @@ STATIC_ROOT = BASE_DIR / "collected_static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Загружаемые файлы крупнее этого размера пишутся во временный файл
+# кусками, а не собираются в памяти.
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 256 * 1024)
+)
+
+# Уменьшенные копии изображений: каталог, бюджет на диске и как их
+# отдавать — через X-Accel-Redirect nginx или, без nginx, самим Django.
+THUMBNAIL_ROOT = os.getenv('THUMBNAIL_ROOT', BASE_DIR / "thumbs")
+THUMBNAIL_CACHE_BYTES = int(
+    os.getenv('THUMBNAIL_CACHE_BYTES', 512 * 1024 * 1024)
+)
+THUMBNAIL_ACCEL_REDIRECT = os.getenv(
+    'THUMBNAIL_ACCEL_REDIRECT', str(not DEBUG)
+) == 'True'
+THUMBNAIL_ACCEL_PREFIX = os.getenv('THUMBNAIL_ACCEL_PREFIX', '/thumbs-cache/')
+THUMBNAIL_CACHE_SECONDS = int(
+    os.getenv('THUMBNAIL_CACHE_SECONDS', 60 * 60 * 24 * 30)
+)
+
+# Журнал изменений для /api/sync/: записи моложе SYNC_SETTLE_SECONDS
+# отдаются повторно (более ранняя транзакция могла ещё не завершиться),
+# записи старше SYNC_LOG_DAYS удаляет prune_change_log.
+SYNC_SETTLE_SECONDS = int(os.getenv('SYNC_SETTLE_SECONDS', 5))
+SYNC_LOG_DAYS = int(os.getenv('SYNC_LOG_DAYS', 30))
+
+# Поток событий /api/stream/ (только под ASGI): как часто читать журнал
+# изменений других процессов, как часто слать keep-alive и сколько
+# событий копить для медленного клиента.
+STREAM_POLL_SECONDS = float(os.getenv('STREAM_POLL_SECONDS', 1))
+STREAM_HEARTBEAT_SECONDS = float(os.getenv('STREAM_HEARTBEAT_SECONDS', 15))
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', 100))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,13 +1,33 @@
-from api.views import short_url
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, register_converter
+
+from api import async_views, views
+from recipes.short_links import ShortCodeConverter
+
+register_converter(ShortCodeConverter, "shortcode")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+]
+
+short_url = views.short_url
+if settings.ASYNC_VIEWS:
+    short_url = async_views.short_url
+    urlpatterns += [
+        path("api/", include("api.async_urls")),
+    ]
+
+urlpatterns += [
     path("api/", include("api.urls")),
-    path("s/<int:pk>/", short_url, name="short_url"),
+    path("s/<shortcode:pk>/", short_url, name="short_url"),
+    path("s/<int:pk>/", short_url, name="short_url_by_id"),
+    path(
+        "thumbs/<slug:preset>/<path:name>",
+        views.thumbnail,
+        name="thumbnail",
+    ),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,44 @@
+from django.contrib.admin import SimpleListFilter, action, register
+from django.db.models.functions import Now
+
+from core.admin import LargeTableAdmin
+from .models import Job
+from .queue import registry
+
+
+class TaskNameFilter(SimpleListFilter):
+    """Задачи из реестра ``@task``, без DISTINCT по всей таблице."""
+    title = 'Задача'
+    parameter_name = 'name'
+
+    def lookups(self, request, model_admin):
+        return [(name, name) for name in sorted(registry)]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return queryset.filter(name=self.value())
+
+
+@register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = (
+        'name', 'id', 'status', 'priority', 'attempts', 'run_at',
+        'duration', 'worker',
+    )
+    list_filter = ('status', 'priority', TaskNameFilter)
+    readonly_fields = (
+        'name', 'args', 'attempts', 'created', 'started_at', 'finished_at',
+        'duration', 'worker', 'last_error',
+    )
+    actions = ('retry',)
+
+    @action(description="Повторить выбранные задачи")
+    def retry(self, request, queryset):
+        count = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED,
+            attempts=0,
+            run_at=Now(),
+            finished_at=None,
+        )
+        self.message_user(request, f"Поставлено в очередь {count} задач.")
@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.queue import metrics
+
+COLUMNS = ("queued", "running", "done", "failed", "retries")
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает очередь фоновых задач: сколько ждёт и выполняется, "
+        "сколько выполнено и упало за последние часы, среднее время."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=1)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options["hours"])
+        stats = metrics(since)
+        self.stdout.write(
+            f"{'задача':<50}" + "".join(f"{name:>9}" for name in COLUMNS)
+            + f"{'среднее, с':>12}"
+        )
+        for row in stats["tasks"]:
+            duration = row["avg_duration"]
+            self.stdout.write(
+                f"{row['name']:<50}"
+                + "".join(f"{row[name]:>9}" for name in COLUMNS)
+                + (f"{duration:>12.3f}" if duration is not None else "")
+            )
+        self.stdout.write(f"Ожидание старейшей задачи: {stats['lag']:.1f} с")
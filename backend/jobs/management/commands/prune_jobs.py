@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from jobs.models import Job
+
+BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет выполненные фоновые задачи старше JOBS_KEEP_DAYS. "
+        "Упавшие задачи остаются до ручного разбора в админке."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.JOBS_KEEP_DAYS
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        done = Job.objects.filter(
+            status=Job.Status.DONE, finished_at__lt=before
+        )
+        deleted = 0
+        while ids := list(done.values_list("id", flat=True)[:BATCH]):
+            deleted += Job.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Удалено задач: {deleted}"))
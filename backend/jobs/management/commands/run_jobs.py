@@ -0,0 +1,37 @@
+import signal
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет фоновые задачи из очереди в базе данных. Можно "
+        "запускать несколько воркеров, в том числе на разных машинах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=settings.JOBS_BATCH)
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Завершиться, когда в очереди не останется готовых задач.",
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(batch=options["batch"])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f"Воркер {worker.name} запущен")
+        while not worker.stopped:
+            if worker.run_once():
+                continue
+            if options["burst"]:
+                break
+            sleep(settings.JOBS_POLL_SECONDS)
+        self.stdout.write(
+            self.style.SUCCESS(f"Выполнено задач: {worker.processed}")
+        )
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:28
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Задача')),
+                ('args', models.JSONField(default=list, verbose_name='Аргументы')),
+                ('priority', models.SmallIntegerField(choices=[(-10, 'Низкий'), (0, 'Обычный'), (10, 'Высокий')], default=0, verbose_name='Приоритет')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'В очереди'), (2, 'Выполняется'), (3, 'Выполнена'), (4, 'Ошибка')], default=1, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('max_attempts', models.PositiveSmallIntegerField(verbose_name='Максимум попыток')),
+                ('run_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='Запуск не раньше')),
+                ('created', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='Поставлена')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('finished_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Завершена')),
+                ('duration', models.FloatField(blank=True, null=True, verbose_name='Длительность, с')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Воркер')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'indexes': [models.Index(condition=models.Q(('status', 1)), fields=['-priority', 'id'], name='job_queued_idx'), models.Index(condition=models.Q(('status', 2)), fields=['started_at'], name='job_running_idx')],
+            },
+        ),
+    ]
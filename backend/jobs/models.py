@@ -0,0 +1,81 @@
+from django.db.models import (
+    CharField,
+    DateTimeField,
+    FloatField,
+    Index,
+    IntegerChoices,
+    JSONField,
+    Model,
+    PositiveSmallIntegerField,
+    Q,
+    SmallIntegerField,
+    TextField,
+)
+from django.db.models.functions import Now
+
+
+class Job(Model):
+    """Отложенный вызов задачи из ``jobs.queue``.
+
+    ``name`` — путь импорта задачи, ``args`` — её аргументы в JSON.
+    Выполненные задачи остаются в таблице для метрик до очистки.
+    """
+    class Status(IntegerChoices):
+        QUEUED = 1, "В очереди"
+        RUNNING = 2, "Выполняется"
+        DONE = 3, "Выполнена"
+        FAILED = 4, "Ошибка"
+
+    class Priority(IntegerChoices):
+        LOW = -10, "Низкий"
+        NORMAL = 0, "Обычный"
+        HIGH = 10, "Высокий"
+
+    name = CharField(max_length=200, verbose_name="Задача")
+    args = JSONField(default=list, verbose_name="Аргументы")
+    priority = SmallIntegerField(
+        choices=Priority.choices,
+        default=Priority.NORMAL,
+        verbose_name="Приоритет",
+    )
+    status = PositiveSmallIntegerField(
+        choices=Status.choices,
+        default=Status.QUEUED,
+        verbose_name="Статус",
+    )
+    attempts = PositiveSmallIntegerField(default=0, verbose_name="Попытки")
+    max_attempts = PositiveSmallIntegerField(
+        verbose_name="Максимум попыток"
+    )
+    run_at = DateTimeField(db_default=Now(), verbose_name="Запуск не раньше")
+    created = DateTimeField(db_default=Now(), verbose_name="Поставлена")
+    started_at = DateTimeField(null=True, blank=True, verbose_name="Начата")
+    finished_at = DateTimeField(
+        null=True, blank=True, db_index=True, verbose_name="Завершена"
+    )
+    duration = FloatField(
+        null=True, blank=True, verbose_name="Длительность, с"
+    )
+    worker = CharField(max_length=100, blank=True, verbose_name="Воркер")
+    last_error = TextField(blank=True, verbose_name="Последняя ошибка")
+
+    class Meta:
+        verbose_name = "Задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = (
+            Index(
+                fields=("-priority", "id"),
+                condition=Q(status=1),  # QUEUED
+                name="job_queued_idx",
+            ),
+            Index(
+                fields=("started_at",),
+                condition=Q(status=2),  # RUNNING
+                name="job_running_idx",
+            ),
+            # Поиск такой же ждущей задачи в ``Task.delay_once``.
+            Index(fields=("name", "status"), name="job_name_status_idx"),
+        )
+
+    def __str__(self):
+        return f"{self.name} #{self.id}"
@@ -0,0 +1,245 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача ставится строкой в той же транзакции, что и изменение, ради
+которого она нужна: откат отменяет и её, а поставленная задача не
+теряется при перезапуске процесса. Выполняют задачи воркеры
+``manage.py run_jobs``. Свободные задачи воркер забирает запросом
+``SELECT ... FOR UPDATE SKIP LOCKED`` (PostgreSQL), поэтому воркеры не
+ждут друг друга. На SQLite транзакция открывается с блокировкой записи
+(``BEGIN IMMEDIATE``), и выборки задач просто идут по очереди.
+"""
+import functools
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+from time import perf_counter
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Avg, Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Задачи по имени: ``@task`` регистрирует их при импорте модуля.
+registry = {}
+
+
+class Task:
+    """Функция, которую можно выполнить в фоне: ``task.delay(*args)``.
+
+    Аргументы сохраняются в JSON, поэтому передаются id, а не объекты.
+    """
+
+    def __init__(self, func, priority, max_attempts):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f"{func.__module__}.{func.__qualname__}"
+        self.priority = priority
+        self.max_attempts = max_attempts
+        registry[self.name] = self
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def run_now(self, *args):
+        """Выполняет задачу в транзакции, как это делает воркер."""
+        with transaction.atomic():
+            return self.func(*args)
+
+    def delay(self, *args, priority=None, countdown=0):
+        """Ставит задачу в очередь в текущей транзакции."""
+        if settings.JOBS_EAGER:
+            transaction.on_commit(lambda: self.run_now(*args))
+            return None
+        job = Job(
+            name=self.name,
+            args=list(args),
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+        )
+        if countdown:
+            job.run_at = timezone.now() + timedelta(seconds=countdown)
+        job.save(force_insert=True)
+        return job
+
+    def delay_once(self, *args, countdown=0):
+        """Как ``delay``, если такой же вызов ещё не ждёт в очереди.
+
+        Проверка без блокировки: одновременные запросы изредка ставят
+        дубль, поэтому задача должна выдерживать повторный запуск.
+        """
+        if settings.JOBS_EAGER or not Job.objects.filter(
+            name=self.name, args=list(args), status=Job.Status.QUEUED
+        ).exists():
+            return self.delay(*args, countdown=countdown)
+        return None
+
+
+def task(priority=Job.Priority.NORMAL, max_attempts=None):
+    """Декоратор фоновой задачи."""
+    def decorator(func):
+        return Task(
+            func, priority, max_attempts or settings.JOBS_MAX_ATTEMPTS
+        )
+    return decorator
+
+
+def retry_delay(attempts):
+    """Пауза перед повтором растёт вдвое с каждой попыткой."""
+    return timedelta(
+        seconds=settings.JOBS_RETRY_DELAY * 2 ** max(attempts - 1, 0)
+    )
+
+
+def claim(worker, limit):
+    """Забирает до ``limit`` готовых задач, самые приоритетные первыми."""
+    now = timezone.now()
+    with transaction.atomic():
+        ready = Job.objects.filter(
+            status=Job.Status.QUEUED, run_at__lte=now
+        ).order_by("-priority", "id")
+        connection = connections[ready.db]
+        if connection.features.has_select_for_update_skip_locked:
+            ready = ready.select_for_update(skip_locked=True)
+        ids = list(ready.values_list("id", flat=True)[:limit])
+        # Условие на статус защищает и там, где нет SKIP LOCKED.
+        Job.objects.filter(id__in=ids, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            worker=worker,
+        )
+        return list(
+            Job.objects.filter(
+                id__in=ids, status=Job.Status.RUNNING, worker=worker
+            ).order_by("-priority", "id")
+        )
+
+
+def start(worker, job, waiting=()):
+    """Отмечает начало задачи; ``False``, если её уже забрали у воркера.
+
+    Задачам пачки, которые ждут своей очереди, время тоже обновляется:
+    иначе ``release_stale`` вернёт их в очередь, пока выполняются
+    соседние.
+    """
+    now = timezone.now()
+    mine = Job.objects.filter(status=Job.Status.RUNNING, worker=worker)
+    mine.filter(id__in=[other.id for other in waiting]).update(started_at=now)
+    return bool(mine.filter(id=job.id).update(started_at=now))
+
+
+def release_stale():
+    """Возвращает в очередь задачи воркеров, которые не завершились.
+
+    Задача считается брошенной, если выполняется дольше
+    ``JOBS_LOCK_TIMEOUT``: воркер упал или был убит.
+    """
+    before = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING, started_at__lt=before
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.Status.FAILED,
+        finished_at=timezone.now(),
+        last_error="Превышено время выполнения",
+    )
+    return failed + stale.update(status=Job.Status.QUEUED)
+
+
+def run_job(job):
+    """Выполняет задачу в транзакции и записывает результат."""
+    start = perf_counter()
+    try:
+        import_string(job.name).run_now(*job.args)
+    except Exception:
+        logger.exception("Ошибка фоновой задачи %s", job)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = Job.Status.FAILED
+    else:
+        job.status = Job.Status.DONE
+    job.duration = perf_counter() - start
+    if job.status != Job.Status.QUEUED:
+        job.finished_at = timezone.now()
+    job.save(update_fields=(
+        "status", "run_at", "finished_at", "duration", "last_error"
+    ))
+    return job.status
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Worker:
+    """Цикл воркера: забрать пачку, выполнить, подождать новых."""
+
+    def __init__(self, name=None, batch=None):
+        self.name = name or worker_name()
+        self.batch = batch or settings.JOBS_BATCH
+        self.stopped = False
+        self.processed = 0
+
+    def run_once(self):
+        """Выполняет одну пачку задач; возвращает их число."""
+        release_stale()
+        jobs = claim(self.name, self.batch)
+        for number, job in enumerate(jobs):
+            if self.stopped:
+                self.give_back(jobs[number:])
+                break
+            if not start(self.name, job, jobs[number + 1:]):
+                continue
+            run_job(job)
+            self.processed += 1
+        close_old_connections()
+        return len(jobs)
+
+    def give_back(self, jobs):
+        """Невыполненные задачи пачки возвращаются в очередь."""
+        Job.objects.filter(
+            id__in=[job.id for job in jobs], status=Job.Status.RUNNING
+        ).update(status=Job.Status.QUEUED, attempts=F("attempts") - 1)
+
+    def stop(self, *args):
+        """Остановка после текущей задачи (обработчик SIGTERM)."""
+        self.stopped = True
+
+
+def metrics(since):
+    """Число задач по статусам, среднее время и ошибки по каждой задаче.
+
+    Выполненные и упавшие считаются с момента ``since``; ``lag`` —
+    сколько ждёт самая старая готовая к запуску задача.
+    """
+    finished = Q(finished_at__gte=since)
+    tasks = Job.objects.values("name").annotate(
+        queued=Count("id", filter=Q(status=Job.Status.QUEUED)),
+        running=Count("id", filter=Q(status=Job.Status.RUNNING)),
+        done=Count("id", filter=Q(status=Job.Status.DONE) & finished),
+        failed=Count("id", filter=Q(status=Job.Status.FAILED) & finished),
+        retries=Count("id", filter=Q(attempts__gt=1) & finished),
+        avg_duration=Avg(
+            "duration", filter=Q(status=Job.Status.DONE) & finished
+        ),
+    ).order_by("name")
+    now = timezone.now()
+    oldest = Job.objects.filter(
+        status=Job.Status.QUEUED, run_at__lte=now
+    ).aggregate(oldest=Min("run_at"))["oldest"]
+    return {
+        "tasks": [row for row in tasks if any(
+            row[key] for key in ("queued", "running", "done", "failed")
+        )],
+        "lag": (now - oldest).total_seconds() if oldest else 0,
+    }
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import Worker, claim, release_stale, task
+
+runs = []
+
+
+@task()
+def record(value):
+    runs.append(value)
+
+
+@task()
+def slow(value):
+    """Задача на 40 секунд, пока другой воркер ищет брошенные."""
+    Job.objects.filter(status=Job.Status.RUNNING).update(
+        started_at=F("started_at") - timedelta(seconds=40)
+    )
+    runs.append((value, release_stale()))
+
+
+@task()
+def hand_over(value):
+    """Соседние по пачке задачи тем временем забрал другой воркер."""
+    Job.objects.exclude(args=[value]).update(worker="other")
+    runs.append(value)
+
+
+@task(max_attempts=2)
+def broken():
+    raise RuntimeError("сломалась")
+
+
+@override_settings(JOBS_EAGER=False, JOBS_LOCK_TIMEOUT=60)
+class QueueTests(TransactionTestCase):
+    """Постановка, выборка, повторы и брошенные задачи очереди."""
+
+    def setUp(self):
+        runs.clear()
+
+    def test_claim_by_priority(self):
+        low = record.delay("low", priority=Job.Priority.LOW)
+        normal = record.delay("normal")
+        high = record.delay("high", priority=Job.Priority.HIGH)
+        record.delay("later", countdown=60)
+        claimed = claim("worker", 2)
+        self.assertEqual([job.id for job in claimed], [high.id, normal.id])
+        self.assertEqual([job.attempts for job in claimed], [1, 1])
+        self.assertEqual(claim("other", 10), [
+            Job.objects.get(id=low.id)
+        ])
+        self.assertEqual(claim("other", 10), [])
+
+    def test_batch(self):
+        for value in range(3):
+            record.delay(value)
+        self.assertEqual(Worker("worker").run_once(), 3)
+        self.assertEqual(runs, [0, 1, 2])
+        self.assertEqual(
+            set(Job.objects.values_list("status", flat=True)),
+            {Job.Status.DONE},
+        )
+
+    def test_waiting_jobs_of_batch_are_not_stale(self):
+        for value in range(3):
+            slow.delay(value)
+        Worker("worker").run_once()
+        self.assertEqual(runs, [(0, 0), (1, 0), (2, 0)])
+        self.assertEqual(
+            list(Job.objects.values_list("status", "attempts")),
+            [(Job.Status.DONE, 1)] * 3,
+        )
+
+    def test_job_taken_over_is_skipped(self):
+        hand_over.delay(0)
+        taken = record.delay(1)
+        Worker("worker").run_once()
+        self.assertEqual(runs, [0])
+        taken.refresh_from_db()
+        self.assertEqual(
+            (taken.status, taken.worker), (Job.Status.RUNNING, "other")
+        )
+
+    def test_retry_then_fail(self):
+        job = broken.delay()
+        with self.assertLogs("jobs.queue", "ERROR"):
+            Worker("worker").run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("сломалась", job.last_error)
+        self.assertEqual(Worker("worker").run_once(), 0)
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs("jobs.queue", "ERROR"):
+            Worker("worker").run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_stopped_worker_gives_back(self):
+        record.delay(0)
+        worker = Worker("worker")
+        worker.stop()
+        worker.run_once()
+        self.assertEqual(runs, [])
+        self.assertEqual(
+            list(Job.objects.values_list("status", "attempts")),
+            [(Job.Status.QUEUED, 0)],
+        )
+
+    def test_delay_once(self):
+        self.assertIsNotNone(record.delay_once(1))
+        self.assertIsNone(record.delay_once(1))
+        self.assertIsNotNone(record.delay_once(2))
+        claim("worker", 10)
+        self.assertIsNotNone(record.delay_once(1))
+        self.assertEqual(Job.objects.filter(args=[1]).count(), 2)
@@ -1,8 +1,14 @@
-from django.contrib.admin import register, ModelAdmin
+from django.contrib.admin import register, ModelAdmin, SimpleListFilter
 from django.contrib import messages
 from django.contrib.admin import action, display
+from django.db import transaction
 
+from core.admin import BackgroundDeletionMixin, LargeTableAdmin
+from . import changelog, counters, deletion, feed, tasks
+from .ingredient_index import ingredient_index
+from .short_links import live_recipes
 from .models import (
+    Deletion,
     Ingredient,
     Recipe,
     Tag,
@@ -12,61 +18,148 @@ from .models import (
 )
 
 
+class CookingTimeFilter(SimpleListFilter):
+    """Диапазоны времени приготовления вместо списка всех значений."""
+    title = 'Время приготовления'
+    parameter_name = 'cooking_time'
+    RANGES = {
+        '15': ('До 15 минут', 0, 15),
+        '60': ('15 минут – час', 16, 60),
+        '180': ('1–3 часа', 61, 180),
+        'long': ('Дольше 3 часов', 181, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, label) for key, (label, _, _) in self.RANGES.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.RANGES:
+            return queryset
+        _, low, high = self.RANGES[self.value()]
+        queryset = queryset.filter(cooking_time__gte=low)
+        if high is not None:
+            queryset = queryset.filter(cooking_time__lte=high)
+        return queryset
+
+
 @register(Recipe)
-class RecipeAdmin(ModelAdmin):
+class RecipeAdmin(BackgroundDeletionMixin, LargeTableAdmin):
     list_display = ('name',
                     'id',
                     'author',
                     'in_favorites',
                     'is_published'
                     )
-    ordering = ('name',)
+    list_select_related = ('author',)
     list_editable = ('is_published',)
     readonly_fields = ('in_favorites',)
-    list_filter = ('tags', 'is_published')
-    list_per_page = 10
-    actions = ('set_published', 'set_draft')
-    search_fields = ('name',)
+    list_filter = ('is_published', 'tags', CookingTimeFilter)
+    actions = ('set_published', 'set_draft', 'rebuild_favorite_counts')
+    search_fields = ('^name', '^author__username')
+    autocomplete_fields = ('author', 'tags')
+    soft_delete = staticmethod(deletion.delete_recipe)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            pending_favorites=counters.pending_favorites()
+        )
 
-    @display(description='В избранных')
+    @display(description='В избранных', ordering='favorites_count')
     def in_favorites(self, obj):
-        return obj.favorite.count()
+        return max(obj.favorites_count + obj.pending_favorites, 0)
 
     @action(description="Опубликовать выбранные рецепты")
     def set_published(self, request, queryset):
-        count = queryset.update(is_published=Recipe.Status.PUBLISHED)
+        recipes = list(queryset)
+        with transaction.atomic():
+            count = queryset.update(is_published=Recipe.Status.PUBLISHED)
+            changelog.recipes_changed(recipes)
+            for recipe in recipes:
+                feed.publish(recipe)
+        for recipe in recipes:
+            ingredient_index.refresh(recipe.id)
+            live_recipes.add(recipe.id)
         self.message_user(request, f"Изменено {count} записей.")
 
     @action(description="Снять с публикации выбранные рецепты")
     def set_draft(self, request, queryset):
-        count = queryset.update(is_published=Recipe.Status.DRAFT)
+        recipes = list(queryset)
+        with transaction.atomic():
+            count = queryset.update(is_published=Recipe.Status.DRAFT)
+            changelog.recipes_changed(recipes)
+            for recipe in recipes:
+                feed.unpublish(recipe)
+        for recipe in recipes:
+            ingredient_index.remove(recipe.id)
+            live_recipes.discard(recipe.id)
         self.message_user(
             request, f"{count} записей сняты с публикации!",
             messages.WARNING,
         )
 
+    @action(description="Пересчитать число добавлений в избранное")
+    def rebuild_favorite_counts(self, request, queryset):
+        ids = list(queryset.values_list('id', flat=True))
+        tasks.rebuild_favorite_counts.delay(ids)
+        self.message_user(
+            request, f"Пересчёт {len(ids)} рецептов поставлен в очередь."
+        )
+
 
 @register(Ingredient)
-class IngredientAdmin(ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     list_display = ('name', 'measurement_unit',)
-    list_filter = ('name',)
+    search_fields = ('^name',)
 
 
 @register(Tag)
 class TagAdmin(ModelAdmin):
     list_display = ('name', 'slug',)
+    search_fields = ('name', 'slug')
 
 
 @register(ShoppingList)
-class ShoppingListAdmin(ModelAdmin):
+class ShoppingListAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @register(Favorite)
-class FavoriteAdmin(ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @register(RecipeIngredient)
-class RecipeIngredientAdmin(ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdmin):
     list_display = ('recipe', 'ingredient', 'amount',)
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+
+
+@register(Deletion)
+class DeletionAdmin(LargeTableAdmin):
+    list_display = ('name', 'kind', 'progress', 'requested', 'finished')
+    list_filter = ('kind',)
+    search_fields = ('^name',)
+    readonly_fields = (
+        'kind', 'object_id', 'name', 'step', 'total', 'deleted',
+        'requested', 'finished',
+    )
+
+    @display(description='Удалено')
+    def progress(self, obj):
+        if obj.finished:
+            return f'{obj.deleted} строк, готово'
+        if not obj.total:
+            return 'ожидает'
+        percent = min(100 * obj.deleted // obj.total, 99)
+        return f'{obj.deleted} из {obj.total} ({percent}%)'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
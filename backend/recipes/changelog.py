@@ -0,0 +1,128 @@
+"""Журнал изменений для дельта-синхронизации клиентов.
+
+Записи добавляются в той же транзакции, что и само изменение, и
+получают возрастающий id — он служит токеном синхронизации. Клиент
+получает свои записи избранного, покупок и подписок, а также
+изменения своих рецептов, рецептов из своих списков и авторов из
+подписок. Удаления рецептов видны всем: запись об удалении — только
+id, а клиент, не знавший рецепта, её пропустит.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from recipes.events import broker
+from recipes.models import Change, Favorite, ShoppingList
+from users.models import Subscription
+
+KINDS = {
+    Favorite: Change.Kind.FAVORITE,
+    ShoppingList: Change.Kind.SHOPPING_CART,
+    Subscription: Change.Kind.SUBSCRIPTION,
+}
+
+
+def record(kind, user_id, object_ids, deleted=False):
+    changes = Change.objects.bulk_create(
+        Change(kind=kind, user_id=user_id, object_id=pk, deleted=deleted)
+        for pk in object_ids
+    )
+    if changes:
+        transaction.on_commit(broker.wake)
+
+
+def recipes_changed(recipes):
+    for recipe in recipes:
+        record(Change.Kind.RECIPE, recipe.author_id, (recipe.id,))
+
+
+def recipe_deleted(recipe):
+    recipes_deleted(recipe.author_id, (recipe.id,))
+
+
+def recipes_deleted(author_id, recipe_ids):
+    record(Change.Kind.RECIPE, author_id, recipe_ids, deleted=True)
+
+
+def list_changed(model, user_id, added=(), removed=()):
+    """Добавления и удаления в избранном, покупках или подписках."""
+    record(KINDS[model], user_id, added)
+    record(KINDS[model], user_id, removed, deleted=True)
+
+
+def subscribers_removed(author_id, user_ids):
+    """Подписки многих пользователей на удалённого автора."""
+    changes = Change.objects.bulk_create(
+        Change(
+            kind=Change.Kind.SUBSCRIPTION,
+            user_id=pk,
+            object_id=author_id,
+            deleted=True,
+        )
+        for pk in user_ids
+    )
+    if changes:
+        transaction.on_commit(broker.wake)
+
+
+def visible_changes(user):
+    """Записи, которые касаются пользователя."""
+    return Change.objects.filter(
+        Q(user=user)
+        | Q(kind=Change.Kind.RECIPE) & (
+            Q(deleted=True)
+            | Q(user__in=user.follower.values("author"))
+            | Q(object_id__in=user.favorite.values("recipe"))
+            | Q(object_id__in=user.shopping_list.values("recipe"))
+        )
+    )
+
+
+def settled_token(since=0):
+    """Последний id, до которого все транзакции уже завершились.
+
+    Id выдаются при вставке, а видны записи после фиксации, поэтому
+    запись из долгой транзакции может появиться позже записей с
+    большими id. Токен не заходит в последние ``SYNC_SETTLE_SECONDS``.
+    """
+    settled_at = timezone.now() - timedelta(
+        seconds=settings.SYNC_SETTLE_SECONDS
+    )
+    token = Change.objects.filter(
+        id__gt=since, created__lt=settled_at
+    ).order_by("-id").values_list("id", flat=True).first()
+    return token or since
+
+
+def is_unknown(token):
+    """Токен вне журнала: записи после него уже удалены
+    ``prune_change_log`` или такой id ещё не выдавался.
+
+    Последнюю запись ``prune_change_log`` не удаляет, поэтому в пустом
+    журнале известен только нулевой токен.
+    """
+    bounds = Change.objects.aggregate(oldest=Min("id"), latest=Max("id"))
+    if bounds["latest"] is None:
+        return token > 0
+    return not bounds["oldest"] - 1 <= token <= bounds["latest"]
+
+
+def changes_since(user, since, limit):
+    """Записи после ``since``, следующий токен и есть ли ещё записи.
+
+    Из нескольких записей об одном объекте остаётся последняя. На
+    последней странице токен не заходит за незавершённые транзакции:
+    самые свежие записи клиент получит ещё раз.
+    """
+    settled = settled_token(since)
+    changes = list(
+        visible_changes(user).filter(id__gt=since).order_by("id")[:limit + 1]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    token = changes[-1].id if has_more else settled
+    latest = {(change.kind, change.object_id): change for change in changes}
+    return list(latest.values()), token, has_more
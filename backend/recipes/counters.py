@@ -0,0 +1,111 @@
+"""Счётчики популярности рецептов для сортировки ленты.
+
+Добавления и удаления из избранного копятся в случайных частях
+``FavoriteCounter`` и раз в ``FAVORITE_ROLLUP_SECONDS`` переносятся
+фоновой задачей в ``Recipe.favorites_count``: сортировки читают
+перенесённое значение, точное число даёт ``exact_favorites_counts``.
+"""
+from collections import defaultdict
+from random import randrange
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.utils import add_on_conflict
+from jobs.models import Job
+from jobs.queue import task
+from recipes.models import FavoriteCounter, Recipe
+
+ROLLUP_BATCH = 1000
+
+
+def _count(recipe_ids, delta, favorited_at=None):
+    if not recipe_ids:
+        return
+    add_on_conflict(
+        FavoriteCounter,
+        ("recipe", "shard"),
+        [
+            (pk, randrange(settings.FAVORITE_COUNTER_SHARDS), delta,
+             favorited_at)
+            for pk in recipe_ids
+        ],
+        add=("delta",),
+        latest=("last_favorited_at",),
+    )
+    roll_up_favorite_counts.delay_once(
+        countdown=settings.FAVORITE_ROLLUP_SECONDS
+    )
+
+
+def favorites_added(recipe_ids):
+    _count(recipe_ids, 1, timezone.now())
+
+
+def favorites_removed(recipe_ids):
+    _count(recipe_ids, -1)
+
+
+def pending_favorites():
+    """Ещё не перенесённая в рецепт часть счётчика (для аннотаций)."""
+    return Coalesce(
+        Subquery(
+            FavoriteCounter.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe").annotate(total=Sum("delta")).values("total")
+        ),
+        0,
+    )
+
+
+def exact_favorites_counts(recipe_ids):
+    """Точное число добавлений в избранное: рецепт плюс его части."""
+    return dict(
+        Recipe.objects.filter(id__in=recipe_ids).annotate(
+            exact=Greatest(F("favorites_count") + pending_favorites(), 0)
+        ).values_list("id", "exact")
+    )
+
+
+@task(priority=Job.Priority.LOW)
+def roll_up_favorite_counts():
+    """Переносит пачку частей счётчиков в рецепты и удаляет их.
+
+    Строки частей блокируются до конца транзакции: добавление в
+    избранное, попавшее на ту же часть, подождёт её и создаст строку
+    заново. Если частей больше пачки, задача ставится снова.
+    """
+    with transaction.atomic():
+        shards = list(
+            FavoriteCounter.objects.select_for_update().order_by("id")
+            .values_list("id", "recipe_id", "delta", "last_favorited_at")
+            [:ROLLUP_BATCH]
+        )
+        totals = defaultdict(int)
+        latest = {}
+        for _, recipe_id, delta, favorited_at in shards:
+            totals[recipe_id] += delta
+            if favorited_at is not None:
+                latest[recipe_id] = max(
+                    favorited_at, latest.get(recipe_id, favorited_at)
+                )
+        for recipe_id, delta in totals.items():
+            roll_up(recipe_id, delta, latest.get(recipe_id))
+        FavoriteCounter.objects.filter(
+            id__in=[shard[0] for shard in shards]
+        ).delete()
+    if len(shards) == ROLLUP_BATCH:
+        roll_up_favorite_counts.delay()
+
+
+def roll_up(recipe_id, delta, favorited_at):
+    fields = {"favorites_count": Greatest(F("favorites_count") + delta, 0)}
+    if favorited_at is not None:
+        favorited_at = Value(favorited_at)
+        # В SQLite GREATEST (MAX) с NULL среди аргументов даёт NULL.
+        fields["last_favorited_at"] = Coalesce(
+            Greatest(F("last_favorited_at"), favorited_at), favorited_at
+        )
+    Recipe.objects.filter(id=recipe_id).update(**fields)
@@ -0,0 +1,175 @@
+"""Удаление пользователей и рецептов: скрыть сразу, очистить в фоне.
+
+Каскадное удаление автора затрагивает его рецепты, их ингредиенты,
+избранное, покупки, ленты и подписки; одной транзакцией это долгие
+блокировки, а сборщик Django ещё и загружает все связанные объекты в
+память. Поэтому запрос только помечает объект ``deleted_at`` (он
+пропадает из API и админки) и ставит задачу ``purge``. Каждый её
+запуск удаляет не больше ``DELETION_BATCH`` строк текущего шага и
+ставит задачу снова; прогресс виден в админке в «Удалениях».
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from jobs.models import Job
+from jobs.queue import task
+from recipes import changelog, counters
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (
+    Deletion,
+    FavoriteCounter,
+    Favorite,
+    FeedItem,
+    Recipe,
+    RecipeIngredient,
+    RecipeSimilarity,
+    ShoppingList,
+)
+from recipes.short_links import live_recipes
+from users.models import Subscription
+
+User = get_user_model()
+
+# ``field`` — значения удалённых строк для ``after`` (или ``None``).
+Step = namedtuple("Step", "queryset field after", defaults=(None, None))
+
+
+def recipe_rows(lookup):
+    """Строки, которые ссылаются на рецепты; ``lookup(поле)`` — фильтр."""
+    return [
+        Step(model.objects.filter(**lookup(field)))
+        for model, field in (
+            (FeedItem, "recipe"),
+            (Favorite, "recipe"),
+            (ShoppingList, "recipe"),
+            (RecipeIngredient, "recipe"),
+            (Recipe.tags.through, "recipe"),
+            (FavoriteCounter, "recipe"),
+            (RecipeSimilarity, "recipe"),
+            (RecipeSimilarity, "similar"),
+        )
+    ]
+
+
+def recipe_steps(recipe_id):
+    return [
+        *recipe_rows(lambda field: {field: recipe_id}),
+        Step(Recipe.all_objects.filter(id=recipe_id)),
+    ]
+
+
+def user_steps(user_id):
+    def unsubscribed(follower_ids):
+        changelog.subscribers_removed(user_id, follower_ids)
+
+    return [
+        *recipe_rows(lambda field: {f"{field}__author": user_id}),
+        Step(
+            Subscription.objects.filter(author=user_id), "user", unsubscribed
+        ),
+        Step(Subscription.objects.filter(user=user_id)),
+        Step(
+            Favorite.objects.filter(user=user_id),
+            "recipe",
+            counters.favorites_removed,
+        ),
+        Step(ShoppingList.objects.filter(user=user_id)),
+        Step(FeedItem.objects.filter(user=user_id)),
+        Step(Recipe.all_objects.filter(author=user_id)),
+        Step(User.objects.filter(id=user_id)),
+    ]
+
+
+STEPS = {
+    Deletion.Kind.USER: user_steps,
+    Deletion.Kind.RECIPE: recipe_steps,
+}
+
+
+def delete_batch(step, batch):
+    """Удаляет до ``batch`` строк шага; возвращает их число."""
+    fields = ("pk",) if step.field is None else ("pk", step.field)
+    rows = list(step.queryset.order_by("pk").values_list(*fields)[:batch])
+    if rows:
+        step.queryset.model._base_manager.filter(
+            pk__in=[row[0] for row in rows]
+        ).delete()
+        if step.after is not None:
+            step.after([row[-1] for row in rows])
+    return len(rows)
+
+
+@task(priority=Job.Priority.LOW)
+def purge(deletion_id):
+    """Одна пачка удаления; пока строки остаются, задача ставится снова."""
+    deletion = Deletion.objects.select_for_update().filter(
+        id=deletion_id, finished__isnull=True
+    ).first()
+    if deletion is None:
+        return
+    steps = STEPS[deletion.kind](deletion.object_id)
+    if deletion.total is None:
+        deletion.total = sum(step.queryset.count() for step in steps)
+    while deletion.step < len(steps):
+        count = delete_batch(steps[deletion.step], settings.DELETION_BATCH)
+        if count:
+            deletion.deleted += count
+            deletion.save(update_fields=("total", "deleted", "step"))
+            purge.delay(deletion.id)
+            return
+        deletion.step += 1
+    deletion.finished = timezone.now()
+    deletion.save()
+
+
+def schedule(kind, obj):
+    deletion = Deletion.objects.create(
+        kind=kind, object_id=obj.pk, name=str(obj)[:200]
+    )
+    purge.delay(deletion.id)
+    return deletion
+
+
+def delete_recipe(recipe):
+    """Скрывает рецепт и ставит его удаление в очередь."""
+    with transaction.atomic():
+        Recipe.objects.filter(id=recipe.id).update(
+            deleted_at=Now(), is_published=Recipe.Status.DRAFT
+        )
+        changelog.recipe_deleted(recipe)
+        deletion = schedule(Deletion.Kind.RECIPE, recipe)
+    ingredient_index.remove(recipe.id)
+    live_recipes.discard(recipe.id)
+    return deletion
+
+
+def delete_user(user):
+    """Отключает пользователя, скрывает его рецепты и ставит удаление.
+
+    Токены удаляются сразу — запросы с ними перестают проходить.
+    Рецепты скрываются одним UPDATE без загрузки в память, и клиенты
+    синхронизации сразу получают записи об их удалении.
+    """
+    with transaction.atomic():
+        user.is_active = False
+        user.deleted_at = timezone.now()
+        user.save(update_fields=("is_active", "deleted_at"))
+        Token.objects.filter(user=user).delete()
+        recipe_ids = list(
+            Recipe.objects.filter(author=user).values_list("id", flat=True)
+        )
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            deleted_at=Now(), is_published=Recipe.Status.DRAFT
+        )
+        changelog.recipes_deleted(user.id, recipe_ids)
+        deletion = schedule(Deletion.Kind.USER, user)
+    for recipe_id in recipe_ids:
+        ingredient_index.remove(recipe_id)
+        live_recipes.discard(recipe_id)
+    return deletion
@@ -0,0 +1,194 @@
+"""События потока ``/api/stream/`` из журнала изменений.
+
+Журнал общий для всех процессов и служит брокером: в каждом процессе
+одна задача читает новые записи и раздаёт их подписчикам ``hub`` —
+записи списков и подписок владельцу, записи рецептов автору и его
+подписчикам. Изменение в этом же процессе будит задачу сразу после
+фиксации, изменения в других процессах приходят не позже чем через
+``STREAM_POLL_SECONDS``.
+"""
+import asyncio
+import contextvars
+import logging
+
+from django.conf import settings
+
+from core.pubsub import Hub
+from recipes.models import Change, Recipe
+from users.models import Subscription
+
+logger = logging.getLogger(__name__)
+
+BATCH = 1000
+
+EVENT_TYPES = {
+    Change.Kind.RECIPE: "recipe",
+    Change.Kind.FAVORITE: "favorite",
+    Change.Kind.SHOPPING_CART: "shopping_cart",
+    Change.Kind.SUBSCRIPTION: "subscription",
+}
+
+
+def change_event(change):
+    return {
+        "token": change.id,
+        "type": EVENT_TYPES[change.kind],
+        "id": change.object_id,
+        "deleted": change.deleted,
+    }
+
+
+class ChangeLogBroker:
+    """Раздаёт записи журнала подключённым пользователям процесса.
+
+    Для подключённых пользователей в памяти хранится, на кого они
+    подписаны; записи о подписках из журнала его обновляют.
+    """
+
+    def __init__(self):
+        self.hub = Hub(settings.STREAM_QUEUE_SIZE)
+        self._following = {}
+        self._followers = {}
+        self._loop = None
+        self._task = None
+        self._ready = None
+        self._wakeup = None
+        self._last = 0
+
+    async def connect(self, user_id):
+        if not self.hub.has_subscribers(user_id):
+            self._follow(user_id, {
+                pk async for pk in Subscription.objects.filter(
+                    user_id=user_id
+                ).values_list("author_id", flat=True)
+            })
+        subscription = self.hub.subscribe(user_id)
+        try:
+            self._start()
+            await self._ready.wait()
+        except BaseException:
+            self.disconnect(subscription)
+            raise
+        return subscription
+
+    def disconnect(self, subscription):
+        self.hub.unsubscribe(subscription)
+        user_id = subscription.topic
+        if not self.hub.has_subscribers(user_id):
+            self._unfollow(user_id, set(self._following.get(user_id, ())))
+            self._following.pop(user_id, None)
+        if not self.hub.has_subscribers():
+            # Чтение журнала завершится сразу, а не после паузы опроса.
+            self.wake()
+
+    def release(self, subscription):
+        """``disconnect`` из любого потока, например при закрытии ответа."""
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or loop is running or loop.is_closed():
+            self.disconnect(subscription)
+        else:
+            loop.call_soon_threadsafe(self.disconnect, subscription)
+
+    def wake(self):
+        """Будит чтение журнала; можно вызывать из любого потока."""
+        loop = self._loop
+        if self._task is not None and loop is not None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _follow(self, user_id, authors):
+        self._following.setdefault(user_id, set()).update(authors)
+        for author_id in authors:
+            self._followers.setdefault(author_id, set()).add(user_id)
+
+    def _unfollow(self, user_id, authors):
+        self._following.get(user_id, set()).difference_update(authors)
+        for author_id in authors:
+            followers = self._followers.get(author_id, set())
+            followers.discard(user_id)
+            if not followers:
+                self._followers.pop(author_id, None)
+
+    def _start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        # Без контекста запроса: иначе ORM задачи попал бы в поток
+        # запроса, который закроется вместе с ним.
+        self._task = contextvars.Context().run(
+            self._loop.create_task, self._run()
+        )
+
+    async def _run(self):
+        try:
+            self._last = await Change.objects.order_by("-id").values_list(
+                "id", flat=True
+            ).afirst() or 0
+        finally:
+            self._ready.set()
+        while self.hub.has_subscribers():
+            self._wakeup.clear()
+            try:
+                await self._deliver()
+            except Exception:
+                logger.exception("Ошибка чтения журнала изменений")
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), settings.STREAM_POLL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self):
+        while True:
+            changes = [
+                change async for change in Change.objects.filter(
+                    id__gt=self._last
+                ).order_by("id")[:BATCH]
+            ]
+            if not changes:
+                return
+            await self._route(changes)
+            self._last = changes[-1].id
+            if len(changes) < BATCH:
+                return
+
+    async def _route(self, changes):
+        """Черновики видит только автор, удаления — все подписчики."""
+        recipe_ids = [
+            change.object_id for change in changes
+            if change.kind == Change.Kind.RECIPE and not change.deleted
+        ]
+        published = {
+            pk async for pk in Recipe.published.filter(
+                id__in=recipe_ids
+            ).values_list("id", flat=True)
+        } if recipe_ids else set()
+        for change in changes:
+            recipients = {change.user_id}
+            if change.kind == Change.Kind.RECIPE and (
+                change.deleted or change.object_id in published
+            ):
+                recipients |= self._followers.get(change.user_id, set())
+            elif change.kind == Change.Kind.SUBSCRIPTION:
+                self._subscription_changed(change)
+            event = change_event(change)
+            for user_id in recipients:
+                self.hub.publish(user_id, event)
+
+    def _subscription_changed(self, change):
+        if not self.hub.has_subscribers(change.user_id):
+            return
+        if change.deleted:
+            self._unfollow(change.user_id, {change.object_id})
+        else:
+            self._follow(change.user_id, {change.object_id})
+
+
+broker = ChangeLogBroker()
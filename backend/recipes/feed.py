@@ -0,0 +1,123 @@
+"""Лента подписок: рассылка при публикации и слияние при чтении.
+
+Рецепты обычных авторов раскладываются по лентам подписчиков при
+публикации. Для популярных авторов (больше
+``FEED_FANOUT_MAX_FOLLOWERS`` подписчиков) рассылка не делается:
+их рецепты подмешиваются при чтении слиянием отсортированных списков.
+"""
+import heapq
+from itertools import islice
+
+from django.db.models import Count
+
+from core.cache import TTLCache
+from core.enums import Limits
+from jobs.models import Job
+from jobs.queue import task
+from recipes.models import FeedItem, Recipe
+from users.models import Subscription
+
+CELEBRITIES_KEY = "celebrities"
+
+_celebrities = TTLCache(maxsize=1, ttl=300)
+
+
+def celebrity_ids():
+    """Авторы, чьи рецепты читаются из ``Recipe``, а не из ленты."""
+    ids = _celebrities.get(CELEBRITIES_KEY)
+    if ids is None:
+        ids = frozenset(
+            Subscription.objects.values("author")
+            .annotate(followers=Count("id"))
+            .filter(followers__gt=Limits.FEED_FANOUT_MAX_FOLLOWERS.value)
+            .values_list("author", flat=True)
+        )
+        _celebrities.set(CELEBRITIES_KEY, ids)
+    return ids
+
+
+@task(priority=Job.Priority.HIGH)
+def fan_out_recipe(recipe_id):
+    recipe = Recipe.published.filter(id=recipe_id).only("author").first()
+    if recipe is None:
+        return
+    followers = Subscription.objects.filter(author_id=recipe.author_id)
+    if followers.count() > Limits.FEED_FANOUT_MAX_FOLLOWERS.value:
+        _celebrities.clear()
+        return
+    batch = Limits.FEED_FANOUT_BATCH.value
+    user_ids = followers.values_list("user_id", flat=True).iterator(batch)
+    while chunk := list(islice(user_ids, batch)):
+        FeedItem.objects.bulk_create(
+            (FeedItem(user_id=pk, recipe_id=recipe_id) for pk in chunk),
+            ignore_conflicts=True,
+        )
+
+
+@task(priority=Job.Priority.HIGH)
+def withdraw_recipe(recipe_id):
+    FeedItem.objects.filter(recipe_id=recipe_id).delete()
+
+
+@task(priority=Job.Priority.HIGH)
+def backfill_feed(user_id, author_id):
+    """Подписка: добавляет в ленту последние рецепты автора."""
+    if author_id in celebrity_ids():
+        return
+    recipe_ids = Recipe.published.filter(author_id=author_id).values_list(
+        "id", flat=True
+    )[:Limits.FEED_BACKFILL_RECIPES.value]
+    FeedItem.objects.bulk_create(
+        (FeedItem(user_id=user_id, recipe_id=pk) for pk in recipe_ids),
+        ignore_conflicts=True,
+    )
+
+
+@task(priority=Job.Priority.HIGH)
+def drop_author_from_feed(user_id, author_id):
+    FeedItem.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def publish(recipe):
+    fan_out_recipe.delay(recipe.id)
+
+
+def unpublish(recipe):
+    withdraw_recipe.delay(recipe.id)
+
+
+def subscribed(user_id, author_id):
+    backfill_feed.delay(user_id, author_id)
+
+
+def unsubscribed(user_id, author_id):
+    drop_author_from_feed.delay(user_id, author_id)
+
+
+def read_feed(user, limit, before=None):
+    """Возвращает id рецептов ленты по убыванию, не больше ``limit``.
+
+    Каждый источник — индексный диапазон ``id < before``, поэтому
+    стоимость страницы не зависит от её номера.
+    """
+    items = FeedItem.objects.filter(user=user)
+    if before is not None:
+        items = items.filter(recipe_id__lt=before)
+    sources = [
+        items.order_by("-recipe_id").values_list("recipe_id", flat=True)
+        [:limit]
+    ]
+    pulled = user.follower.filter(
+        author_id__in=celebrity_ids()
+    ).values_list("author_id", flat=True)
+    for author_id in pulled:
+        recipes = Recipe.published.filter(author_id=author_id)
+        if before is not None:
+            recipes = recipes.filter(id__lt=before)
+        sources.append(
+            recipes.order_by("-id").values_list("id", flat=True)[:limit]
+        )
+    merged = heapq.merge(*map(list, sources), reverse=True)
+    return list(islice(dict.fromkeys(merged), limit))
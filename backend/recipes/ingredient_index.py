@@ -0,0 +1,153 @@
+"""Инвертированный индекс ингредиентов для поиска «что приготовить».
+
+Для каждого ингредиента хранится отсортированный массив id рецептов,
+для каждого рецепта — его ингредиенты, время приготовления и теги.
+Индекс живёт в памяти процесса, обновляется точечно после фиксации
+записи рецепта или его ингредиентов и полностью перестраивается не реже раза в
+``INGREDIENT_INDEX_TTL`` секунд, чтобы подхватить изменения,
+сделанные другими процессами.
+"""
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict, namedtuple
+from threading import RLock, local
+from time import monotonic
+
+from django.conf import settings
+from django.db import transaction
+
+from recipes.models import Recipe, RecipeIngredient
+
+RecipeEntry = namedtuple("RecipeEntry", "ingredients cooking_time tags")
+Match = namedtuple("Match", "recipe_id matched missing")
+
+
+class IngredientIndex:
+
+    def __init__(self):
+        self._lock = RLock()
+        self._postings = {}
+        self._recipes = {}
+        self._built_at = None
+        self._stale = local()
+
+    def _queryset(self):
+        return Recipe.published.all()
+
+    def _load(self, recipes):
+        recipes = recipes.order_by()
+        entries = {
+            pk: RecipeEntry(array("q"), cooking_time, set())
+            for pk, cooking_time in recipes.values_list("id", "cooking_time")
+        }
+        ingredients = RecipeIngredient.objects.filter(
+            recipe__in=recipes.values("id")
+        ).order_by().values_list("recipe_id", "ingredient_id")
+        for recipe_id, ingredient_id in ingredients:
+            if recipe_id in entries:
+                entries[recipe_id].ingredients.append(ingredient_id)
+        tags = Recipe.tags.through.objects.filter(
+            recipe__in=recipes.values("id")
+        ).values_list("recipe_id", "tag__slug")
+        for recipe_id, slug in tags:
+            if recipe_id in entries:
+                entries[recipe_id].tags.add(slug)
+        return entries
+
+    def build(self):
+        entries = self._load(self._queryset())
+        postings = defaultdict(list)
+        for recipe_id in sorted(entries):
+            for ingredient_id in entries[recipe_id].ingredients:
+                postings[ingredient_id].append(recipe_id)
+        with self._lock:
+            self._postings = {
+                ingredient_id: array("q", ids)
+                for ingredient_id, ids in postings.items()
+            }
+            self._recipes = entries
+            self._built_at = monotonic()
+
+    def _ensure_fresh(self):
+        if (
+            self._built_at is None
+            or monotonic() - self._built_at > settings.INGREDIENT_INDEX_TTL
+        ):
+            self.build()
+
+    def _discard(self, recipe_id):
+        entry = self._recipes.pop(recipe_id, None)
+        if entry is None:
+            return
+        for ingredient_id in entry.ingredients:
+            posting = self._postings[ingredient_id]
+            position = bisect_left(posting, recipe_id)
+            if position < len(posting) and posting[position] == recipe_id:
+                del posting[position]
+
+    def refresh(self, recipe_id):
+        """Переиндексирует один рецепт после его изменения."""
+        if self._built_at is None:
+            return
+        entries = self._load(self._queryset().filter(id=recipe_id))
+        with self._lock:
+            self._discard(recipe_id)
+            for pk, entry in entries.items():
+                self._recipes[pk] = entry
+                for ingredient_id in entry.ingredients:
+                    insort(
+                        self._postings.setdefault(ingredient_id, array("q")),
+                        pk,
+                    )
+
+    def refresh_on_commit(self, recipe_id):
+        """``refresh`` после фиксации транзакции текущего потока.
+
+        Откаченная запись в индекс не попадает. Несколько изменений
+        рецепта в одной транзакции переиндексируют его один раз.
+        """
+        if not hasattr(self._stale, "ids"):
+            self._stale.ids = set()
+        self._stale.ids.add(recipe_id)
+        transaction.on_commit(self._refresh_stale)
+
+    def _refresh_stale(self):
+        stale, self._stale.ids = self._stale.ids, set()
+        for recipe_id in stale:
+            self.refresh(recipe_id)
+
+    def remove(self, recipe_id):
+        with self._lock:
+            self._discard(recipe_id)
+
+    def search(self, ingredients, cooking_time_max=None, tags=None):
+        """Рецепты с хотя бы одним ингредиентом из списка.
+
+        Сортировка: меньше недостающих ингредиентов, затем больше
+        совпавших, затем новее.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            matched = Counter()
+            for ingredient_id in set(ingredients):
+                matched.update(self._postings.get(ingredient_id, ()))
+            results = []
+            for recipe_id, count in matched.items():
+                entry = self._recipes[recipe_id]
+                if (
+                    cooking_time_max is not None
+                    and entry.cooking_time > cooking_time_max
+                ):
+                    continue
+                if tags and entry.tags.isdisjoint(tags):
+                    continue
+                results.append(
+                    Match(recipe_id, count, len(entry.ingredients) - count)
+                )
+        results.sort(key=lambda match: (
+            match.missing, -match.matched, -match.recipe_id
+        ))
+        return results
+
+
+ingredient_index = IngredientIndex()
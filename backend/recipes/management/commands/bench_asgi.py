@@ -0,0 +1,200 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module, reload
+from statistics import quantiles
+from threading import BoundedSemaphore
+from time import perf_counter, sleep
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.urls import clear_url_caches
+
+from recipes.models import Recipe
+from recipes.short_links import encode
+
+
+def use_async_views(enabled):
+    """Пересобирает корневой URLconf с асинхронными вьюхами или без."""
+    settings.ASYNC_VIEWS = enabled
+    clear_url_caches()
+    reload(import_module(settings.ROOT_URLCONF))
+
+
+class Command(BaseCommand):
+    """Запросы проходят через настоящие WSGI- и ASGI-обработчики.
+
+    WSGI-воркеры моделируются пулом потоков: каждый держит запрос,
+    пока тот ждёт базу. Под ASGI ожидание не занимает воркер, и
+    число одновременных запросов ограничено только клиентами.
+    ``--db-latency`` добавляет задержку к каждому запросу к базе,
+    как у сетевой СУБД.
+    """
+    help = (
+        "Сравнивает пропускную способность и задержки горячих "
+        "эндпоинтов под WSGI (синхронные вьюсеты DRF) и под ASGI "
+        "(асинхронные вьюхи)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=400)
+        parser.add_argument(
+            "--concurrency", type=int, default=50,
+            help="Одновременных клиентов.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=4,
+            help="Синхронных воркеров WSGI.",
+        )
+        parser.add_argument(
+            "--db-latency", type=float, default=5,
+            help="Задержка каждого запроса к базе, мс.",
+        )
+        parser.add_argument(
+            "--path", action="append", dest="paths",
+            help="Адрес для замера, можно несколько раз.",
+        )
+
+    def default_paths(self):
+        recipe_id = Recipe.published.values_list("id", flat=True).first()
+        paths = ["/api/ingredients/?name=сол", "/api/recipes/"]
+        if recipe_id is not None:
+            paths += [
+                f"/api/recipes/{recipe_id}/", f"/s/{encode(recipe_id)}/"
+            ]
+        return paths
+
+    def run_wsgi(self, paths, requests, concurrency, workers):
+        handler = WSGIHandler()
+        factory = RequestFactory(SERVER_NAME="localhost")
+        busy = BoundedSemaphore(workers)
+
+        def call(number):
+            path, _, query = paths[number % len(paths)].partition("?")
+            query = quote(query, safe="=&")
+            environ = factory._base_environ(
+                PATH_INFO=path, QUERY_STRING=query, REQUEST_METHOD="GET"
+            )
+            status = []
+            # Задержка считается с момента запроса клиента, включая
+            # ожидание свободного воркера.
+            start = perf_counter()
+            with busy:
+                response = handler(
+                    environ,
+                    lambda code, headers: status.append(int(code[:3])),
+                )
+                response.close()
+            return perf_counter() - start, status[0]
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(call, range(requests)))
+        return perf_counter() - start, results
+
+    def run_asgi(self, paths, requests, concurrency):
+        application = get_asgi_application()
+
+        async def call(number, limit):
+            path, _, query = paths[number % len(paths)].partition("?")
+            query = quote(query, safe="=&")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": query.encode(),
+                "root_path": "",
+                "headers": [(b"host", b"localhost")],
+                "server": ("localhost", 80),
+                "client": ("127.0.0.1", 0),
+            }
+            body = [{"type": "http.request", "body": b""}]
+            status = []
+
+            async def receive():
+                if body:
+                    return body.pop()
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+
+            async with limit:
+                start = perf_counter()
+                await application(scope, receive, send)
+                return perf_counter() - start, status[0]
+
+        async def main():
+            limit = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *(call(number, limit) for number in range(requests))
+            )
+
+        start = perf_counter()
+        results = asyncio.run(main())
+        return perf_counter() - start, results
+
+    def report(self, label, elapsed, results):
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(status >= 400 for _, status in results)
+        p50, p95 = (quantiles(latencies, n=100)[i] for i in (49, 94))
+        self.stdout.write(
+            f"{label}: {len(results) / elapsed:8.1f} запр/с, "
+            f"p50 {p50:7.1f} мс, p95 {p95:7.1f} мс, ошибок: {errors}"
+        )
+        return len(results) / elapsed
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or self.default_paths()
+        delay = options["db_latency"] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            sleep(delay)
+            return execute(sql, params, many, context)
+
+        def on_connect(sender, connection, **kwargs):
+            connection.execute_wrappers.append(slow_query)
+
+        for connection in connections.all():
+            connection.close()
+        connection_created.connect(on_connect)
+        configured = settings.ASYNC_VIEWS
+        self.stdout.write(
+            f"Адреса: {', '.join(paths)}; запросов: {options['requests']}, "
+            f"клиентов: {options['concurrency']}, "
+            f"задержка БД: {options['db_latency']} мс"
+        )
+        try:
+            use_async_views(False)
+            wsgi = self.report(
+                f"WSGI, {options['workers']} воркера",
+                *self.run_wsgi(
+                    paths,
+                    options["requests"],
+                    options["concurrency"],
+                    options["workers"],
+                ),
+            )
+            use_async_views(True)
+            asgi = self.report(
+                "ASGI, асинхронные вьюхи",
+                *self.run_asgi(
+                    paths, options["requests"], options["concurrency"]
+                ),
+            )
+        finally:
+            connection_created.disconnect(on_connect)
+            use_async_views(configured)
+        self.stdout.write(
+            self.style.SUCCESS(f"ASGI / WSGI: {asgi / wsgi:.2f}×")
+        )
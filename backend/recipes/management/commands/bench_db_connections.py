@@ -0,0 +1,78 @@
+from time import perf_counter
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+
+class Command(BaseCommand):
+    """Запросы проходят через настоящий WSGI-обработчик.
+
+    Тестовый клиент Django не закрывает соединения по окончании
+    запроса, поэтому для замера он не подходит.
+    """
+    help = (
+        "Сравнивает накладные расходы на соединение с БД за запрос: "
+        "новое соединение на каждый запрос против постоянного."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--path", default="/api/tags/")
+        parser.add_argument("--database", default="default")
+
+    def run(self, path, requests, database, conn_max_age):
+        connection = connections[database]
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+        opened = []
+
+        def on_connect(sender, connection, **kwargs):
+            if connection.alias == database:
+                opened.append(connection)
+
+        connection_created.connect(on_connect)
+        handler = WSGIHandler()
+        environ = RequestFactory(SERVER_NAME="localhost")._base_environ(
+            PATH_INFO=path, REQUEST_METHOD="GET"
+        )
+        try:
+            start = perf_counter()
+            for _ in range(requests):
+                response = handler(dict(environ), lambda *args: None)
+                response.close()
+            elapsed = perf_counter() - start
+        finally:
+            connection_created.disconnect(on_connect)
+            connection.close()
+        return elapsed, len(opened)
+
+    def handle(self, *args, **options):
+        database = options["database"]
+        settings_dict = connections[database].settings_dict
+        configured = settings_dict["CONN_MAX_AGE"]
+        pool = settings_dict.get("OPTIONS", {}).get("pool")
+        self.stdout.write(
+            f"{settings_dict['ENGINE']}: CONN_MAX_AGE={configured}, "
+            f"CONN_HEALTH_CHECKS={settings_dict['CONN_HEALTH_CHECKS']}, "
+            f"pool={bool(pool)}"
+        )
+        modes = (("новое соединение", 0), ("постоянное", configured or None))
+        results = {}
+        for label, conn_max_age in modes:
+            elapsed, opened = self.run(
+                options["path"], options["requests"], database, conn_max_age
+            )
+            per_request = elapsed / options["requests"] * 1000
+            results[label] = per_request
+            self.stdout.write(
+                f"{label:>18}: {per_request:.3f} мс/запрос, "
+                f"открыто соединений: {opened}"
+            )
+        connections[database].settings_dict["CONN_MAX_AGE"] = configured
+        saved = results["новое соединение"] - results["постоянное"]
+        self.stdout.write(
+            self.style.SUCCESS(f"Экономия на запрос: {saved:.3f} мс")
+        )
@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from time import perf_counter, sleep
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from core.utils import insert_ignore_conflicts
+from jobs.models import Job
+from recipes import counters
+from recipes.models import Favorite, FavoriteCounter, Recipe
+
+User = get_user_model()
+
+PREFIX = "bench-favorites-"
+
+
+def row_counter(recipe_ids):
+    """Счётчик одной строкой рецепта, как до частей."""
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        favorites_count=F("favorites_count") + 1,
+        last_favorited_at=Now(),
+    )
+
+
+MODES = {
+    "row": row_counter,
+    "sharded": counters.favorites_added,
+}
+
+
+def create_data(clients):
+    users = User.objects.bulk_create(
+        User(username=f"{PREFIX}{number}", email=f"{PREFIX}{number}@x.ru")
+        for number in range(clients)
+    )
+    recipe = Recipe.objects.create(
+        author=users[0],
+        name="Бенчмарк",
+        text="Бенчмарк",
+        image="bench.png",
+        cooking_time=1,
+        is_published=Recipe.Status.PUBLISHED,
+    )
+    return [user.id for user in users], recipe.id
+
+
+def delete_data():
+    Job.objects.filter(name=counters.roll_up_favorite_counts.name).delete()
+    User.objects.filter(username__startswith=PREFIX).delete()
+
+
+class Command(BaseCommand):
+    """Каждый клиент — отдельный поток со своим соединением.
+
+    Транзакция повторяет добавление в избранное: вставка в
+    ``Favorite``, счётчик и ``--hold-ms`` прочей работы до фиксации,
+    пока блокировка строки счётчика удерживается. Показательно на
+    PostgreSQL: SQLite блокирует на запись всю базу, и там оба
+    варианта идут строго по очереди.
+    """
+    help = (
+        "Сравнивает пропускную способность добавления в избранное "
+        "одного рецепта множеством клиентов: счётчик в строке рецепта "
+        "против счётчика из частей."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=32)
+        parser.add_argument("--favorites", type=int, default=1000)
+        parser.add_argument("--hold-ms", type=float, default=5)
+
+    def favorite(self, mode, recipe_id, user_id, hold):
+        start = perf_counter()
+        with transaction.atomic():
+            added = insert_ignore_conflicts(
+                Favorite, ("user", "recipe"), [(user_id, recipe_id)],
+                "recipe",
+            )
+            MODES[mode](added)
+            sleep(hold)
+        return perf_counter() - start
+
+    def run(self, mode, recipe_id, user_ids, clients, hold):
+        def work(user_id):
+            try:
+                return self.favorite(mode, recipe_id, user_id, hold)
+            finally:
+                connections.close_all()
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            latencies = list(executor.map(work, user_ids))
+        return perf_counter() - start, latencies
+
+    def count(self, recipe_id):
+        counters.roll_up_favorite_counts()
+        return Recipe.objects.get(id=recipe_id).favorites_count
+
+    def handle(self, *args, **options):
+        hold = options["hold_ms"] / 1000
+        delete_data()
+        user_ids, recipe_id = create_data(options["favorites"])
+        self.stdout.write(
+            f"{connection.vendor}: {options['clients']} клиентов, "
+            f"{options['favorites']} добавлений одного рецепта"
+        )
+        try:
+            for mode in MODES:
+                Favorite.objects.filter(recipe_id=recipe_id).delete()
+                FavoriteCounter.objects.filter(recipe_id=recipe_id).delete()
+                Recipe.objects.filter(id=recipe_id).update(favorites_count=0)
+                elapsed, latencies = self.run(
+                    mode, recipe_id, user_ids, options["clients"], hold
+                )
+                p95 = quantiles(latencies, n=20)[-1]
+                self.stdout.write(
+                    f"{mode:>8}: {len(user_ids) / elapsed:7.0f} в секунду, "
+                    f"p95 транзакции {p95 * 1000:6.1f} мс, "
+                    f"счётчик {self.count(recipe_id)}"
+                )
+        finally:
+            delete_data()
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import tracemalloc
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from foodgram.asgi import application
+from recipes.events import broker
+from recipes.management.commands.bench_asgi import use_async_views
+from recipes.models import Change, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+PREFIX = "bench-stream-"
+STREAM_PATH = "/api/stream/"
+
+
+def create_users(clients):
+    """Автор и ``clients`` подписчиков с токенами."""
+    author = User.objects.create(
+        username=f"{PREFIX}author", email=f"{PREFIX}author@example.com"
+    )
+    followers = User.objects.bulk_create(
+        User(username=f"{PREFIX}{number}", email=f"{PREFIX}{number}@x.ru")
+        for number in range(clients)
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author) for user in followers
+    )
+    tokens = Token.objects.bulk_create(
+        Token(user=user, key=Token.generate_key()) for user in followers
+    )
+    return author, [token.key for token in tokens]
+
+
+def publish_recipe(author):
+    return Recipe.objects.create(
+        author=author,
+        name="Бенчмарк",
+        text="Бенчмарк",
+        image="bench.png",
+        cooking_time=1,
+        is_published=Recipe.Status.PUBLISHED,
+    )
+
+
+def delete_users():
+    users = User.objects.filter(username__startswith=PREFIX)
+    Change.objects.filter(user__in=users).delete()
+    users.delete()
+
+
+class Client:
+    """Клиент ASGI, который держит поток открытым до ``close``."""
+
+    def __init__(self, application, token):
+        self.application = application
+        self.token = token
+        self.connected = asyncio.Event()
+        self.received = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.status = None
+        self._requested = False
+
+    def scope(self):
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": STREAM_PATH,
+            "raw_path": STREAM_PATH.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"authorization", f"Token {self.token}".encode()),
+            ],
+            "server": ("localhost", 80),
+            "client": ("127.0.0.1", 0),
+        }
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b""}
+        await self.closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.connected.set()
+        elif b"event: recipe" in message.get("body", b""):
+            self.received.set()
+
+    def run(self):
+        return asyncio.ensure_future(
+            self.application(self.scope(), self.receive, self.send)
+        )
+
+
+class Command(BaseCommand):
+    """Клиенты подключаются к настоящему ASGI-обработчику.
+
+    Автор публикует рецепт; замеряется время, за которое событие
+    дошло до всех подписчиков, память на одно простаивающее
+    соединение и число потоков процесса.
+    """
+    help = (
+        "Открывает тысячи соединений /api/stream/ и замеряет их "
+        "стоимость и время доставки события о новом рецепте."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=2000)
+
+    async def run(self, tokens, author):
+        clients = [Client(application, token) for token in tokens]
+        threads = threading.active_count()
+        tracemalloc.start()
+        start = perf_counter()
+        tasks = [client.run() for client in clients]
+        await asyncio.gather(*(client.connected.wait() for client in clients))
+        connect_time = perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        idle_threads = threading.active_count()
+        start = perf_counter()
+        await sync_to_async(publish_recipe)(author)
+        await asyncio.gather(*(client.received.wait() for client in clients))
+        delivery_time = perf_counter() - start
+        for client in clients:
+            client.closed.set()
+        await asyncio.gather(*tasks)
+        statuses = {client.status for client in clients}
+        return (
+            connect_time, memory, threads, idle_threads, delivery_time,
+            statuses,
+        )
+
+    def handle(self, *args, **options):
+        count = options["clients"]
+        configured = settings.ASYNC_VIEWS
+        delete_users()
+        author, tokens = create_users(count)
+        try:
+            use_async_views(True)
+            (
+                connect_time, memory, threads, idle_threads, delivery_time,
+                statuses,
+            ) = asyncio.run(self.run(tokens, author))
+        finally:
+            use_async_views(configured)
+            delete_users()
+        self.stdout.write(
+            f"Подключено {count} клиентов за {connect_time:.2f} с, "
+            f"статусы: {', '.join(map(str, sorted(statuses)))}"
+        )
+        self.stdout.write(
+            f"Память: {memory / count / 1024:.1f} КБ на соединение, "
+            f"потоков: {threads} до подключения, {idle_threads} после"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Событие дошло до всех за {delivery_time * 1000:.0f} мс; "
+                f"соединений в брокере после закрытия: {len(broker.hub)}"
+            )
+        )
@@ -0,0 +1,118 @@
+import base64
+import json
+import os
+import tracemalloc
+from io import BytesIO
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+AVATAR_PATH = "/api/users/me/avatar/"
+USERNAME = "bench-uploads"
+
+
+def noise_png(megabytes):
+    """PNG из шума: почти не сжимается, размер файла близок к заданному."""
+    side = int((megabytes * 1024 * 1024 / 3) ** 0.5)
+    image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    buffer = BytesIO()
+    image.save(buffer, "PNG", compress_level=0)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """Запросы проходят через настоящий WSGI-обработчик.
+
+    Тела запросов готовятся заранее и в замер не входят: учитывается
+    только то, что выделяет сервер, разбирая запрос и сохраняя файл.
+    """
+    help = (
+        "Сравнивает пиковую память и время загрузки аватара: base64 "
+        "в JSON, multipart/form-data и изображение телом запроса."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", type=float, default=1.5,
+            help="Размер изображения, МБ.",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def bodies(self, image):
+        encoded = base64.b64encode(image).decode()
+        return (
+            (
+                "base64 в JSON",
+                json.dumps(
+                    {"avatar": f"data:image/png;base64,{encoded}"}
+                ).encode(),
+                "application/json",
+            ),
+            (
+                "multipart",
+                encode_multipart(
+                    BOUNDARY, {"avatar": ContentFile(image, "avatar.png")}
+                ),
+                MULTIPART_CONTENT,
+            ),
+            ("тело запроса", image, "image/png"),
+        )
+
+    def upload(self, handler, token, body, content_type):
+        environ = RequestFactory(SERVER_NAME="localhost")._base_environ(
+            PATH_INFO=AVATAR_PATH,
+            REQUEST_METHOD="PUT",
+            CONTENT_TYPE=content_type,
+            CONTENT_LENGTH=str(len(body)),
+            HTTP_AUTHORIZATION=f"Token {token}",
+            **{"wsgi.input": BytesIO(body)},
+        )
+        status = []
+        tracemalloc.start()
+        start = perf_counter()
+        response = handler(
+            environ, lambda code, headers: status.append(int(code[:3]))
+        )
+        response.close()
+        elapsed = perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak, status[0]
+
+    def handle(self, *args, **options):
+        image = noise_png(options["size"])
+        user, _ = User.objects.get_or_create(
+            username=USERNAME, defaults={"email": f"{USERNAME}@example.com"}
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        handler = WSGIHandler()
+        megabyte = 1024 * 1024
+        self.stdout.write(f"Изображение: {len(image) / megabyte:.1f} МБ")
+        try:
+            for label, body, content_type in self.bodies(image):
+                runs = []
+                for _ in range(options["repeat"]):
+                    runs.append(
+                        self.upload(handler, token.key, body, content_type)
+                    )
+                    user.refresh_from_db()
+                    user.avatar.delete()
+                elapsed = min(run[0] for run in runs)
+                peak = max(run[1] for run in runs)
+                statuses = ", ".join(sorted({str(run[2]) for run in runs}))
+                self.stdout.write(
+                    f"{label:>14}: тело {len(body) / megabyte:5.1f} МБ, "
+                    f"пик памяти {peak / megabyte:6.1f} МБ, "
+                    f"{elapsed * 1000:7.1f} мс, статус {statuses}"
+                )
+        finally:
+            user.delete()
@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from core.enums import Limits
+from recipes.models import Favorite, RecipeSimilarity, ShoppingList
+
+FAVORITE_WEIGHT = 1.0
+SHOPPING_LIST_WEIGHT = 0.5
+COLUMNS_PER_CHUNK = 1000
+
+
+def load_interactions():
+    """Матрица пользователь × рецепт с весами избранного и покупок."""
+    users, recipes, weights = [], [], []
+    for model, weight in (
+        (Favorite, FAVORITE_WEIGHT),
+        (ShoppingList, SHOPPING_LIST_WEIGHT),
+    ):
+        pairs = model.objects.order_by().values_list("user_id", "recipe_id")
+        rows = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+        users.append(rows[:, 0])
+        recipes.append(rows[:, 1])
+        weights.append(np.full(len(rows), weight))
+    users, recipes = np.concatenate(users), np.concatenate(recipes)
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    recipe_ids, recipe_index = np.unique(recipes, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.concatenate(weights), (user_index, recipe_index)),
+        shape=(len(user_ids), len(recipe_ids)),
+    )
+    return matrix, recipe_ids
+
+
+def normalized_columns(matrix):
+    norms = np.sqrt(np.asarray(matrix.power(2).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    return (matrix @ sparse.diags(1 / norms)).tocsc()
+
+
+def top_neighbours(similarity, columns, top):
+    """Лучшие ``top`` соседей для каждого столбца блока сходства."""
+    similarity = similarity.tocsc()
+    for position, column in enumerate(columns):
+        start, end = similarity.indptr[position:position + 2]
+        rows = similarity.indices[start:end]
+        scores = similarity.data[start:end]
+        keep = rows != column
+        rows, scores = rows[keep], scores[keep]
+        if len(scores) > top:
+            best = np.argpartition(-scores, top)[:top]
+            rows, scores = rows[best], scores[best]
+        yield column, rows, scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит похожие рецепты по косинусному сходству совместных "
+        "добавлений в избранное и список покупок. С --since списки "
+        "соседей пересчитываются только для затронутых рецептов; "
+        "полный пересчёт стоит запускать периодически."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=int,
+            help="Пересчитать только рецепты пользователей, "
+                 "активных за последние N часов.",
+        )
+        parser.add_argument(
+            "--top", type=int, default=Limits.SIMILAR_RECIPES.value
+        )
+
+    def changed_recipes(self, hours, recipe_ids):
+        since = timezone.now() - timedelta(hours=hours)
+        users = set()
+        for model in (Favorite, ShoppingList):
+            users.update(
+                model.objects.filter(created__gte=since)
+                .order_by().values_list("user_id", flat=True)
+            )
+        changed = set()
+        for model in (Favorite, ShoppingList):
+            changed.update(
+                model.objects.filter(user_id__in=users)
+                .order_by().values_list("recipe_id", flat=True)
+            )
+        return np.flatnonzero(np.isin(recipe_ids, list(changed)))
+
+    def handle(self, *args, **options):
+        matrix, recipe_ids = load_interactions()
+        if options["since"] is None:
+            targets = np.arange(len(recipe_ids))
+        else:
+            targets = self.changed_recipes(options["since"], recipe_ids)
+        normalized = normalized_columns(matrix)
+        transposed = normalized.T.tocsr()
+        saved = 0
+        for start in range(0, len(targets), COLUMNS_PER_CHUNK):
+            columns = targets[start:start + COLUMNS_PER_CHUNK]
+            block = transposed @ normalized[:, columns]
+            similarities = [
+                RecipeSimilarity(
+                    recipe_id=int(recipe_ids[column]),
+                    similar_id=int(recipe_ids[row]),
+                    score=float(score),
+                )
+                for column, rows, scores in top_neighbours(
+                    block, columns, options["top"]
+                )
+                for row, score in zip(rows, scores)
+            ]
+            with transaction.atomic():
+                RecipeSimilarity.objects.filter(
+                    recipe_id__in=recipe_ids[columns].tolist()
+                ).delete()
+                RecipeSimilarity.objects.bulk_create(similarities)
+            saved += len(similarities)
+        if options["since"] is None:
+            RecipeSimilarity.objects.exclude(
+                recipe__in=Favorite.objects.values("recipe")
+            ).exclude(
+                recipe__in=ShoppingList.objects.values("recipe")
+            ).delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пересчитано рецептов: {len(targets)}, связей: {saved}"
+            )
+        )
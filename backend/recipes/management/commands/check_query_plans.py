@@ -0,0 +1,460 @@
+"""Проверка планов горячих запросов.
+
+Команда наполняет базу тестовыми данными, выполняет запросы теми же
+путями, что и API, перехватывает их SQL и разбирает ``EXPLAIN``
+каждого. Для каждого сценария заданы индексы, которые должны попасть
+в план; сортировка и полный просмотр таблицы считаются ошибкой, если
+сценарий их явно не разрешает. Всё выполняется в транзакции, которая
+откатывается, поэтому команду можно запускать на любой базе.
+
+На PostgreSQL перед проверкой выключаются ``enable_seqscan`` и
+``enable_sort``: планировщик обходит их, если есть хоть какая-то
+альтернатива, и оставшиеся в плане Seq Scan и Sort означают, что
+подходящего индекса нет, а не что таблица пока маленькая. SQLite
+таких настроек не знает, поэтому в его статистике таблицы
+увеличиваются до миллиона строк. Так вердикт не зависит от объёма
+тестовых данных.
+
+Сценарии — запросы к настоящим эндпоинтам API. Те же проверки
+выполняют тесты ``recipes.tests.test_query_plans``.
+"""
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.batch import API_PREFIX
+from api.pagination import CustomLimitPagination
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    Tag,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+PREFIX = "query-plan"
+DISHES = ("Суп", "Салат", "Пирог", "Каша", "Рагу", "Запеканка")
+PRODUCTS = ("соль", "сахар", "мука", "морковь", "лук", "молоко")
+INGREDIENTS_PER_RECIPE = 6
+TAGS = 8
+
+# Число строк в статистике SQLite заменяется на миллион, избирательность
+# индексов остаётся прежней. ``ANALYZE sqlite_master`` перечитывает её.
+SQLITE_SCALE_STATISTICS = (
+    "UPDATE sqlite_stat1 "
+    "SET stat = '1000000' || substr(stat, instr(stat || ' ', ' '))"
+)
+EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+COUNT = re.compile(r"^\s*SELECT COUNT\(\*\) AS", re.IGNORECASE)
+FROM = re.compile(r'\bFROM "(\w+)"')
+ALIAS = re.compile(r'"(\w+)" (U\d+|T\d+)\b')
+SORT = {
+    "postgresql": re.compile(r"^\s*(->\s*)?(Incremental )?Sort\b"),
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR .*(ORDER BY|DISTINCT)"),
+}
+FULL_SCAN = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"^SCAN (\w+)$"),
+}
+
+Case = namedtuple(
+    "Case",
+    "name run uses postgresql_uses scans sorts max_queries",
+    defaults=((), (), (), False, None),
+)
+Case.__doc__ = """Сценарий проверки.
+
+``uses`` — индексы, которые должны встретиться в планах: имя индекса
+или кортеж ``(модель, поле, ...)`` — любой индекс таблицы модели,
+начинающийся с этих полей. ``postgresql_uses`` проверяются только на
+PostgreSQL. ``scans`` — таблицы, которые можно просматривать целиком,
+``sorts`` — таблицы, запросы к которым могут сортировать в памяти
+(``True`` — любые), ``max_queries`` ограничивает число запросов
+сценария.
+"""
+
+
+def endpoint(method, path, params=lambda data: {}):
+    """Сценарий — запрос к эндпоинту API от имени ``data["user"]``.
+
+    Представление вызывается напрямую, как подзапросы ``/api/batch/``:
+    без middleware, с уже известным пользователем. ``params(data)`` —
+    параметры строки запроса для GET и тело JSON для остальных.
+    """
+
+    def run(data):
+        factory = APIRequestFactory(SERVER_NAME="localhost")
+        if method == "get":
+            request = factory.get(path, params(data))
+        else:
+            request = getattr(factory, method)(
+                path, params(data), format="json"
+            )
+        force_authenticate(request, data["user"])
+        match = resolve(path[len(API_PREFIX):], urlconf="api.urls")
+        response = match.func(request, *match.args, **match.kwargs)
+        if response.status_code >= 400:
+            raise CommandError(
+                f"{method.upper()} {path}: {response.status_code} "
+                f"{getattr(response, 'data', '')}"
+            )
+
+    return run
+
+
+def recipe_case(name, params, **options):
+    """Сценарий списка рецептов: ``params(data)`` — параметры запроса.
+
+    Страница — восемь запросов: число рецептов, рецепты с авторами,
+    теги, ингредиенты рецептов и их названия, отметки избранного,
+    покупок и подписок. Теги рецепта упорядочены, их немного, и
+    сортировка разрешена.
+    """
+    options.setdefault("sorts", (Tag._meta.db_table,))
+    options.setdefault("max_queries", 8)
+    return Case(
+        f"recipes{name}", endpoint("get", "/api/recipes/", params), **options
+    )
+
+
+CASES = (
+    recipe_case(
+        "",
+        lambda data: {},
+        postgresql_uses=("recipe_published_idx",),
+    ),
+    recipe_case(
+        "?tags",
+        lambda data: {"tags": data["tags"]},
+        uses=((Recipe.tags.through,),),
+        # Теги проверяются отдельным запросом к маленькой таблице.
+        scans=(Tag._meta.db_table,),
+        max_queries=9,
+    ),
+    recipe_case(
+        "?author",
+        lambda data: {"author": data["author"].id},
+        uses=("recipe_author_idx",),
+        # Автор проверяется отдельным запросом.
+        max_queries=9,
+    ),
+    # Избранное и покупки пользователя невелики: планировщик может
+    # начать с них и отсортировать найденные рецепты.
+    recipe_case(
+        "?is_favorited",
+        lambda data: {"is_favorited": 1},
+        uses=((Favorite, "user"),),
+        sorts=(Tag._meta.db_table, Recipe._meta.db_table),
+    ),
+    recipe_case(
+        "?is_in_shopping_cart",
+        lambda data: {"is_in_shopping_cart": 1},
+        uses=((ShoppingList, "user"),),
+        sorts=(Tag._meta.db_table, Recipe._meta.db_table),
+    ),
+    recipe_case(
+        "?cooking_time_max",
+        lambda data: {"cooking_time_max": 30, "ordering": "cooking_time"},
+        uses=("recipe_cooking_time_idx",),
+    ),
+    recipe_case(
+        "?ordering=-cooking_time",
+        lambda data: {"ordering": "-cooking_time"},
+        uses=("recipe_cooking_time_idx",),
+    ),
+    recipe_case(
+        "?ordering=popularity",
+        lambda data: {"ordering": "popularity"},
+        uses=("recipe_popularity_idx",),
+    ),
+    recipe_case(
+        "?ordering=favorited",
+        lambda data: {"ordering": "favorited"},
+        uses=("recipe_favorited_idx",),
+    ),
+    recipe_case(
+        "?search",
+        lambda data: {"search": DISHES[0]},
+        postgresql_uses=("recipes_recipe_search_idx",),
+        # Результаты поиска упорядочены по релевантности.
+        sorts=True,
+        # И фрагменты описаний с совпадениями.
+        max_queries=9,
+    ),
+    Case(
+        "users/subscriptions",
+        endpoint("get", "/api/users/subscriptions/"),
+        uses=((Subscription, "user"), "recipe_author_idx"),
+        # Число подписок, страница и рецепты каждого автора на ней.
+        max_queries=2 + CustomLimitPagination.page_size,
+    ),
+    Case(
+        "recipes/download_shopping_cart",
+        endpoint("get", "/api/recipes/download_shopping_cart/"),
+        uses=((ShoppingList, "user"),),
+        # Список покупок группируется по названию ингредиента.
+        sorts=True,
+        max_queries=1,
+    ),
+    Case(
+        "recipes/favorite/toggle",
+        endpoint(
+            "post",
+            "/api/recipes/favorite/toggle/",
+            lambda data: {"recipes": data["toggle_ids"]},
+        ),
+        uses=((Favorite, "user", "recipe"), "job_name_status_idx"),
+        # Рецепты, удаление, вставка, журнал изменений, части
+        # счётчиков и постановка их переноса.
+        max_queries=8,
+    ),
+    Case(
+        "ingredients?name",
+        endpoint(
+            "get", "/api/ingredients/", lambda data: {"name": PRODUCTS[0][:3]}
+        ),
+        postgresql_uses=("recipes_ingredient_name_prefix_idx",),
+        # LIKE без учёта регистра SQLite по индексу не ищет.
+        scans=(Ingredient._meta.db_table,)
+        if connection.vendor == "sqlite" else (),
+        # Подсказка короткая, отсортировать найденное дешевле.
+        sorts=True,
+        max_queries=1,
+    ),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет планы выполнения горячих запросов API на тестовых "
+        "данных: используемые индексы, отсутствие сортировок и полных "
+        "просмотров таблиц. С -v 2 печатает SQL и планы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes", type=int, default=5000,
+            help="Сколько рецептов создать для проверки.",
+        )
+
+    def seed(self, recipes):
+        """Тестовые данные; возвращает параметры сценариев."""
+        users = User.objects.bulk_create(
+            User(
+                username=f"{PREFIX}-{number}",
+                email=f"{PREFIX}-{number}@example.com",
+                first_name="План",
+                last_name="Запроса",
+            )
+            for number in range(recipes // 20 + 2)
+        )
+        user, authors = users[0], users[1:]
+        tags = Tag.objects.bulk_create(
+            Tag(name=f"План {number}", slug=f"{PREFIX}-{number}")
+            for number in range(TAGS)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f"{PRODUCTS[number % len(PRODUCTS)]} {number}",
+                measurement_unit="г",
+            )
+            for number in range(recipes // 10 + INGREDIENTS_PER_RECIPE)
+        )
+        now = timezone.now()
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                name=f"{DISHES[number % len(DISHES)]} {number}",
+                text=f"{DISHES[number % len(DISHES)]} для проверки планов",
+                image=f"{PREFIX}.png",
+                author=authors[number % len(authors)],
+                is_published=number % 10 != 0,
+                cooking_time=number % 120 + 1,
+                favorites_count=number * 7 % 500,
+                last_favorited_at=(
+                    now - timedelta(minutes=number) if number % 2 else None
+                ),
+            )
+            for number in range(recipes)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(
+                recipe=recipe, tag=tags[(number + shift) % TAGS]
+            )
+            for number, recipe in enumerate(recipes)
+            for shift in (0, 1)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[
+                    (number * INGREDIENTS_PER_RECIPE + shift)
+                    % len(ingredients)
+                ],
+                amount=shift + 1,
+            )
+            for number, recipe in enumerate(recipes)
+            for shift in range(INGREDIENTS_PER_RECIPE)
+        )
+        published = [recipe for recipe in recipes if recipe.is_published]
+        for model, step in ((Favorite, 13), (ShoppingList, 97)):
+            model.objects.bulk_create(
+                model(user=follower, recipe=recipe)
+                for number, follower in enumerate(users)
+                for recipe in published[number % step::step]
+            )
+        Subscription.objects.bulk_create(
+            Subscription(user=follower, author=author)
+            for number, follower in enumerate(users)
+            for author in authors[number % 7::max(len(authors) // 20, 1)]
+            if author != follower
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+            else:
+                cursor.execute(SQLITE_SCALE_STATISTICS)
+                cursor.execute("ANALYZE sqlite_master")
+        return {
+            "user": user,
+            "author": authors[0],
+            "tags": [tag.slug for tag in tags[:2]],
+            "toggle_ids": [recipe.id for recipe in published[:10]],
+        }
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"EXPLAIN {sql}")
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def table_indexes(self, table):
+        """Индексы таблицы: имя — столбцы по порядку.
+
+        SQLite называет индексы ограничений UNIQUE сам
+        (``sqlite_autoindex_…``), поэтому имена берутся из PRAGMA.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor != "sqlite":
+                constraints = connection.introspection.get_constraints(
+                    cursor, table
+                )
+                return {
+                    name: info["columns"]
+                    for name, info in constraints.items()
+                    if (info["index"] or info["unique"])
+                    and not info["primary_key"]
+                }
+            cursor.execute(f'PRAGMA index_list("{table}")')
+            names = [row[1] for row in cursor.fetchall()]
+            indexes = {}
+            for name in names:
+                cursor.execute(f'PRAGMA index_info("{name}")')
+                indexes[name] = [row[2] for row in cursor.fetchall()]
+            return indexes
+
+    def index_names(self, spec):
+        """Имена индексов, подходящих под описание из ``Case.uses``."""
+        if isinstance(spec, str):
+            return {spec}
+        model, *fields = spec
+        columns = [model._meta.get_field(field).column for field in fields]
+        return {
+            name
+            for name, indexed in self.table_indexes(
+                model._meta.db_table
+            ).items()
+            if indexed[:len(columns)] == columns
+        }
+
+    def plan_problems(self, case, sql, plan):
+        vendor = connection.vendor
+        table = FROM.search(sql)
+        sorted_in_memory = any(SORT[vendor].search(line) for line in plan)
+        if sorted_in_memory and not (
+            case.sorts is True or table and table[1] in case.sorts
+        ):
+            yield f"сортировка\n    {sql}"
+        # SQLite читает таблицу в порядке rowid: просмотр без сортировки
+        # под LIMIT останавливается на первых строках.
+        if vendor == "sqlite" and " LIMIT " in sql and not sorted_in_memory:
+            return
+        # Число рецептов для пагинации читает все подходящие строки, и
+        # SQLite просматривает для этого таблицу, а не индекс по ним.
+        if vendor == "sqlite" and COUNT.match(sql):
+            return
+        aliases = {alias: name for name, alias in ALIAS.findall(sql)}
+        for line in plan:
+            scan = FULL_SCAN[vendor].search(line.strip())
+            if not scan:
+                continue
+            table = aliases.get(scan[1], scan[1])
+            # Промежуточные результаты подзапросов таблицами не считаются.
+            if table in self.tables and table not in case.scans:
+                yield f"полный просмотр {table}\n    {sql}"
+
+    def problems(self, case, plans):
+        if case.max_queries is not None and len(plans) > case.max_queries:
+            yield f"{len(plans)} запросов вместо {case.max_queries}"
+        lines = [line for _, plan in plans for line in plan]
+        uses = case.uses
+        if connection.vendor == "postgresql":
+            uses += case.postgresql_uses
+        for spec in uses:
+            names = self.index_names(spec)
+            if not any(name in line for name in names for line in lines):
+                yield f"не используется индекс {spec!r}"
+        for sql, plan in plans:
+            yield from self.plan_problems(case, sql, plan)
+
+    def check_case(self, case, data):
+        with CaptureQueriesContext(connection) as captured:
+            case.run(data)
+        plans = [
+            (query["sql"], self.explain(query["sql"]))
+            for query in captured.captured_queries
+            if EXPLAINABLE.match(query["sql"])
+        ]
+        if self.verbosity > 1:
+            for sql, plan in plans:
+                self.stdout.write(f"  {sql}")
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+        return list(self.problems(case, plans))
+
+    def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
+        self.tables = set(connection.introspection.table_names())
+        if connection.vendor not in SORT:
+            raise CommandError(f"{connection.vendor} не поддерживается.")
+        failures = 0
+        with transaction.atomic():
+            data = self.seed(options["recipes"])
+            for case in CASES:
+                problems = self.check_case(case, data)
+                failures += len(problems)
+                if problems:
+                    self.stdout.write(self.style.ERROR(f"{case.name}:"))
+                    for problem in problems:
+                        self.stdout.write(f"  {problem}")
+                else:
+                    self.stdout.write(f"{case.name}: ok")
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f"Проблем в планах запросов: {failures}.")
+        self.stdout.write(self.style.SUCCESS("Планы запросов в порядке."))
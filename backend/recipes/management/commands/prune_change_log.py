@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Change
+
+BATCH = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет записи журнала изменений старше SYNC_LOG_DAYS. Клиенты "
+        "с более старым токеном получат 410 и загрузят данные заново."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SYNC_LOG_DAYS)
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["days"])
+        # Последняя запись остаётся: по ней проверяются токены клиентов.
+        newest = Change.objects.order_by("-id").values_list(
+            "id", flat=True
+        ).first()
+        last = Change.objects.filter(
+            created__lt=before, id__lt=newest or 0
+        ).order_by("-id").values_list("id", flat=True).first()
+        deleted = 0
+        # Пачками по id: не держим долгую блокировку на горячей таблице.
+        while last is not None:
+            ids = list(
+                Change.objects.filter(id__lte=last).order_by("id")
+                .values_list("id", flat=True)[:BATCH]
+            )
+            if not ids:
+                break
+            deleted += Change.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено записей журнала: {deleted}")
+        )
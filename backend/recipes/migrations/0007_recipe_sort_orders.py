@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    stats = Favorite.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe')
+    Recipe.objects.update(
+        favorites_count=Coalesce(
+            Subquery(stats.annotate(count=Count('id')).values('count')), 0
+        ),
+        last_favorited_at=Subquery(
+            stats.annotate(last=Max('created')).values('last')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='last_favorited_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последнее добавление в избранное'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['cooking_time', 'id'], name='recipe_cooking_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('last_favorited_at__isnull', False)), fields=['-last_favorited_at', '-id'], name='recipe_favorited_idx'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
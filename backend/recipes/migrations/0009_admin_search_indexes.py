@@ -0,0 +1,15 @@
+from django.db import migrations
+
+from core.utils import prefix_search_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_published_indexes'),
+    ]
+
+    operations = [
+        prefix_search_indexes('recipes_recipe', 'name'),
+        prefix_search_indexes('recipes_ingredient', 'name'),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FavoriteCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Номер части')),
+                ('delta', models.IntegerField(default=0, verbose_name='Изменение')),
+                ('last_favorited_at', models.DateTimeField(blank=True, null=True, verbose_name='Последнее добавление в избранное')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorite_counters', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Часть счётчика избранного',
+                'verbose_name_plural': 'Счётчики избранного',
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'shard'), name='unique_favorite_counter')],
+            },
+        ),
+    ]
@@ -6,6 +6,7 @@ from django.core.validators import (
 )
 from django.db.models import (
     CASCADE,
+    DO_NOTHING,
     CharField,
     SlugField,
     ForeignKey,
@@ -17,8 +18,15 @@ from django.db.models import (
     UniqueConstraint,
     IntegerChoices,
     BooleanField,
+    DateTimeField,
+    FloatField,
+    Index,
+    IntegerField,
     Manager,
+    PositiveIntegerField,
+    Q,
 )
+from django.db.models.functions import Now
 
 from core import help_texts
 from core.enums import Limits
@@ -26,8 +34,18 @@ from core.enums import Limits
 User = get_user_model()
 
 
+class LiveManager(Manager):
+    """Рецепты без удалённых, которые ещё ждут фоновой очистки."""
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class PublishedManager(Manager):
-    """Пользовательский менеджер модели"""
+    """Пользовательский менеджер модели.
+
+    Удалённый рецепт сразу снимается с публикации, поэтому отдельного
+    условия на ``deleted_at`` здесь не нужно.
+    """
     def get_queryset(self):
         return super().get_queryset().filter(
             is_published=Recipe.Status.PUBLISHED
@@ -153,14 +171,63 @@ class Recipe(Model):
         related_name="recipes",
         verbose_name="Теги"
     )
+    favorites_count = PositiveIntegerField(
+        default=0,
+        verbose_name="В избранном",
+    )
+    last_favorited_at = DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Последнее добавление в избранное",
+    )
+    deleted_at = DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Удалён",
+    )
 
     class Meta:
         ordering = ("-id",)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = (
+            Index(
+                fields=("-id",),
+                condition=Q(is_published=True),
+                name="recipe_published_idx",
+            ),
+            Index(
+                fields=("author", "-id"),
+                condition=Q(is_published=False),
+                name="recipe_drafts_idx",
+            ),
+            Index(
+                fields=("author", "-id"),
+                condition=Q(is_published=True),
+                name="recipe_author_idx",
+            ),
+            Index(
+                fields=("cooking_time", "id"),
+                condition=Q(is_published=True),
+                name="recipe_cooking_time_idx",
+            ),
+            Index(
+                fields=("-favorites_count", "-id"),
+                condition=Q(is_published=True),
+                name="recipe_popularity_idx",
+            ),
+            Index(
+                fields=("-last_favorited_at", "-id"),
+                condition=Q(
+                    is_published=True, last_favorited_at__isnull=False
+                ),
+                name="recipe_favorited_idx",
+            ),
+        )
 
-    objects = Manager()
+    objects = LiveManager()
     published = PublishedManager()
+    all_objects = Manager()
 
     def __str__(self):
         return self.name
@@ -196,7 +263,6 @@ class RecipeIngredient(Model):
     )
 
     class Meta:
-        ordering = ("-id",)
         verbose_name = "Количество ингредиента"
         verbose_name_plural = "Количество ингредиентов"
         constraints = (
@@ -225,9 +291,13 @@ class Favorite(Model):
         related_name="favorite",
         verbose_name="Рецепт",
     )
+    created = DateTimeField(
+        db_default=Now(),
+        db_index=True,
+        verbose_name="Добавлено",
+    )
 
     class Meta:
-        ordering = ("-id",)
         verbose_name = "Избранное"
         verbose_name_plural = "Избранные рецепты"
 
@@ -257,9 +327,13 @@ class ShoppingList(Model):
         related_name="shopping_list",
         verbose_name="Рецепт",
     )
+    created = DateTimeField(
+        db_default=Now(),
+        db_index=True,
+        verbose_name="Добавлено",
+    )
 
     class Meta:
-        ordering = ('user',),
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
 
@@ -274,3 +348,181 @@ class ShoppingList(Model):
         return (
             f"{self.user} добавил {self.recipe} в список покупок"
         )
+
+
+class FavoriteCounter(Model):
+    """Часть счётчика избранного рецепта.
+
+    Добавление в избранное прибавляет единицу к одной из
+    ``FAVORITE_COUNTER_SHARDS`` строк рецепта, выбранной случайно,
+    поэтому одновременные добавления популярного рецепта не ждут
+    блокировки одной строки. Фоновая задача переносит накопленное в
+    ``Recipe.favorites_count`` и удаляет строки.
+    """
+
+    recipe = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name="favorite_counters",
+        verbose_name="Рецепт",
+    )
+    shard = PositiveSmallIntegerField(verbose_name="Номер части")
+    delta = IntegerField(default=0, verbose_name="Изменение")
+    last_favorited_at = DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Последнее добавление в избранное",
+    )
+
+    class Meta:
+        verbose_name = "Часть счётчика избранного"
+        verbose_name_plural = "Счётчики избранного"
+        constraints = (
+            UniqueConstraint(
+                fields=("recipe", "shard"),
+                name="unique_favorite_counter",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.recipe}: {self.delta:+d}"
+
+
+class FeedItem(Model):
+    """Лента пользователя: рецепты авторов, на которых он подписан."""
+
+    user = ForeignKey(
+        User,
+        on_delete=CASCADE,
+        related_name="feed",
+        verbose_name="Подписчик",
+    )
+    recipe = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name="feed_items",
+        verbose_name="Рецепт",
+    )
+
+    class Meta:
+        ordering = ("-recipe",)
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+        constraints = (
+            UniqueConstraint(
+                fields=("user", "recipe"),
+                name="unique_feed_item",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.recipe} в ленте {self.user}"
+
+
+class RecipeSimilarity(Model):
+    """Похожие рецепты по совместному добавлению в избранное и покупки."""
+
+    recipe = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name="similarities",
+        verbose_name="Рецепт",
+    )
+    similar = ForeignKey(
+        Recipe,
+        on_delete=CASCADE,
+        related_name="+",
+        verbose_name="Похожий рецепт",
+    )
+    score = FloatField(verbose_name="Сходство")
+
+    class Meta:
+        ordering = ("recipe", "-score")
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = (
+            UniqueConstraint(
+                fields=("recipe", "similar"),
+                name="unique_recipe_similarity",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.recipe} похож на {self.similar}"
+
+
+class Change(Model):
+    """Запись журнала изменений для дельта-синхронизации клиентов.
+
+    ``user`` — владелец записи избранного, покупок или подписки, для
+    рецепта — автор. Связи без внешних ключей: запись об удалении
+    переживает и объект, и пользователя.
+    """
+    class Kind(IntegerChoices):
+        RECIPE = 1, "Рецепт"
+        FAVORITE = 2, "Избранное"
+        SHOPPING_CART = 3, "Список покупок"
+        SUBSCRIPTION = 4, "Подписка"
+
+    kind = PositiveSmallIntegerField(
+        choices=Kind.choices,
+        verbose_name="Тип",
+    )
+    user = ForeignKey(
+        User,
+        on_delete=DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+        verbose_name="Пользователь",
+    )
+    object_id = PositiveIntegerField(verbose_name="id объекта")
+    deleted = BooleanField(default=False, verbose_name="Удалён")
+    created = DateTimeField(
+        db_default=Now(),
+        db_index=True,
+        verbose_name="Время",
+    )
+
+    class Meta:
+        verbose_name = "Изменение"
+        verbose_name_plural = "Журнал изменений"
+
+    def __str__(self):
+        action = "удалён" if self.deleted else "изменён"
+        return f"{self.get_kind_display()} {self.object_id} {action}"
+
+
+class Deletion(Model):
+    """Фоновое удаление пользователя или рецепта.
+
+    Объект скрыт с момента ``requested``; задача удаляет зависимые
+    строки пачками по шагам, ``deleted`` из ``total`` — прогресс для
+    админки. Связь — только id: запись переживает удалённый объект.
+    """
+    class Kind(IntegerChoices):
+        USER = 1, "Пользователь"
+        RECIPE = 2, "Рецепт"
+
+    kind = PositiveSmallIntegerField(
+        choices=Kind.choices,
+        verbose_name="Тип",
+    )
+    object_id = PositiveIntegerField(verbose_name="id объекта")
+    name = CharField(max_length=200, verbose_name="Объект")
+    step = PositiveSmallIntegerField(default=0, verbose_name="Шаг")
+    total = PositiveIntegerField(null=True, verbose_name="Всего строк")
+    deleted = PositiveIntegerField(default=0, verbose_name="Удалено строк")
+    requested = DateTimeField(db_default=Now(), verbose_name="Запрошено")
+    finished = DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Завершено",
+    )
+
+    class Meta:
+        ordering = ("-id",)
+        verbose_name = "Удаление"
+        verbose_name_plural = "Удаления"
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.name}"
@@ -0,0 +1,208 @@
+"""Полнотекстовый поиск рецептов по названию и описанию.
+
+На PostgreSQL используется вычисляемый столбец ``search_vector``
+(конфигурация ``russian``) с GIN-индексом, на SQLite — внешняя
+таблица FTS5, которую поддерживают триггеры. Обе структуры создаёт
+миграция, а для SQLite триггеры дополнительно восстанавливаются
+после каждой миграции: Django пересоздаёт таблицу при некоторых
+изменениях схемы, и триггеры теряются вместе со старой таблицей.
+"""
+import re
+from secrets import token_hex
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+SEARCH_CONFIG = "russian"
+SNIPPET_START = "<mark>"
+SNIPPET_STOP = "</mark>"
+SQLITE_STEM_MIN_LENGTH = 3
+SQLITE_STEM_CUT = 3
+
+POSTGRES_INSTALL = (
+    f"""
+    ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX recipes_recipe_search_idx "
+    "ON recipes_recipe USING gin (search_vector)",
+)
+POSTGRES_UNINSTALL = (
+    "DROP INDEX IF EXISTS recipes_recipe_search_idx",
+    "ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector",
+)
+SQLITE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5("
+    "name, text, content='recipes_recipe', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_insert
+    AFTER INSERT ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_delete
+    AFTER DELETE ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_update
+    AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+        INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO recipes_recipe_fts (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+)
+SQLITE_REBUILD = (
+    "INSERT INTO recipes_recipe_fts (recipes_recipe_fts) VALUES ('rebuild')"
+)
+SQLITE_UNINSTALL = (
+    "DROP TRIGGER IF EXISTS recipes_recipe_fts_insert",
+    "DROP TRIGGER IF EXISTS recipes_recipe_fts_delete",
+    "DROP TRIGGER IF EXISTS recipes_recipe_fts_update",
+    "DROP TABLE IF EXISTS recipes_recipe_fts",
+)
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install(connection, rebuild=True):
+    if connection.vendor == "postgresql":
+        _execute(connection, POSTGRES_INSTALL)
+    elif connection.vendor == "sqlite":
+        _execute(connection, (SQLITE_TABLE, *SQLITE_TRIGGERS))
+        if rebuild:
+            _execute(connection, (SQLITE_REBUILD,))
+
+
+def uninstall(connection):
+    if connection.vendor == "postgresql":
+        _execute(connection, POSTGRES_UNINSTALL)
+    elif connection.vendor == "sqlite":
+        _execute(connection, SQLITE_UNINSTALL)
+
+
+def restore_sqlite_triggers(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, count(*) FROM sqlite_master "
+            "WHERE name LIKE 'recipes_recipe_fts%' GROUP BY type"
+        )
+        objects = dict(cursor.fetchall())
+    if "table" not in objects or (
+        objects.get("trigger") == len(SQLITE_TRIGGERS)
+    ):
+        return
+    _execute(connection, (*SQLITE_TRIGGERS, SQLITE_REBUILD))
+
+
+def sqlite_match_query(query):
+    """Запрос FTS5 из пользовательского ввода.
+
+    В SQLite нет русского стеммера, поэтому слова лишаются возможного
+    окончания и ищутся по префиксу: «пирогами» → ``"пирог"*``.
+    """
+    terms = []
+    for word in re.findall(r"\w+", query.lower()):
+        stem = max(SQLITE_STEM_MIN_LENGTH, len(word) - SQLITE_STEM_CUT)
+        terms.append(f'"{word[:stem]}"*')
+    return " ".join(terms)
+
+
+def search_recipes(queryset, query):
+    """Оставляет рецепты, подходящие под запрос, по убыванию релевантности.
+
+    Совместим с остальными фильтрами и пагинацией: добавляет условие
+    и аннотацию ``search_rank``.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        condition = RawSQL(
+            f"recipes_recipe.search_vector @@ {tsquery}",
+            (query,),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank_cd(recipes_recipe.search_vector, {tsquery})",
+            (query,),
+            output_field=FloatField(),
+        )
+    else:
+        query = sqlite_match_query(query)
+        if not query:
+            return queryset.none()
+        condition = RawSQL(
+            "recipes_recipe.id IN (SELECT rowid FROM recipes_recipe_fts "
+            "WHERE recipes_recipe_fts MATCH %s)",
+            (query,),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            "(SELECT -bm25(recipes_recipe_fts, 10.0, 1.0) "
+            "FROM recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s "
+            "AND rowid = recipes_recipe.id)",
+            (query,),
+            output_field=FloatField(),
+        )
+    return queryset.filter(condition).annotate(
+        search_rank=rank
+    ).order_by("-search_rank", "-id")
+
+
+def search_snippets(recipe_ids, query, using="default"):
+    """Фрагменты описания с подсвеченными совпадениями для страницы.
+
+    Описание пишет пользователь, поэтому фрагмент экранируется как
+    HTML, и только затем в него вставляются ``<mark>``. База обрамляет
+    совпадения случайными метками запроса: угадать их и подделать
+    подсветку в тексте рецепта нельзя.
+    """
+    if not recipe_ids:
+        return {}
+    connection = connections[using]
+    start, stop = f"[{token_hex(8)}[", f"]{token_hex(8)}]"
+    placeholders = ", ".join(["%s"] * len(recipe_ids))
+    if connection.vendor == "postgresql":
+        sql = (
+            f"SELECT id, ts_headline('{SEARCH_CONFIG}', text, "
+            f"websearch_to_tsquery('{SEARCH_CONFIG}', %s), %s) "
+            f"FROM recipes_recipe WHERE id IN ({placeholders})"
+        )
+        options = (
+            "MaxFragments=2, MaxWords=20, MinWords=5, "
+            f'StartSel="{start}", StopSel="{stop}"'
+        )
+        params = [query, options, *recipe_ids]
+    else:
+        sql = (
+            "SELECT rowid, snippet(recipes_recipe_fts, 1, %s, %s, '…', 16) "
+            "FROM recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s "
+            f"AND rowid IN ({placeholders})"
+        )
+        params = [start, stop, sqlite_match_query(query), *recipe_ids]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {
+            pk: escape(snippet).replace(start, SNIPPET_START).replace(
+                stop, SNIPPET_STOP
+            )
+            for pk, snippet in cursor.fetchall()
+        }
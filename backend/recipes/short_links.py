@@ -0,0 +1,141 @@
+"""Короткие ссылки на рецепты.
+
+Код — id рецепта в base62 с контрольной буквой впереди: опечатки и
+перебор отсекаются без обращения к базе. Какие id существуют, знает
+битовая карта опубликованных рецептов в памяти процесса; она
+обновляется сигналами и перестраивается не реже раза в
+``SHORT_LINK_INDEX_TTL`` секунд, чтобы подхватить изменения,
+сделанные другими процессами.
+"""
+from string import ascii_letters, digits
+from threading import RLock
+from time import monotonic
+from zlib import crc32
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from recipes.models import Recipe
+
+ALPHABET = digits + ascii_letters
+BASE = len(ALPHABET)
+CHECK_LETTERS = ascii_letters
+
+
+def _checksum(body):
+    return CHECK_LETTERS[crc32(body.encode()) % len(CHECK_LETTERS)]
+
+
+def encode(pk):
+    body = ""
+    while True:
+        pk, remainder = divmod(pk, BASE)
+        body = ALPHABET[remainder] + body
+        if not pk:
+            break
+    return _checksum(body) + body
+
+
+def decode(code):
+    """id рецепта по коду или ``None``, если код повреждён."""
+    check, body = code[:1], code[1:]
+    if not body or check != _checksum(body):
+        return None
+    pk = 0
+    for char in body:
+        position = ALPHABET.find(char)
+        if position < 0:
+            return None
+        pk = pk * BASE + position
+    return pk
+
+
+class ShortCodeConverter:
+    """Конвертер пути: неверный код даёт 404 ещё при разборе URL."""
+    regex = "[A-Za-z][0-9A-Za-z]{1,11}"
+
+    def to_python(self, value):
+        pk = decode(value)
+        if pk is None:
+            raise ValueError(value)
+        return pk
+
+    def to_url(self, value):
+        return encode(value)
+
+
+class LiveRecipes:
+    """Битовая карта id опубликованных рецептов."""
+
+    def __init__(self):
+        self._lock = RLock()
+        self._bits = bytearray()
+        self._built_at = None
+
+    def build(self):
+        ids = list(
+            Recipe.published.order_by().values_list("id", flat=True)
+        )
+        bits = bytearray((max(ids, default=0) >> 3) + 1)
+        for pk in ids:
+            bits[pk >> 3] |= 1 << (pk & 7)
+        with self._lock:
+            self._bits = bits
+            self._built_at = monotonic()
+
+    @property
+    def fresh(self):
+        return (
+            self._built_at is not None
+            and monotonic() - self._built_at <= settings.SHORT_LINK_INDEX_TTL
+        )
+
+    def _ensure_fresh(self):
+        if not self.fresh:
+            self.build()
+
+    def __contains__(self, pk):
+        self._ensure_fresh()
+        byte = pk >> 3
+        return byte < len(self._bits) and bool(
+            self._bits[byte] & (1 << (pk & 7))
+        )
+
+    def add(self, pk):
+        with self._lock:
+            if self._built_at is None:
+                return
+            byte = pk >> 3
+            if byte >= len(self._bits):
+                self._bits.extend(bytes(byte - len(self._bits) + 1))
+            self._bits[byte] |= 1 << (pk & 7)
+
+    def discard(self, pk):
+        with self._lock:
+            byte = pk >> 3
+            if byte < len(self._bits):
+                self._bits[byte] &= ~(1 << (pk & 7)) & 0xFF
+
+
+live_recipes = LiveRecipes()
+
+
+def is_live(pk):
+    """Опубликован ли рецепт.
+
+    Ответ «да» берётся из памяти. На промах база проверяется один
+    раз: рецепт могли опубликовать в другом процессе.
+    """
+    if pk in live_recipes:
+        return True
+    if Recipe.published.filter(pk=pk).exists():
+        live_recipes.add(pk)
+        return True
+    return False
+
+
+async def ais_live(pk):
+    """``is_live`` для асинхронных представлений: попадание — без потока."""
+    if live_recipes.fresh and pk in live_recipes:
+        return True
+    return await sync_to_async(is_live)(pk)
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from recipes import changelog, feed, search, tasks
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Recipe, RecipeIngredient
+from recipes.short_links import live_recipes
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+def update_feeds(sender, instance, **kwargs):
+    """Публикация раскладывает рецепт по лентам, снятие — убирает."""
+    if instance.is_published:
+        feed.publish(instance)
+    else:
+        feed.unpublish(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def update_short_links(sender, instance, **kwargs):
+    if instance.is_published:
+        live_recipes.add(instance.id)
+    else:
+        live_recipes.discard(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def warm_recipe_thumbnails(sender, instance, **kwargs):
+    if instance.image:
+        tasks.warm_thumbnails.delay(instance.image.name, tasks.RECIPE_PRESETS)
+
+
+@receiver(post_save, sender=User)
+def warm_avatar_thumbnails(sender, instance, update_fields=None, **kwargs):
+    if instance.avatar and (
+        update_fields is None or "avatar" in update_fields
+    ):
+        tasks.warm_thumbnails.delay(instance.avatar.name, tasks.AVATAR_PRESETS)
+
+
+@receiver(post_save, sender=Recipe)
+def log_recipe_change(sender, instance, **kwargs):
+    changelog.recipes_changed((instance,))
+
+
+@receiver(post_delete, sender=Recipe)
+def log_recipe_deletion(sender, instance, **kwargs):
+    """Скрытый ``deletion`` рецепт уже записан в журнал при скрытии."""
+    if instance.deleted_at is None:
+        changelog.recipe_deleted(instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def reindex_ingredients(sender, instance, **kwargs):
+    """Индекс обновляется и при правках в админке и из кода.
+
+    ``bulk_create`` и ``update()`` сигналов не шлют: после них индекс
+    обновляет вызывающий код.
+    """
+    ingredient_index.refresh_on_commit(
+        instance.pk if sender is Recipe else instance.recipe_id
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_from_indexes(sender, instance, **kwargs):
+    ingredient_index.remove(instance.id)
+    live_recipes.discard(instance.id)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    """SQLite теряет триггеры FTS, когда миграция пересоздаёт таблицу."""
+    connection = connections[using]
+    if sender.name == "recipes" and connection.vendor == "sqlite":
+        search.restore_sqlite_triggers(connection)
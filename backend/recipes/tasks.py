@@ -0,0 +1,40 @@
+"""Фоновые задачи рецептов, выполняются воркером ``run_jobs``."""
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.thumbnails import ThumbnailError, thumbnails
+from jobs.models import Job
+from jobs.queue import task
+from recipes.models import Favorite, FavoriteCounter, Recipe
+
+RECIPE_PRESETS = ("card", "small")
+AVATAR_PRESETS = ("avatar",)
+# Копия в WebP и запасная в JPEG/PNG для браузеров без WebP.
+ACCEPT_VARIANTS = ("image/webp", "")
+
+
+@task()
+def warm_thumbnails(name, presets):
+    """Строит уменьшенные копии заранее, до первого запроса к ним."""
+    for preset in presets:
+        for accept in ACCEPT_VARIANTS:
+            try:
+                thumbnails.get(name, preset, accept)
+            except ThumbnailError:
+                # Файл уже заменён или удалён: строить нечего.
+                return
+
+
+@task(priority=Job.Priority.LOW)
+def rebuild_favorite_counts(recipe_ids):
+    """Пересчитывает ``favorites_count`` по таблице избранного.
+
+    Неперенесённые части счётчиков этих рецептов удаляются.
+    """
+    FavoriteCounter.objects.filter(recipe_id__in=recipe_ids).delete()
+    favorites = Favorite.objects.filter(recipe=OuterRef("pk")).values(
+        "recipe"
+    ).annotate(count=Count("id")).values("count")
+    Recipe.objects.filter(id__in=recipe_ids).update(
+        favorites_count=Coalesce(Subquery(favorites), 0)
+    )
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.admin import EstimatedCountPaginator
+from core.testing import create_recipe, create_user
+from jobs.models import Job
+from recipes.counters import roll_up_favorite_counts
+from recipes.deletion import purge
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+@mock.patch.object(
+    EstimatedCountPaginator, "estimated_count", return_value=50000
+)
+class EstimatedCountTests(TestCase):
+    """Скрытие удалённых в ``get_queryset`` не отключает оценку."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin", is_staff=True, is_superuser=True)
+        create_recipe(cls.admin)
+
+    def changelist(self, model, **params):
+        request = RequestFactory().get("/", params)
+        request.user = self.admin
+        return site._registry[model].get_changelist_instance(request)
+
+    def test_default_changelist_is_estimated(self, estimated_count):
+        for model in (Recipe, User):
+            with self.subTest(model._meta.model_name):
+                changelist = self.changelist(model)
+                self.assertTrue(changelist.queryset.query.where)
+                self.assertEqual(changelist.paginator.count, 50000)
+
+    def test_filtered_changelist_is_counted(self, estimated_count):
+        changelist = self.changelist(Recipe, is_published__exact=1)
+        self.assertEqual(changelist.paginator.count, 1)
+        changelist = self.changelist(User, q="adm")
+        self.assertEqual(changelist.paginator.count, 1)
+
+
+@override_settings(JOBS_EAGER=False)
+class JobAdminTests(TestCase):
+    """Фильтр задач берёт имена из реестра, а не из таблицы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user("admin", is_staff=True, is_superuser=True)
+
+    def test_task_name_filter(self):
+        roll_up_favorite_counts.delay()
+        request = RequestFactory().get(
+            "/", {"name": roll_up_favorite_counts.name}
+        )
+        request.user = self.admin
+        with CaptureQueriesContext(connection) as queries:
+            changelist = site._registry[Job].get_changelist_instance(
+                request
+            )
+            result = list(changelist.result_list)
+        self.assertEqual(
+            [job.name for job in result], [roll_up_favorite_counts.name]
+        )
+        self.assertFalse(
+            any("DISTINCT" in query["sql"] for query in queries)
+        )
+        name_filter = changelist.filter_specs[-1]
+        self.assertIn((purge.name, purge.name), name_filter.lookup_choices)
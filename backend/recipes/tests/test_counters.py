@@ -0,0 +1,86 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.testing import create_recipe, create_user
+from jobs.models import Job
+from recipes.counters import (
+    exact_favorites_counts,
+    favorites_added,
+    favorites_removed,
+    roll_up_favorite_counts,
+)
+from recipes.models import FavoriteCounter, Recipe
+
+
+@override_settings(JOBS_EAGER=False)
+class FavoriteCounterTests(TestCase):
+    """Части счётчиков избранного и их перенос в рецепты."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user("author")
+        cls.first = create_recipe(author, "Первый")
+        cls.second = create_recipe(author, "Второй")
+
+    def counts(self):
+        return dict(Recipe.objects.values_list("id", "favorites_count"))
+
+    def test_exact_counts_before_roll_up(self):
+        favorites_added([self.first.id, self.second.id])
+        favorites_added([self.first.id])
+        favorites_removed([self.second.id])
+        self.assertEqual(
+            exact_favorites_counts([self.first.id, self.second.id]),
+            {self.first.id: 2, self.second.id: 0},
+        )
+        self.assertEqual(
+            self.counts(), {self.first.id: 0, self.second.id: 0}
+        )
+        self.assertEqual(
+            Job.objects.filter(name=roll_up_favorite_counts.name).count(), 1
+        )
+
+    def test_roll_up(self):
+        favorites_added([self.first.id, self.first.id, self.second.id])
+        favorites_removed([self.second.id])
+        roll_up_favorite_counts.run_now()
+        self.assertEqual(
+            self.counts(), {self.first.id: 2, self.second.id: 0}
+        )
+        self.assertFalse(FavoriteCounter.objects.exists())
+        self.first.refresh_from_db()
+        self.assertIsNotNone(self.first.last_favorited_at)
+        self.assertEqual(
+            exact_favorites_counts([self.first.id]), {self.first.id: 2}
+        )
+
+    def test_count_stays_non_negative(self):
+        favorites_removed([self.first.id])
+        self.assertEqual(
+            exact_favorites_counts([self.first.id]), {self.first.id: 0}
+        )
+        roll_up_favorite_counts.run_now()
+        self.assertEqual(self.counts()[self.first.id], 0)
+
+    def test_latest_favorite_is_kept(self):
+        later = timezone.now() + timedelta(days=1)
+        Recipe.objects.filter(id=self.first.id).update(
+            last_favorited_at=later
+        )
+        favorites_added([self.first.id])
+        roll_up_favorite_counts.run_now()
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.last_favorited_at, later)
+
+    def test_large_backlog_is_requeued(self):
+        favorites_added([self.first.id, self.second.id])
+        Job.objects.all().delete()
+        with mock.patch("recipes.counters.ROLLUP_BATCH", 1):
+            roll_up_favorite_counts.run_now()
+        self.assertEqual(FavoriteCounter.objects.count(), 1)
+        self.assertEqual(
+            Job.objects.filter(name=roll_up_favorite_counts.name).count(), 1
+        )
@@ -0,0 +1,150 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.status import (
+    HTTP_204_NO_CONTENT,
+    HTTP_400_BAD_REQUEST,
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
+)
+
+from core.testing import (
+    UserAPITestCase,
+    create_ingredient,
+    create_recipe,
+)
+from recipes.counters import exact_favorites_counts
+from recipes.deletion import purge
+from recipes.models import (
+    Change,
+    Deletion,
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@override_settings(JOBS_EAGER=False, DELETION_BATCH=2)
+class DeletionTests(UserAPITestCase):
+    """Объект скрывается сразу, строки удаляются пачками в фоне."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        salt = create_ingredient("соль")
+        cls.recipes = [
+            create_recipe(cls.author, f"Рецепт {number}", ((salt, 1),))
+            for number in range(3)
+        ]
+        cls.own = create_recipe(cls.user, "Свой")
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        Favorite.objects.create(user=cls.author, recipe=cls.own)
+        Subscription.objects.create(user=cls.user, author=cls.author)
+
+    def purge(self):
+        deletion = Deletion.objects.get()
+        for _ in range(100):
+            purge.run_now(deletion.id)
+            deletion.refresh_from_db()
+            if deletion.finished:
+                return deletion
+        self.fail("Удаление не завершилось")
+
+    def tombstones(self):
+        return sorted(Change.objects.filter(
+            kind=Change.Kind.RECIPE, deleted=True
+        ).values_list("object_id", flat=True))
+
+    def delete_author(self):
+        self.client.force_authenticate(self.author)
+        return self.client.delete(
+            f"/api/users/{self.author.id}/",
+            {"current_password": "Pa55-word-for-tests"},
+            format="json",
+        )
+
+    def test_user_is_hidden_at_once(self):
+        self.assertEqual(self.delete_author().status_code, HTTP_204_NO_CONTENT)
+        author = User.objects.get(id=self.author.id)
+        self.assertFalse(author.is_active)
+        self.assertIsNotNone(author.deleted_at)
+        self.assertFalse(Recipe.objects.filter(author=author).exists())
+        self.assertEqual(Recipe.all_objects.filter(author=author).count(), 3)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(
+            self.client.get(f"/api/users/{author.id}/").status_code,
+            HTTP_404_NOT_FOUND,
+        )
+        response = self.client.get(f"/api/recipes/{self.recipes[0].id}/")
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_user_purge(self):
+        self.delete_author()
+        deletion = self.purge()
+        self.assertEqual(deletion.deleted, deletion.total)
+        self.assertFalse(User.objects.filter(id=self.author.id).exists())
+        self.assertFalse(
+            Recipe.all_objects.filter(author=self.author.id).exists()
+        )
+        self.assertFalse(RecipeIngredient.objects.exists())
+        self.assertFalse(Subscription.objects.exists())
+        self.assertEqual(list(Favorite.objects.all()), [])
+        self.assertEqual(
+            exact_favorites_counts([self.own.id]), {self.own.id: 0}
+        )
+        self.assertTrue(Change.objects.filter(
+            kind=Change.Kind.SUBSCRIPTION,
+            user=self.user.id,
+            object_id=self.author.id,
+            deleted=True,
+        ).exists())
+
+    def test_user_recipe_tombstones(self):
+        self.delete_author()
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        self.assertEqual(self.tombstones(), recipe_ids)
+        self.purge()
+        self.assertEqual(self.tombstones(), recipe_ids)
+
+    def test_user_needs_password(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f"/api/users/{self.author.id}/")
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(Deletion.objects.exists())
+
+    def test_other_user(self):
+        response = self.client.delete(
+            f"/api/users/{self.author.id}/",
+            {"current_password": "Pa55-word-for-tests"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+        self.assertFalse(Deletion.objects.exists())
+
+    def test_recipe_purge(self):
+        recipe = self.recipes[0]
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(response.status_code, HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertEqual(self.tombstones(), [recipe.id])
+        self.purge()
+        self.assertEqual(self.tombstones(), [recipe.id])
+        self.assertFalse(Recipe.all_objects.filter(id=recipe.id).exists())
+        self.assertFalse(Favorite.objects.filter(recipe=recipe.id).exists())
+        self.assertEqual(Recipe.objects.filter(author=self.author).count(), 2)
+
+    def test_hard_delete_is_logged(self):
+        recipe = self.recipes[0]
+        Recipe.objects.filter(id=recipe.id).delete()
+        self.assertEqual(self.tombstones(), [recipe.id])
+
+    def test_admin_deletes_in_background(self):
+        admin = site._registry[User]
+        admin.delete_model(None, self.author)
+        self.assertEqual(Deletion.objects.get().kind, Deletion.Kind.USER)
+        self.assertTrue(User.objects.filter(id=self.author.id).exists())
+        self.assertEqual(admin.check(), [])
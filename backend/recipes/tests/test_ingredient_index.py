@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.test import TestCase
+
+from core.testing import create_ingredient, create_recipe, create_user
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Recipe, RecipeIngredient
+
+
+class IngredientIndexSignalTests(TestCase):
+    """Правки в обход API попадают в индекс после фиксации."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user("author")
+        cls.salt = create_ingredient("соль")
+        cls.pepper = create_ingredient("перец")
+        cls.recipe = create_recipe(
+            cls.author, ingredients=((cls.salt, 1),)
+        )
+
+    def setUp(self):
+        ingredient_index.build()
+
+    def found(self, ingredient):
+        return [
+            match.recipe_id
+            for match in ingredient_index.search([ingredient.id])
+        ]
+
+    def test_unpublish_and_publish(self):
+        self.recipe.is_published = Recipe.Status.DRAFT
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        self.assertEqual(self.found(self.salt), [])
+        self.recipe.is_published = Recipe.Status.PUBLISHED
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        self.assertEqual(self.found(self.salt), [self.recipe.id])
+
+    def test_ingredient_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=self.recipe, ingredient=self.pepper, amount=1
+            )
+        self.assertEqual(self.found(self.pepper), [self.recipe.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.get(ingredient=self.pepper).delete()
+        self.assertEqual(self.found(self.pepper), [])
+
+    def test_rolled_back_write_is_not_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    RecipeIngredient.objects.create(
+                        recipe=self.recipe, ingredient=self.pepper, amount=1
+                    )
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.found(self.pepper), [])
@@ -0,0 +1,60 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Данные создаются на схеме ``migrate_from`` и мигрируют в
+    ``migrate_to``.
+
+    После теста база возвращается к последней схеме.
+    """
+    migrate_from = None
+    migrate_to = None
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.apps = self.migrate(self.migrate_from)
+        self.setUpBeforeMigration(self.apps)
+        self.apps = self.migrate(self.migrate_to)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def setUpBeforeMigration(self, apps):
+        pass
+
+
+class CountFavoritesMigrationTests(MigrationTestCase):
+    migrate_from = [("recipes", "0006_recipe_search")]
+    migrate_to = [("recipes", "0007_recipe_sort_orders")]
+
+    def setUpBeforeMigration(self, apps):
+        User = apps.get_model("users", "MyUser")
+        Recipe = apps.get_model("recipes", "Recipe")
+        Favorite = apps.get_model("recipes", "Favorite")
+        author = User.objects.create(username="author", email="a@a.ru")
+        fan = User.objects.create(username="fan", email="f@f.ru")
+        recipe = {
+            "author": author, "text": "-", "image": "x.png",
+            "cooking_time": 1,
+        }
+        self.loved = Recipe.objects.create(name="Любимый", **recipe).id
+        self.unloved = Recipe.objects.create(name="Никому", **recipe).id
+        Favorite.objects.create(user=fan, recipe_id=self.loved)
+
+    def test_recipes_without_favorites_count_zero(self):
+        Recipe = self.apps.get_model("recipes", "Recipe")
+        self.assertEqual(
+            dict(Recipe.objects.values_list("id", "favorites_count")),
+            {self.loved: 1, self.unloved: 0},
+        )
+        self.assertIsNone(
+            Recipe.objects.get(id=self.unloved).last_favorited_at
+        )
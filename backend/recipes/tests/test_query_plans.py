@@ -0,0 +1,36 @@
+from io import StringIO
+
+from django.db import connection
+from django.test import TestCase
+
+from recipes.management.commands.check_query_plans import CASES, Command
+
+
+class QueryPlanTests(TestCase):
+    """Планы горячих запросов API: индексы, без сортировок и просмотров.
+
+    Те же сценарии, что и у ``manage.py check_query_plans``.
+    """
+    recipes = 300
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = cls.command().seed(cls.recipes)
+
+    @staticmethod
+    def command():
+        command = Command(stdout=StringIO())
+        command.verbosity = 0
+        command.tables = set(connection.introspection.table_names())
+        return command
+
+    def test_plans(self):
+        command = self.command()
+        for case in CASES:
+            with self.subTest(case.name):
+                self.assertEqual(command.check_case(case, self.data), [])
+
+
+class SmallDatasetQueryPlanTests(QueryPlanTests):
+    """Вердикт не зависит от объёма данных."""
+    recipes = 40
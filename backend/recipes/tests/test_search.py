@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from core.testing import create_recipe, create_user
+from recipes.models import Recipe
+from recipes.search import search_recipes, search_snippets
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user("author")
+        cls.recipe = create_recipe(
+            author,
+            "Пирог",
+            text='<img src=x onerror="alert(1)"> Яблочный пирог <mark>',
+        )
+        create_recipe(author, "Суп", text="Суп с клёцками")
+
+    def test_search(self):
+        found = search_recipes(Recipe.objects.all(), "пироги")
+        self.assertEqual(list(found), [self.recipe])
+
+    def test_snippet_escapes_recipe_text(self):
+        snippet = search_snippets([self.recipe.id], "пирог")[self.recipe.id]
+        self.assertIn("<mark>пирог</mark>", snippet)
+        self.assertIn(
+            "&lt;img src=x onerror=&quot;alert(1)&quot;&gt;", snippet
+        )
+        self.assertNotIn("<img", snippet)
+        self.assertEqual(snippet.count("<mark>"), 1)
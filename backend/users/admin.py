@@ -1,10 +1,17 @@
-from django.contrib.admin import register, ModelAdmin
+from django.contrib.admin import register
 from django.contrib.auth.admin import UserAdmin
+
+from core.admin import (
+    BackgroundDeletionMixin,
+    EstimatedCountMixin,
+    LargeTableAdmin,
+)
+from recipes import deletion
 from users.models import Subscription, MyUser
 
 
 @register(MyUser)
-class MyUserAdmin(UserAdmin):
+class MyUserAdmin(BackgroundDeletionMixin, EstimatedCountMixin, UserAdmin):
     list_display = (
         "is_active",
         "username",
@@ -26,17 +33,23 @@ class MyUserAdmin(UserAdmin):
     fieldsets = []
 
     search_fields = (
-        "username",
-        "email",
+        "^username",
+        "^email",
     )
     list_filter = (
         "is_active",
-        "first_name",
-        "email",
+        "is_staff",
     )
     save_on_top = True
+    list_per_page = 50
+    soft_delete = staticmethod(deletion.delete_user)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(deleted_at__isnull=True)
 
 
 @register(Subscription)
-class SubscriptionAdmin(ModelAdmin):
+class SubscriptionAdmin(LargeTableAdmin):
     list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
@@ -0,0 +1,14 @@
+from django.db import migrations
+
+from core.utils import prefix_search_indexes
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        prefix_search_indexes('users_myuser', 'username', 'email'),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_subscription_user_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='myuser',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Удалён'),
+        ),
+    ]
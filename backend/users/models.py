@@ -4,8 +4,10 @@ from django.db.models import (
     CASCADE,
     BooleanField,
     CharField,
+    DateTimeField,
     EmailField,
     ImageField,
+    Index,
     ForeignKey,
     Model,
     UniqueConstraint,
@@ -71,6 +73,11 @@ class MyUser(AbstractUser):
         null=True,
         verbose_name="Аватар"
     )
+    deleted_at = DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Удалён",
+    )
 
     class Meta:
         ordering = ("username",)
@@ -101,6 +108,9 @@ class Subscription(Model):
         ordering = ("-id",)
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
+        indexes = (
+            Index(fields=("user", "-id"), name="subscription_user_idx"),
+        )
         constraints = [
             UniqueConstraint(
                 fields=["user", "author"], name="unique_follow"
@@ -157,8 +157,23 @@ class Api {
     ).then(this.checkResponse);
   }
 
+  takeEmbeddedRecipe(recipe_id) {
+    // Короткая ссылка может отдать страницу с уже встроенным рецептом.
+    const element = document.getElementById("recipe-data");
+    if (!element) {
+      return null;
+    }
+    element.remove();
+    const recipe = JSON.parse(element.textContent);
+    return String(recipe.id) === String(recipe_id) ? recipe : null;
+  }
+
   getRecipe({ recipe_id }) {
     const token = localStorage.getItem("token");
+    const embedded = this.takeEmbeddedRecipe(recipe_id);
+    if (embedded && !token) {
+      return Promise.resolve(embedded);
+    }
     const authorization = token ? { authorization: `Token ${token}` } : {};
     return fetch(`/api/recipes/${recipe_id}/`, {
       method: "GET",
@@ -5,6 +5,7 @@ import { AuthContext } from "../../contexts";
 import { useContext, useState } from "react";
 import cn from "classnames";
 import DefaultImage from "../../images/userpic-icon.jpg";
+import { thumbnail } from "../../utils";
 
 const Card = ({
   name = "Без названия",
@@ -46,7 +47,7 @@ const Card = ({
         title={
           <div
             className={styles.card__image}
-            style={{ backgroundImage: `url(${image})` }}
+            style={{ backgroundImage: `url(${thumbnail(image, "card")})` }}
           />
         }
       />
@@ -67,7 +68,7 @@ const Card = ({
           <div
             className={styles["card__author-image"]}
             style={{
-              "background-image": `url(${author.avatar || DefaultImage})`,
+              "background-image": `url(${thumbnail(author.avatar, "avatar") || DefaultImage})`,
             }}
           />
           <div className={styles.card__author}>
@@ -2,6 +2,7 @@ import styles from "./styles.module.css";
 import { useState } from "react";
 import { Button, LinkComponent, Popup } from "../index";
 import DefaultImage from "../../images/userpic-icon.jpg";
+import { thumbnail } from "../../utils";
 
 const countForm = (number, titles) => {
   number = Math.abs(number);
@@ -54,7 +55,7 @@ const Subscription = ({
           <div
             className={styles.subscriptionAvatar}
             style={{
-              "background-image": `url(${avatar || DefaultImage})`,
+              "background-image": `url(${thumbnail(avatar, "avatar") || DefaultImage})`,
             }}
           />
           <LinkComponent
@@ -75,7 +76,7 @@ const Subscription = ({
                   title={
                     <div className={styles.subscriptionRecipe}>
                       <img
-                        src={recipe.image}
+                        src={thumbnail(recipe.image, "small")}
                         alt={recipe.name}
                         className={styles.subscriptionRecipeImage}
                       />
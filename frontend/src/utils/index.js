@@ -4,6 +4,7 @@ import { useTags } from './use-tags'
 import useRecipes from './use-recipes'
 import useRecipe from './use-recipe'
 import useSubscriptions from './use-subscriptions'
+import thumbnail from './thumbnail'
 
 export {
   hexToRgba,
@@ -12,5 +13,6 @@ export {
   useTags,
   useRecipes,
   useRecipe,
-  useSubscriptions
+  useSubscriptions,
+  thumbnail
 }
\ No newline at end of file
@@ -0,0 +1,9 @@
+// Уменьшенная копия загруженного изображения: /media/... → /thumbs/<preset>/...
+const thumbnail = (url, preset) => {
+  if (!url) {
+    return url
+  }
+  return url.replace('/media/', `/thumbs/${preset}/`)
+}
+
+export default thumbnail